@@ -1,10 +1,6 @@
-import logging
-
 from aiogram.filters import BaseFilter
 
-from db.models import Chat
-
-logger = logging.getLogger(__name__)
+from services.hot_cache import hot_cache
 
 
 class GroupKeyFilter(BaseFilter):
@@ -12,8 +8,6 @@ class GroupKeyFilter(BaseFilter):
         self.key = key
 
     async def __call__(self, update, **kwargs) -> bool:
-        chat_obj = await Chat().get_or_none(chat_id=update.chat.id)
-        if not chat_obj:
-            logger.error("Update from unknown chat with id %d", update.chat.id)
-            return False
-        return chat_obj.key == self.key
+        # системные чаты уже в кэше процесса, в базу за каждым апдейтом не ходим
+        chat_obj = await hot_cache.chat(self.key)
+        return chat_obj is not None and chat_obj.chat_id == update.chat.id
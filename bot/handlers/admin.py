@@ -25,19 +25,28 @@ from tortoise.expressions import Q
 import services.ban
 from bot.filters.admin import AdminFilter
 from bot.handlers import mainloop_dialog
-from db.models import Chat, Game, KillEvent, Player, User
-from services import settings, texts
+from bot.middlewares.route_index import RouteScope
+from db.models import Game, KillEvent, Player, User
+from db.routing import replica_safe
+from services import player_stats, settings, texts
 from services.admin_chat import AdminChatService
+from services.backpressure import telegram_backpressure
 from services.ban import recalc_game_ratings
 from services.credits import CreditsInfo
+from services.deferred import deferred
+from services.hot_cache import hot_cache
+from services.leaderboard import leaderboards
 from services.logging import log_dialog_action
 from services.matchmaking import MatchmakingService
+from services.menu_snapshot import menu_snapshots
+from services.metrics import metrics
 from services.states import EditGame, EndGame, MainLoop, StartGame
 from services.states.participation import ParticipationForm
 
 logger = logging.getLogger(__name__)
 
 router = Router()
+route_scope = RouteScope(chat_types=("private",), commands=True)
 
 
 async def set_admin_commands(bot: Bot, chat_id: int):
@@ -64,12 +73,17 @@ async def set_admin_commands(bot: Bot, chat_id: int):
                 command="/rollbackkill",
                 description=texts.get("admin.command.rollbackkill"),
             ),
+            BotCommand(
+                command="/checkstats",
+                description=texts.get("admin.command.checkstats"),
+            ),
         ],
         scope=BotCommandScopeChat(chat_id=chat_id),
     )
 
 
 @router.message(AdminFilter(), Command(commands=["stats"]))
+@replica_safe
 async def stats(message: Message, bot: Bot):
     user_count = await User().all().count()
     user_confirmed_count = await User().filter(status="confirmed").count()
@@ -111,18 +125,19 @@ async def on_description_input(message: Message, message_input: MessageInput, ma
 
 
 async def send_notification(bot: Bot, user: User, text: str):
+    await telegram_backpressure.wait()
     msg = await bot.send_message(
         user.tg_id,
         text=text,
         parse_mode="HTML",
     )
-    asyncio.create_task(delete_later(bot, msg.chat.id, msg.message_id))
+    await deferred.schedule("delete_message", 10, chat_id=msg.chat.id, msg_id=msg.message_id)
 
 
-async def delete_later(bot: Bot, chat_id: int, msg_id: int):
-    await asyncio.sleep(10)
+@deferred.handler("delete_message")
+async def delete_later(chat_id: int, msg_id: int):
     try:
-        await bot.delete_message(chat_id, msg_id)
+        await settings.bot.delete_message(chat_id, msg_id)
     except Exception as e:
         logger.warning(f"Failed to delete message {msg_id}: {e}")
 
@@ -142,6 +157,8 @@ async def on_final_confirmation(
         name=manager.dialog_data.get("name") or "test",
         start_date=creation_date,
     )
+    await hot_cache.invalidate_game()
+    metrics.increment_game_creation()
     users = (
         await User()
         .filter(is_in_game=False, status="confirmed")
@@ -231,8 +248,7 @@ router.include_router(
 async def creategame(message: Message, bot: Bot, dialog_manager: DialogManager):
     if await Game().filter(end_date=None).exists():
         msg = await message.reply(text=texts.get("admin.creategame.already_running"))
-        await asyncio.sleep(10)
-        await msg.delete()
+        await deferred.schedule("delete_message", 10, chat_id=msg.chat.id, msg_id=msg.message_id)
         return
     await dialog_manager.start(StartGame.name, show_mode=ShowMode.AUTO)
 
@@ -240,8 +256,7 @@ async def creategame(message: Message, bot: Bot, dialog_manager: DialogManager):
 @router.message(AdminFilter(), Command(commands=["getservertime"]))
 async def getservertime(message: Message):
     msg = await message.reply(texts.render("admin.server_time", server_time=datetime.now(settings.timezone)))
-    await asyncio.sleep(10)
-    await msg.delete()
+    await deferred.schedule("delete_message", 10, chat_id=msg.chat.id, msg_id=msg.message_id)
 
 
 def parse_game_stage(game: Game) -> str:
@@ -301,17 +316,20 @@ async def on_action_clicked(callback: CallbackQuery, widget, manager: DialogMana
 async def handle_start_game(callback: CallbackQuery, game: Game):
     game.start_date = datetime.now(settings.timezone)
     await game.save()
+    await hot_cache.invalidate_game()
     await MatchmakingService().reset_queues()
+    await menu_snapshots.invalidate_game(game.id)
 
 
 async def handle_end_game(bot: Bot, dp: Dispatcher, game: Game):
     """Handle game ending and send credits to all participants."""
     game.end_date = datetime.now(settings.timezone)
     await game.save()
+    await hot_cache.invalidate_game()
     await MatchmakingService().reset_queues()
 
     participants, info, discussion = await asyncio.gather(
-        User().all(), CreditsInfo.from_game(game), Chat.get(key="discussion")
+        User().all(), CreditsInfo.from_game(game, with_players=True), hot_cache.chat("discussion")
     )
 
     send_tasks = [
@@ -326,6 +344,7 @@ async def handle_end_game(bot: Bot, dp: Dispatcher, game: Game):
             logger.error(f"Failed to send credits to user {user.id}: {result}")
 
     await User().filter(is_in_game=True).update(is_in_game=False)
+    await menu_snapshots.invalidate_game(game.id)
 
 
 async def user_endgame(bot: Bot, dp: Dispatcher, user: User, info: CreditsInfo):
@@ -341,6 +360,7 @@ async def send_game_credits(
 ) -> None:
     """Send game credits message to a specific user."""
     personal_stats = get_personal_stats(user_id, info) if user_id else ""
+    await telegram_backpressure.wait()
     try:
         await bot.send_message(
             chat_id=chat_id,
@@ -383,6 +403,7 @@ async def reset_dialog(bot: Bot, dp: Dispatcher, user_id: int):
     )
 
 
+@replica_safe
 async def game_info_getter(dialog_manager: DialogManager, **kwargs):
     game_id = dialog_manager.dialog_data["game_id"]
     game = await Game().get(id=game_id)
@@ -483,13 +504,11 @@ async def endgame(
     active_game = await Game().filter(end_date=None).first()
     if not active_game:
         msg = await message.answer(texts.get("admin.no_active_games"))
-        await asyncio.sleep(1)
-        await msg.delete()
+        await deferred.schedule("delete_message", 1, chat_id=msg.chat.id, msg_id=msg.message_id)
         return
     await handle_end_game(bot, dispatcher, active_game)
     msg = await message.answer(texts.get("admin.game_finished"))
-    await asyncio.sleep(1)
-    await msg.delete()
+    await deferred.schedule("delete_message", 1, chat_id=msg.chat.id, msg_id=msg.message_id)
 
 
 @router.message(Command(commands=["cancel"]))
@@ -573,3 +592,19 @@ async def rollbackkill(message: Message, bot: Bot, command: CommandObject):
     )
 
     await message.answer(texts.render("admin.rollbackkill.done", kill_event_id=kill_event.id))
+
+
+@router.message(AdminFilter(), Command(commands=["checkstats"]))
+async def checkstats(message: Message):
+    game = await Game.get_or_none(end_date=None)
+    if not game:
+        await message.answer(texts.get("admin.checkstats.no_game"))
+        return
+
+    fixed = await player_stats.rebuild(game.id)
+    if fixed:
+        await leaderboards.rebuild(game.id)
+        await menu_snapshots.invalidate_game(game.id)
+        await message.answer(texts.render("admin.checkstats.fixed", count=fixed))
+    else:
+        await message.answer(texts.get("admin.checkstats.ok"))
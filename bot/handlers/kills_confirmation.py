@@ -1,5 +1,4 @@
 import logging
-from datetime import datetime
 
 from aiogram import Router
 from aiogram.client.bot import Bot
@@ -13,16 +12,20 @@ from aiogram_dialog.widgets.kbd import Button, Cancel
 from aiogram_dialog.widgets.text import Const
 
 from bot.handlers import mainloop_dialog
-from db.models import Chat, KillEvent, Player, User
-from services import settings
-from services.ban import modify_rating
-from services.kills_confirmation import add_back_to_queues
+from bot.middlewares.route_index import PRIVATE_ONLY
+from db.models import Player, User
+from services.ban import after_rating_change
+from services.hot_cache import hot_cache
+from services.kills_confirmation import add_back_to_queues, confirm_kill, deny_kill
+from services.leaderboard import leaderboards
+from services.menu_snapshot import menu_snapshots
 from services.states import MainLoop
 from services.strings import trim_name
 from services import texts
 
 logger = logging.getLogger(__name__)
 router = Router()
+route_scope = PRIVATE_ONLY
 
 
 class ConfirmKillVictim(StatesGroup):
@@ -81,7 +84,7 @@ async def notify_chat(
     victim_display = victim.full_name or victim.tg_username or texts.get("common.unknown")
 
     await bot.send_message(
-        chat_id=(await Chat.get(key="discussion")).chat_id,
+        chat_id=(await hot_cache.chat("discussion")).chat_id,
         text=texts.render(
             "kills.chat_notified",
             killer=killer.mention_html(),
@@ -105,42 +108,31 @@ async def handle_confirm(
     from_user: TgUser,
 ):
     """Shared confirmation handler for both killer and victim."""
-    kill_event: KillEvent = await KillEvent.get(id=manager.start_data["kill_event_id"])
-    setattr(kill_event, f"{role}_confirmed", True)
-    setattr(kill_event, f"{role}_confirmed_at", datetime.now(settings.timezone))
-    await kill_event.save()
-
-    await kill_event.fetch_related("killer")
-    await kill_event.fetch_related("victim")
-
-    if not getattr(kill_event, f"{opposite_role}_confirmed"):
-        opposite_user: User = await User.get(id=getattr(kill_event, opposite_role).id)
-        await send_double_confirm_dialog(manager, opposite_user, opposite_state)
-
-    if kill_event.killer_confirmed and kill_event.victim_confirmed:
-        kill_event.status = "confirmed"
-        await kill_event.save()
-        killer_player = await Player.get(
-            game_id=manager.middleware_data["game"].id,
-            user_id=kill_event.killer.id,
-        )
-        victim_player = await Player.get(
-            game_id=manager.middleware_data["game"].id,
-            user_id=kill_event.victim.id,
-        )
-        killer_delta, victim_delta = await modify_rating(killer_player, victim_player)
-        await add_back_to_queues(kill_event.killer, kill_event.victim, killer_player, victim_player)
-        await notify_player(kill_event.killer, bot, manager, killer_delta)
-        await notify_player(kill_event.victim, bot, manager, victim_delta)
-        await notify_chat(
-            bot,
-            kill_event.killer,
-            kill_event.victim,
-            killer_player,
-            victim_player,
-            killer_delta,
-            victim_delta,
-        )
+    result = await confirm_kill(manager.start_data["kill_event_id"], role)
+    if result is not None and result.changed:
+        # все записи уже закоммичены: дальше только побочные эффекты
+        kill_event = result.kill_event
+        await menu_snapshots.invalidate(kill_event.game_id, kill_event.killer.tg_id, kill_event.victim.tg_id)
+
+        if not result.completed:
+            if not getattr(kill_event, f"{opposite_role}_confirmed"):
+                await send_double_confirm_dialog(manager, getattr(kill_event, opposite_role), opposite_state)
+        else:
+            killer_player, victim_player = result.killer_player, result.victim_player
+            await leaderboards.record_kill(kill_event)
+            await after_rating_change(killer_player, victim_player)
+            await add_back_to_queues(kill_event.killer, kill_event.victim, killer_player, victim_player)
+            await notify_player(kill_event.killer, bot, manager, result.killer_delta)
+            await notify_player(kill_event.victim, bot, manager, result.victim_delta)
+            await notify_chat(
+                bot,
+                kill_event.killer,
+                kill_event.victim,
+                killer_player,
+                victim_player,
+                result.killer_delta,
+                result.victim_delta,
+            )
 
     await manager.start(
         MainLoop.title,
@@ -161,14 +153,12 @@ async def handle_deny(
     from_user: TgUser,
 ):
     """Shared denial handler for both killer and victim."""
-    kill_event: KillEvent = await KillEvent.get(id=manager.start_data["kill_event_id"])
-
-    setattr(kill_event, f"{role}_confirmed", False)
-    setattr(kill_event, f"{role}_confirmed_at", None)
+    kill_event = await deny_kill(manager.start_data["kill_event_id"], role)
+    if kill_event is None:
+        return
 
     logger.info("%d отказался признавать убийство, будучи %s", from_user.id, role)
-
-    await kill_event.save()
+    await menu_snapshots.invalidate(kill_event.game_id, kill_event.killer.tg_id, kill_event.victim.tg_id)
 
 
 async def on_victim_confirm(callback: CallbackQuery, button: Button, manager: DialogManager):
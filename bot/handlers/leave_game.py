@@ -7,39 +7,40 @@ from aiogram.types import CallbackQuery
 from aiogram_dialog import Dialog, DialogManager, ShowMode, Window
 from aiogram_dialog.widgets.kbd import Button, Cancel
 from aiogram_dialog.widgets.text import Const
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
 
 from bot.handlers import mainloop_dialog
+from bot.middlewares.route_index import PRIVATE_ONLY
 from db.models import Game, KillEvent, Player, User
-from services import settings
+from services import assignments, player_stats, settings
 from services import texts
 from services.ban import modify_rating
+from services.leaderboard import leaderboards
 from services.logging import log_dialog_action
 from services.matchmaking import MatchmakingService
+from services.menu_snapshot import menu_snapshots
 from services.states import MainLoop
 from services.states.leave_game import LeaveGame
 from services.user_exit import calculate_leave_penalty, compute_exit_cooldown_until
 
 logger = logging.getLogger(__name__)
 router = Router()
+route_scope = PRIVATE_ONLY
 
 
 async def _confirm_pending_victim_event(
     user: User,
     game: Game,
     player: Player,
+    primary_event: KillEvent | None,
     now: datetime,
 ) -> tuple[int, User | None]:
-    victim_events = await KillEvent.filter(game_id=game.id, victim_id=user.id, status="pending").prefetch_related(
-        "killer"
-    )
-    if not victim_events:
+    if primary_event is None:
         return 0, None
 
-    primary_event = victim_events[0]
     killer_player = await Player.get_or_none(game_id=game.id, user_id=primary_event.killer_id)
-    killer_user = (
-        primary_event.killer if hasattr(primary_event, "killer") else await User.get(id=primary_event.killer_id)
-    )
+    killer_user = await User.get(id=primary_event.killer_id)
 
     if killer_player:
         killer_delta, victim_delta = await modify_rating(killer_player, player)
@@ -55,6 +56,7 @@ async def _confirm_pending_victim_event(
         penalty = calculate_leave_penalty(player.rating)
         player.rating = max(0, player.rating + penalty)
         await player.save(update_fields=["rating"])
+        await leaderboards.update_ratings(player)
         logger.warning("Предупреждение для %s", primary_event.id)
 
     primary_event.status = "confirmed"
@@ -62,21 +64,39 @@ async def _confirm_pending_victim_event(
     primary_event.victim_confirmed = True
     primary_event.killer_confirmed_at = now
     primary_event.victim_confirmed_at = now
-    await primary_event.save()
-
-    for event in victim_events[1:]:
-        event.status = "canceled"
-        await event.save()
 
     return penalty, killer_user
 
 
-async def _cancel_killer_events(user: User, game: Game):
-    killer_events = await KillEvent.filter(game_id=game.id, killer_id=user.id, status="pending").all()
-    for event in killer_events:
-        event.status = "canceled"
-        await event.save()
-        logger.info("Отмена kill_event %s для %s", event.id, user.id)
+async def _close_events(user: User, game: Game, killer_event: KillEvent | None, victim_event: KillEvent | None):
+    """Сохраняем итоговые статусы событий и убираем игрока из назначений одной транзакцией."""
+    async with in_transaction() as conn:
+        if victim_event is not None:
+            await victim_event.save(using_db=conn)
+            await assignments.release(victim_event, using_db=conn)
+            await player_stats.record_kill(victim_event, using_db=conn)
+        if killer_event is not None:
+            killer_event.status = "canceled"
+            await killer_event.save(using_db=conn)
+            await assignments.release(killer_event, using_db=conn)
+            logger.info("Отмена kill_event %s для %s", killer_event.id, user.id)
+
+        # Назначение держит одно событие на роль; остальные pending-события игрока (дубли) тоже закрываем
+        handled = [event.id for event in (victim_event, killer_event) if event is not None]
+        leftovers = KillEvent.filter(game_id=game.id, status="pending").filter(
+            Q(killer_id=user.id) | Q(victim_id=user.id)
+        )
+        if handled:
+            leftovers = leftovers.exclude(id__in=handled)
+        for event in await leftovers.select_for_update().using_db(conn):
+            event.status = "canceled"
+            await event.save(using_db=conn)
+            await assignments.release(event, using_db=conn)
+            logger.info("Отмена kill_event %s для %s", event.id, user.id)
+
+        await assignments.remove(game.id, user.id, using_db=conn)
+    if victim_event is not None and victim_event.status == "confirmed":
+        await leaderboards.record_kill(victim_event)
 
 
 async def _apply_leave_penalty(user: User, game: Game | None, now: datetime) -> tuple[int, User | None]:
@@ -87,13 +107,15 @@ async def _apply_leave_penalty(user: User, game: Game | None, now: datetime) ->
     if not player:
         return 0, None
 
-    penalty, killer_user = await _confirm_pending_victim_event(user, game, player, now)
-    await _cancel_killer_events(user, game)
+    killer_event, victim_event = await assignments.get_current_events(game.id, user.id)
+    penalty, killer_user = await _confirm_pending_victim_event(user, game, player, victim_event, now)
+    await _close_events(user, game, killer_event, victim_event)
 
     if penalty == 0:
         penalty = calculate_leave_penalty(player.rating)
         player.rating = max(0, player.rating + penalty)
         await player.save(update_fields=["rating"])
+        await leaderboards.update_ratings(player)
 
     return penalty, killer_user
 
@@ -125,6 +147,8 @@ async def on_confirm_leave(callback: CallbackQuery, button: Button, manager: Dia
         await _notify_killer(callback.bot, killer_user)
 
     await MatchmakingService().reset_queues()
+    # после сброса очередей статус в очереди поменялся у всех игроков
+    await menu_snapshots.invalidate_game(game and game.id)
 
     penalty_text = (
         texts.render("leave.penalty_changed", penalty=f"{penalty:+}")
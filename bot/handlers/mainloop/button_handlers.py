@@ -11,9 +11,10 @@ from bot.handlers.kills_confirmation import (
     ConfirmKillVictim,
 )
 from db.models import Game, KillEvent, Player, User
-from services import texts
+from services import assignments, texts
 from services.logging import log_dialog_action
 from services.matchmaking import MatchmakingService
+from services.menu_snapshot import menu_snapshots
 from services.states.my_profile import MyProfile
 from services.states.participation import ParticipationForm
 from services.states.leave_game import LeaveGame
@@ -45,12 +46,8 @@ async def _start_kill_confirmation(
 
 async def _get_pending_event(user_id: int, game_id: int, role: str):
     """role: 'victim' | 'killer'"""
-    filters = {
-        "victim": {"victim_id": user_id},
-        "killer": {"killer_id": user_id},
-    }[role]
-
-    return await KillEvent.filter(**filters, game_id=game_id, status="pending").first()
+    killer_event, victim_event = await assignments.get_current_events(game_id, user_id)
+    return {"victim": victim_event, "killer": killer_event}[role]
 
 
 @log_dialog_action("I_WAS_KILLED")
@@ -93,6 +90,7 @@ async def on_get_target(callback: CallbackQuery, button: Button, manager: Dialog
     }
 
     await MatchmakingService().add_player_to_queue(user.tg_id, data, "killer")
+    await menu_snapshots.invalidate(game.id, user.tg_id)
     await callback.answer(texts.get("common.queue_joined"))
 
 
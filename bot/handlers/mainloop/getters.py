@@ -1,5 +1,6 @@
 import logging
 import re
+from datetime import datetime
 from urllib.parse import urlparse
 
 from aiogram import Dispatcher
@@ -9,11 +10,14 @@ from aiogram_dialog.api.entities import MediaAttachment, MediaId
 
 from bot.handlers.registration_dialog import COURSE_TYPES
 from db.models import Game, KillEvent, Player, User
-from services import settings, texts
+from services import assignments, settings, texts
+from services.discussion_invite import discussion_invite
+from services.dossier import dossier_cards
 from services.logging import log_getter
 from services.matchmaking import MatchmakingService
 from services.strings import trim_name
-from services.user_exit import format_exit_cooldown, is_exit_cooldown_active
+from services.menu_snapshot import menu_snapshots
+from services.user_exit import format_cooldown_until, is_cooldown_active_until
 
 logger = logging.getLogger(__name__)
 
@@ -52,10 +56,7 @@ async def get_user_and_game(manager: DialogManager):
 
 async def get_pending_events(game: Game, user: User):
     """Return killer_event and victim_event for a user."""
-    victim_event = await KillEvent.filter(game=game, victim_id=user.id, status="pending").first()
-
-    killer_event = await KillEvent.filter(game=game, killer_id=user.id, status="pending").first()
-
+    killer_event, victim_event = await assignments.get_current_events(game.id, user.id)
     logger.debug(f"Found killer event {killer_event} and {victim_event}")
     return killer_event, victim_event
 
@@ -76,22 +77,33 @@ def get_advanced_info(user: User):
     return "\n".join(ret)
 
 
+def build_dossier(victim: User) -> dict:
+    """Target card as shown to the killer: stored in Redis per kill event."""
+    return {
+        "name": victim.full_name or texts.get("common.unknown"),
+        "tg_id": victim.tg_id,
+        "photo_id": victim.photo if victim.photo != "fastreg" else None,
+        "advanced_info": get_advanced_info(victim),
+    }
+
+
+async def get_dossier(killer_event: KillEvent) -> dict:
+    """Card from Redis; rebuilt from the victim's profile only if it is missing."""
+    card = await dossier_cards.get(killer_event.id)
+    if card is None:
+        await killer_event.fetch_related("victim")
+        card = build_dossier(killer_event.victim)
+        await dossier_cards.put(killer_event.id, card)
+    return card
+
+
 async def extract_target(killer_event: KillEvent | None):
     """Return target info."""
     if not killer_event:
         return texts.get("common.unknown"), None, None, None
 
-    await killer_event.fetch_related("victim")
-    victim: User = killer_event.victim
-    target_name = victim.full_name or texts.get("common.unknown")
-    return (
-        target_name,
-        victim.tg_id,
-        MediaAttachment(type=ContentType.PHOTO, file_id=MediaId(file_id=victim.photo))
-        if victim.photo != "fastreg"
-        else None,
-        get_advanced_info(victim),
-    )
+    card = await get_dossier(killer_event)
+    return card["name"], card["tg_id"], card["photo_id"], card["advanced_info"]
 
 
 def _empty_target_state() -> dict:
@@ -102,20 +114,18 @@ def _empty_target_state() -> dict:
         "should_get_target": False,
         "enqueued": False,
         "not_enqueued": True,
-        "killers_queue_length": 0,
-        "victims_queue_length": 0,
         "is_hunted": False,
         "pending_victim_confirmed": False,
         "target_name_trimmed": None,
         "target_name": None,
-        "target_photo": None,
+        "target_photo_id": None,
         "target_advanced_info": None,
         "target_profile_link": None,
     }
 
 
 async def parse_target_info(game: Game | None, user: User, matchmaking: MatchmakingService):
-    """Compute target-related info for the main menu or target window."""
+    """Target-related part of the menu snapshot (JSON-serializable, without queue lengths)."""
     player = await Player.filter(user=user, game=game).first()
     if not player or not user.is_in_game:
         return _empty_target_state()
@@ -124,11 +134,10 @@ async def parse_target_info(game: Game | None, user: User, matchmaking: Matchmak
     (
         target_name,
         target_tg_id,
-        target_photo,
+        target_photo_id,
         target_advanced_info,
     ) = await extract_target(killer_event)
 
-    killers_queue_len, victims_queue_len = await matchmaking.get_queues_length()
     killer_queued, _victim_queued = await matchmaking.get_player_by_id(user.tg_id)
 
     return {
@@ -139,13 +148,11 @@ async def parse_target_info(game: Game | None, user: User, matchmaking: Matchmak
         "should_get_target": killer_event is None and not killer_queued,
         "enqueued": killer_queued,
         "not_enqueued": not killer_queued,
-        "killers_queue_length": killers_queue_len,
-        "victims_queue_length": victims_queue_len,
         "is_hunted": victim_event is not None and not victim_event.victim_confirmed,
         "pending_victim_confirmed": victim_event is not None and victim_event.victim_confirmed,
         "target_name_trimmed": trim_name(target_name, 25),
         "target_name": target_name,
-        "target_photo": target_photo,
+        "target_photo_id": target_photo_id,
         "target_advanced_info": target_advanced_info,
         "target_profile_link": _safe_url(target_tg_id and f"tg://user?id={target_tg_id}", allow_tg=True),
     }
@@ -159,36 +166,80 @@ async def get_user_rating(user: User, game: Game):
         return {}
     return {
         "user_rating": player.rating,
+        "user_kills": player.kills,
+        "user_deaths": player.deaths,
+        "user_kill_streak": player.kill_streak,
+    }
+
+
+async def build_menu_snapshot(manager: DialogManager) -> dict:
+    """Everything the main menu and target window show about the player, as stored in the snapshot."""
+    user, game = await get_user_and_game(manager)
+    return {
+        "user_is_in_game": user.is_in_game,
+        "exit_cooldown_until": user.exit_cooldown_until and user.exit_cooldown_until.isoformat(),
+        **await get_user_rating(user, game),
+        **await parse_target_info(game, user, MatchmakingService()),
+    }
+
+
+async def get_menu_snapshot(manager: DialogManager) -> dict:
+    game_id = manager.start_data.get("game_id")
+    if game_id is None:
+        return await build_menu_snapshot(manager)
+    return await menu_snapshots.get_or_build(
+        game_id,
+        manager.start_data.get("user_tg_id"),
+        lambda: build_menu_snapshot(manager),
+    )
+
+
+async def render_target_info(snapshot: dict) -> dict:
+    """Target fields that are not stored in the snapshot: queue lengths and the photo attachment."""
+    if not snapshot["user_is_in_game"] or "user_rating" not in snapshot:
+        killers_queue_len, victims_queue_len = 0, 0
+    else:
+        killers_queue_len, victims_queue_len = await menu_snapshots.queue_lengths(
+            MatchmakingService().get_queues_length
+        )
+    photo_id = snapshot["target_photo_id"]
+    return {
+        "killers_queue_length": killers_queue_len,
+        "victims_queue_length": victims_queue_len,
+        "target_photo": MediaAttachment(type=ContentType.PHOTO, file_id=MediaId(file_id=photo_id))
+        if photo_id
+        else None,
     }
 
 
 @log_getter("GET_MAIN_MENU_INFO")
 async def get_main_menu_info(dialog_manager: DialogManager, dispatcher: Dispatcher, **kwargs):
-    user, game = await get_user_and_game(dialog_manager)
-    matchmaking = MatchmakingService()
+    snapshot = await get_menu_snapshot(dialog_manager)
 
-    discussion_link = _safe_url(getattr(settings.discussion_chat_invite_link, "invite_link", None))
+    discussion_link = _safe_url(await discussion_invite.link())
     next_game_link = _safe_url(settings.game_info_link)
-    cooldown_active = is_exit_cooldown_active(user)
+    cooldown_until = snapshot["exit_cooldown_until"] and datetime.fromisoformat(snapshot["exit_cooldown_until"])
+    cooldown_active = is_cooldown_active_until(cooldown_until)
+    game_running = dialog_manager.start_data.get("game_id") is not None
 
     return {
+        **snapshot,
         "discussion_link": discussion_link,
         "next_game_link": next_game_link,
-        "game_running": game is not None,
-        "user_is_in_game": user.is_in_game,
-        "join_game_button": game is not None and not user.is_in_game and not cooldown_active,
-        "exit_cooldown_until": format_exit_cooldown(user) if cooldown_active else None,
-        **await get_user_rating(user, game),
-        **await parse_target_info(game, user, matchmaking),
+        "game_running": game_running,
+        "join_game_button": game_running and not snapshot["user_is_in_game"] and not cooldown_active,
+        "exit_cooldown_until": format_cooldown_until(cooldown_until) if cooldown_active else None,
+        **await render_target_info(snapshot),
     }
 
 
+@log_getter("GET_TARGET_INFO")
 async def get_target_info(dialog_manager: DialogManager, dispatcher: Dispatcher, **kwargs):
     """Getter for target info window."""
-    user, game = await get_user_and_game(dialog_manager)
-    matchmaking = MatchmakingService()
+    snapshot = await get_menu_snapshot(dialog_manager)
 
     return {
+        **snapshot,
         "report_link": _safe_url(settings.report_link),
-        **await parse_target_info(game, user, matchmaking),
+        **await render_target_info(snapshot),
     }
@@ -24,13 +24,16 @@ from bot.handlers.mainloop.button_handlers import (
     open_profile_rules,
 )
 from bot.handlers.mainloop.getters import get_main_menu_info, get_target_info
-from db.models import Game, User
+from bot.middlewares.route_index import RouteScope
+from db.models import User
 from services import texts
+from services.hot_cache import hot_cache
 from services.states import MainLoop
 
 logger = logging.getLogger(__name__)
 
 router = Router()
+route_scope = RouteScope(chat_types=("private",), commands=True)
 
 
 main_menu_dialog = Dialog(
@@ -40,6 +43,10 @@ main_menu_dialog = Dialog(
             texts.get("main_menu.rating"),
             when="user_rating",
         ),
+        Format(
+            texts.get("main_menu.personal_stats"),
+            when="user_rating",
+        ),
         Format(
             texts.get("main_menu.exit_cooldown"),
             when="exit_cooldown_until",
@@ -186,7 +193,7 @@ async def confirmed_start(
         )
         return
 
-    game = await Game().filter(end_date=None).first()
+    game = await hot_cache.active_game()
     await dialog_manager.start(
         MainLoop.title,
         data={
@@ -4,12 +4,19 @@ from aiogram import Bot, Router
 from aiogram_dialog.api.entities import ShowMode
 from aiogram_dialog.manager.bg_manager import BgManagerFactoryImpl
 from aiohttp import web
+from tortoise.transactions import in_transaction
 
 from bot.handlers import mainloop_dialog
-from db.models import Game, KillEvent, User
-from services import settings, texts
+from bot.handlers.mainloop.getters import build_dossier
+from db.models import KillEvent, PlayerAssignment, User
+from db.routing import replica_safe
+from services import assignments, settings, texts
 from services.admin_chat import AdminChatService
+from services.dossier import dossier_cards
+from services.hot_cache import hot_cache
+from services.menu_snapshot import menu_snapshots
 from services.states import MainLoop
+from services.tracing import tracer
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -23,29 +30,30 @@ def setup_matchmaking_routers(app: web.Application, bot: Bot) -> None:
     app.router.add_get("/restore", handler=get_queue_info)
 
 
+@replica_safe
 async def get_queue_info(request: web.Request) -> web.StreamResponse:
-    # по сути все игроки которые is_in_game, но у которых нету цели/нет убийцы подлежат помещению в очередь на матчмейкинг
-    # можно сделать уебищную логику через все кто не в KillEvent, но надо TODO: добавить схему очереди в дб
+    # все игроки в игре, у которых нет цели/нет убийцы, подлежат помещению в очередь на матчмейкинг
     if request.headers.get("secret-key") != request.app["settings"].secret_key:
         return web.StreamResponse(status=403)
-    game = await Game.filter(end_date=None).first()
-    found_victims = set()
-    found_killers = set()
-    for ke in await KillEvent.filter(game=game).all():
-        found_killers.add(ke.killer)
-        found_victims.add(ke.victim)
-    potential_killers = await User.filter(is_in_game=True, id__not_in=found_killers).all()
-    potential_victims = await User.filter(is_in_game=True, id__not_in=found_victims).all()
+    game = await hot_cache.active_game()
+    in_game = PlayerAssignment.filter(game=game, user__is_in_game=True)
+    potential_killers = await in_game.filter(target_event_id=None).values_list("user__tg_id", flat=True)
+    potential_victims = await in_game.filter(hunter_event_id=None).values_list("user__tg_id", flat=True)
     return web.json_response(
         status=200,
         data={
-            "killers_queue": [i.tg_id for i in potential_killers],
-            "victims_queue": [i.tg_id for i in potential_victims],
+            "killers_queue": potential_killers,
+            "victims_queue": potential_victims,
         },
     )
 
 
 async def handle_match(request: web.Request) -> web.StreamResponse:
+    with tracer.trace("http:/match"):
+        return await _handle_match(request)
+
+
+async def _handle_match(request: web.Request) -> web.StreamResponse:
     data = await request.json()
     bot: Bot = request.app["bot"]
 
@@ -57,15 +65,37 @@ async def handle_match(request: web.Request) -> web.StreamResponse:
     killer_user, _ = await User.get_or_create(tg_id=int(data["killer"]))
     victim_user, _ = await User.get_or_create(tg_id=int(data["victim"]))
 
-    game = await Game.filter(end_date=None).first()
+    game = await hot_cache.active_game()
 
-    ke = await KillEvent.create(
-        game=game,
-        killer=killer_user,
-        victim=victim_user,
-        status="pending",
-        is_approved=False,
-    )
+    try:
+        async with in_transaction() as conn:
+            ke = await KillEvent.create(
+                game=game,
+                killer=killer_user,
+                victim=victim_user,
+                status="pending",
+                is_approved=False,
+                using_db=conn,
+            )
+            await assignments.assign(ke, using_db=conn)
+    except assignments.AssignmentTakenError:
+        # Матч откатился целиком: у одного из игроков уже есть pending-событие в этой роли. Отвечаем 200:
+        # матчмейкер повторяет запрос, пока не получит 200, и на другом коде крутился бы без конца
+        logger.warning("Матч %s -> %s отклонен: слот уже занят", killer_user.tg_id, victim_user.tg_id)
+        try:
+            await request.app["admin_chat"].send_message(
+                key="logs",
+                text=texts.render(
+                    "matchmaking.assignment_taken",
+                    killer=killer_user.profile_link(),
+                    victim=victim_user.profile_link(),
+                ),
+            )
+        except Exception as e:
+            logger.exception(e)
+        return web.StreamResponse(status=200)
+    await dossier_cards.put(ke.id, build_dossier(victim_user))
+    await menu_snapshots.invalidate(game.id, killer_user.tg_id, victim_user.tg_id)
 
     try:
         await request.app["admin_chat"].send_message(
@@ -10,7 +10,10 @@ from datetime import datetime
 from aiohttp import web
 from aiohttp.web import Request, Response
 
+from db.instrumentation import track_queries
+from db.routing import replica_reads
 from services import settings
+from services.loop_monitor import loop_monitor
 from services.metrics import metrics
 
 logger = logging.getLogger(__name__)
@@ -23,7 +26,8 @@ async def metrics_endpoint(request: Request) -> Response:
     """
     try:
         # Update metrics from database before serving
-        await metrics.update_all_metrics()
+        with replica_reads():
+            await metrics.update_all_metrics()
 
         # Generate and return metrics
         metrics_data: bytes = metrics.get_metrics()
@@ -69,6 +73,16 @@ async def health_check(request: Request) -> Response:
         )
 
 
+async def debug_tasks(request: Request) -> Response:
+    """
+    Debug-only dump of asyncio tasks and recent event loop stalls.
+    """
+    parts = [loop_monitor.dump_tasks()]
+    for slow in loop_monitor.slow_callbacks:
+        parts.append(f"--- blocked {slow.blocked_for * 1000:.0f} ms at {slow.detected_at.isoformat()}\n{slow.stack}")
+    return Response(text="\n\n".join(parts), content_type="text/plain")
+
+
 def setup_metrics_routes(app: web.Application) -> None:
     """
     Set up metrics and health check routes.
@@ -76,6 +90,9 @@ def setup_metrics_routes(app: web.Application) -> None:
     app.router.add_get("/metrics", metrics_endpoint)
     app.router.add_get("/health", health_check)
     logger.info("Metrics routes configured: /metrics, /health")
+    if settings.debug:
+        app.router.add_get("/debug/tasks", debug_tasks)
+        logger.info("Debug route configured: /debug/tasks")
 
 
 class MetricsUpdater:
@@ -112,7 +129,12 @@ class MetricsUpdater:
         """Main update loop."""
         while self._running:
             try:
-                await metrics.update_all_metrics()
+                with (
+                    metrics.track_operation("job:metrics_update"),
+                    track_queries("metrics_update"),
+                    replica_reads(),
+                ):
+                    await metrics.update_all_metrics()
                 await asyncio.sleep(self.update_interval)
             except asyncio.CancelledError:
                 break
@@ -22,6 +22,7 @@ from bot.handlers.registration_dialog import (
     reg_getter,
     hugging_allowed_label,
 )
+from bot.middlewares.route_index import PRIVATE_ONLY
 from db.models import PendingProfile, User
 from services import texts
 from services.admin_chat import AdminChatService
@@ -32,6 +33,7 @@ from services.strings import SafeStringConfig, is_safe, normalize_name_component
 logger = logging.getLogger(__name__)
 
 router = Router()
+route_scope = PRIVATE_ONLY
 
 
 FIELD_LABELS = texts.PROFILE_FIELD_LABELS
@@ -8,10 +8,14 @@ from aiogram_dialog.widgets.kbd import Button, Column
 from aiogram_dialog.widgets.text import Const
 
 from bot.handlers import mainloop_dialog
+from bot.middlewares.route_index import PRIVATE_ONLY
 from db.models import Game, Player, User
-from services import texts
+from services import assignments, texts
+from services.leaderboard import leaderboards
 from services.logging import log_dialog_action
 from services.matchmaking import MatchmakingService
+from services.menu_snapshot import menu_snapshots
+from services.metrics import metrics
 from services.states import MainLoop
 from services.states.participation import ParticipationForm
 from services.user_exit import format_exit_cooldown, is_exit_cooldown_active
@@ -19,6 +23,7 @@ from services.user_exit import format_exit_cooldown, is_exit_cooldown_active
 logger = logging.getLogger(__name__)
 
 router = Router()
+route_scope = PRIVATE_ONLY
 
 
 @log_dialog_action("CONFIRM_PARTICIPATION")
@@ -40,12 +45,15 @@ async def confirm_participation(callback: CallbackQuery, button: Button, manager
         user=user,
         game=game,
     )
+    await assignments.ensure_assignment(player)
+    await leaderboards.update_ratings(player)
     logger.debug(
         "Created player for user %s game %s with id %s",
         user.id,
         game.id,
         player.id,
     )
+    metrics.increment_player_join(game.id)
     await callback.message.delete()
     await manager.done()
     await manager.reset_stack()
@@ -62,6 +70,7 @@ async def confirm_participation(callback: CallbackQuery, button: Button, manager
         "group_name": user.group_name,
     }
     await matchmaking.add_player_to_queues(player_id=user.tg_id, player_data=player_data)
+    await menu_snapshots.invalidate(game.id, user.tg_id)
     await user_dialog_manager.start(
         MainLoop.title,
         data={"user_tg_id": user.tg_id, "game_id": (game and game.id) or None},
@@ -1,4 +1,3 @@
-import asyncio
 import contextlib
 import html
 import re
@@ -23,12 +22,19 @@ from aiogram_dialog import ShowMode
 from aiogram_dialog.manager.bg_manager import BgManagerFactoryImpl
 
 from bot.handlers import mainloop_dialog
+from bot.handlers.mainloop.getters import build_dossier
 from bot.handlers.registration_dialog import COURSE_TYPES
+from bot.middlewares.route_index import RouteScope
 from db.models import Game, PendingProfile, User
-from services import settings, texts
+from services import assignments, settings, texts
+from services.deferred import deferred
+from services.dossier import dossier_cards
+from services.hot_cache import hot_cache
+from services.menu_snapshot import menu_snapshots
 from services.states import MainLoop, ProfileModeration
 
 router = Router(name="profile_moderation")
+route_scope = RouteScope(chat_types=("private",), chat_keys=("logs",))
 
 _CONFIRM_PREFIX = "confirm_pending:"
 _DENY_PREFIX = "deny_pending:"
@@ -45,12 +51,14 @@ def _moderator_name(tg_user) -> str:
     return html.escape(full_name)
 
 
+_PENDING_ID_RE = re.compile(
+    r"(?P<uuid>[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-"
+    r"[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})"
+)
+
+
 def _extract_pending_id_from_text(text: str) -> UUID | None:
-    match = re.search(
-        r"(?P<uuid>[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-"
-        r"[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})",
-        text or "",
-    )
+    match = _PENDING_ID_RE.search(text or "")
     if not match:
         return None
     try:
@@ -74,7 +82,10 @@ def _extract_pending_id_from_message(message: Message) -> UUID | None:
     return None
 
 
-def _has_pending_id(message: Message) -> bool:
+async def _has_pending_id(message: Message) -> bool:
+    # причину отказа пишут только модераторы: остальным сообщениям регулярка не нужна
+    if message.from_user is None or message.from_user.id not in await hot_cache.admin_ids():
+        return False
     return _extract_pending_id_from_message(message) is not None
 
 
@@ -179,9 +190,25 @@ async def _apply_pending_profile(pending: PendingProfile) -> User:
     if "family_name" in pending.changed_fields and pending.family_name:
         user.family_name_required = False
     await user.save()
+    if not pending.is_new_profile:
+        await _refresh_target_card(user)
     return user
 
 
+async def _refresh_target_card(user: User) -> None:
+    """Профиль показан на карточке цели у охотника: пересобираем карточку и его снимок меню."""
+    game = await hot_cache.active_game()
+    if not game:
+        return
+    _, hunter_event = await assignments.get_current_events(game.id, user.id)
+    if hunter_event is None:
+        return
+    await dossier_cards.put(hunter_event.id, build_dossier(user))
+    hunter_tg_id = await User.filter(id=hunter_event.killer_id).first().values_list("tg_id", flat=True)
+    if hunter_tg_id is not None:
+        await menu_snapshots.invalidate(game.id, hunter_tg_id)
+
+
 async def _edit_admin_message(
     bot: Bot,
     pending: PendingProfile,
@@ -301,9 +328,7 @@ async def _block_if_not_admin(callback: CallbackQuery) -> bool:
     Returns True if processing should stop (user is not admin).
     Shows an alert popup to the user.
     """
-    user_id = callback.from_user.id
-    user_obj = await User.get_or_none(tg_id=user_id)
-    if not user_obj or not user_obj.is_admin:
+    if callback.from_user.id not in await hot_cache.admin_ids():
         await callback.answer(texts.get("moderation.no_rights"), show_alert=True)
         return True
     return False
@@ -455,22 +480,27 @@ async def on_deny_profile(callback: CallbackQuery, bot: Bot, state: FSMContext):
     await user_state.set_state(ProfileModeration.waiting_reason)
     await user_state.update_data(pending_id=str(pending.id))
 
-    initial_updated = pending.updated_at
-
-    async def _timeout_notify() -> None:
-        await asyncio.sleep(600)
-        fresh = await PendingProfile.filter(id=pending.id).prefetch_related("user").first()
-        if not fresh:
-            return
-        if fresh.status != "rejected":
-            return
-        if fresh.reason is not None:
-            return
-        if fresh.updated_at != initial_updated:
-            return
-        await _notify_user_rejection(bot, fresh, None)
-
-    asyncio.create_task(_timeout_notify())
+    await deferred.schedule(
+        "rejection_reason_timeout",
+        600,
+        pending_id=str(pending.id),
+        initial_updated=pending.updated_at.isoformat(),
+    )
+
+
+@deferred.handler("rejection_reason_timeout")
+async def _timeout_notify(pending_id: str, initial_updated: str) -> None:
+    """Модератор так и не написал причину отказа: сообщаем пользователю без нее."""
+    fresh = await PendingProfile.filter(id=pending_id).prefetch_related("user").first()
+    if not fresh:
+        return
+    if fresh.status != "rejected":
+        return
+    if fresh.reason is not None:
+        return
+    if fresh.updated_at != datetime.fromisoformat(initial_updated):
+        return
+    await _notify_user_rejection(settings.bot, fresh, None)
 
 
 @router.message(
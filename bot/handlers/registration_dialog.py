@@ -11,10 +11,12 @@ from aiogram_dialog.widgets.kbd import Button, Column, Group
 from aiogram_dialog.widgets.text import Const, Format
 
 from bot.filters.confirmed import PendingFilter, ProfileNonexistentFilter
+from bot.middlewares.route_index import RouteScope
 from db.models import PendingProfile, User
 from services import texts
 from services.admin_chat import AdminChatService
 from services.logging import log_dialog_action
+from services.metrics import metrics
 from services.states import RegisterForm
 from services.states.rules import RulesStates
 from services.strings import SafeStringConfig, build_full_name, is_safe, normalize_name_component
@@ -22,6 +24,7 @@ from services.strings import SafeStringConfig, build_full_name, is_safe, normali
 logger = logging.getLogger(__name__)
 
 router = Router()
+route_scope = RouteScope(chat_types=("private",), commands=True)
 
 # ---------------------------------------------
 # CONSTANTS
@@ -204,6 +207,7 @@ async def on_final_confirmation(c: CallbackQuery, b: Button, manager: DialogMana
         ],
         submitted_username=tg_user.username,
     )
+    metrics.increment_user_registration()
 
     # Notify admin
     text = texts.render(
@@ -11,11 +11,13 @@ from aiogram_dialog.widgets.kbd import Button, Cancel
 from aiogram_dialog.widgets.text import Const
 
 from bot.handlers import mainloop_dialog
-from db.models import Chat, KillEvent, Player, User
-from services import settings
+from bot.middlewares.route_index import PRIVATE_ONLY
+from db.models import Player, User
+from services import assignments, settings
 from services import texts
-from services.ban import modify_rating
-from services.kills_confirmation import add_back_to_queues
+from services.ban import after_rating_change
+from services.hot_cache import hot_cache
+from services.kills_confirmation import add_back_to_queues, reject_kill
 from services.states import MainLoop
 from services.states.reroll import Reroll
 from services.strings import trim_name
@@ -23,6 +25,7 @@ from services.strings import trim_name
 logger = logging.getLogger(__name__)
 
 router = Router()
+route_scope = PRIVATE_ONLY
 
 
 async def notify_player(user: User, bot: Bot, manager: DialogManager, delta: float):
@@ -61,7 +64,7 @@ async def notify_chat(
     killer_display = killer.full_name or killer.tg_username or texts.get("common.unknown")
     victim_display = victim.full_name or victim.tg_username or texts.get("common.unknown")
     await bot.send_message(
-        chat_id=(await Chat.get(key="discussion")).chat_id,
+        chat_id=(await hot_cache.chat("discussion")).chat_id,
         text=texts.render(
             "reroll.chat_notified",
             killer=killer.mention_html(),
@@ -97,21 +100,21 @@ def calculate_penalty(creation: datetime) -> float:
 
 async def on_confirm_reroll(c: CallbackQuery, b: Button, m: DialogManager):
     requester_user: User = m.middleware_data["user"]
-    killer_player: Player = await Player.get_or_none(user_id=requester_user.id, game_id=m.start_data["game_id"])
-    kill_event: KillEvent = await KillEvent.get_or_none(
-        game_id=m.start_data["game_id"],
-        killer_id=requester_user.id,
-        status="pending",
-    ).prefetch_related("killer", "victim")
-    kill_event.status = "rejected"
-    await kill_event.save()
-
-    victim_player: Player = await Player.get_or_none(game_id=m.start_data["game_id"], user_id=kill_event.victim.id)
-
+    kill_event, _ = await assignments.get_current_events(m.start_data["game_id"], requester_user.id)
+    if kill_event is None:
+        await c.answer(texts.get("reroll.no_target"))
+        return
+    result = await reject_kill(kill_event.id, calculate_penalty(kill_event.created_at))
+    if result is None or not result.changed:
+        # событие успели закрыть (подтверждение, таймаут): реролл уже не нужен
+        await c.answer(texts.get("reroll.no_target"))
+        return
+
+    # все записи уже закоммичены: дальше только побочные эффекты
+    kill_event = result.kill_event
+    killer_player, victim_player = result.killer_player, result.victim_player
     logger.debug(kill_event)
-    killer_delta, victim_delta = await modify_rating(
-        killer_player, victim_player, 0, 1, calculate_penalty(kill_event.created_at)
-    )
+    await after_rating_change(killer_player, victim_player)
     await add_back_to_queues(kill_event.killer, kill_event.victim, killer_player, victim_player)
     await notify_chat(
         c.bot,
@@ -119,11 +122,11 @@ async def on_confirm_reroll(c: CallbackQuery, b: Button, m: DialogManager):
         kill_event.victim,
         killer_player,
         victim_player,
-        killer_delta,
-        victim_delta,
+        result.killer_delta,
+        result.victim_delta,
     )
-    await notify_player(kill_event.killer, c.bot, m, killer_delta)
-    await notify_player(kill_event.victim, c.bot, m, victim_delta)
+    await notify_player(kill_event.killer, c.bot, m, result.killer_delta)
+    await notify_player(kill_event.victim, c.bot, m, result.victim_delta)
 
 
 router.include_router(
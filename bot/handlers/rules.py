@@ -5,12 +5,14 @@ from aiogram_dialog import Dialog, Window
 from aiogram_dialog.widgets.kbd import Cancel
 from aiogram_dialog.widgets.text import Const
 
+from bot.middlewares.route_index import PRIVATE_ONLY
 from services import texts
 from services.states.rules import RulesStates
 
 logger = logging.getLogger(__name__)
 
 router = Router()
+route_scope = PRIVATE_ONLY
 
 RULES = texts.get("rules.body")
 RULES_PROFILE = texts.get("rules.profile")
@@ -1,40 +1,53 @@
 import asyncio
 import importlib
-import json
 import logging
 import os
+import signal
 from collections.abc import Iterable
+from functools import partial
 from pathlib import Path
 from types import ModuleType
 from urllib.parse import urlparse
-from uuid import UUID
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.base import DefaultKeyBuilder
-from aiogram.fsm.storage.redis import RedisStorage
 from aiogram_dialog import setup_dialogs
 from aiohttp import web
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
-from redis.asyncio import Redis
 
 from bot.handlers.matchmaking import setup_matchmaking_routers
 from bot.handlers.metrics import metrics_updater, setup_metrics_routes
 from bot.middlewares.environment import EnvironmentMiddleware
 from bot.middlewares.game import GameMiddleware
 from bot.middlewares.logging import VerboseLoggingMiddleware
+from bot.middlewares.metrics import MetricsMiddleware, UpdateMetricsMiddleware
 from bot.middlewares.private_messages import PrivateMessagesMiddleware
 from bot.middlewares.register import RegisterUserMiddleware
+from bot.middlewares.route_index import route_index
+from bot.middlewares.telegram_api import TelegramApiMetricsMiddleware
+from bot.middlewares.tracing import TracingMiddleware
+from bot.middlewares.update_scheduler import update_scheduler
 from bot.middlewares.user import UserMiddleware
+from bot.webhook import QueuedRequestHandler
 from db.main import close_db, init_db
-from services import settings
-from services.discussion_invite import (
-    generate_discussion_invite_link,
-    revoke_discussion_invite_link,
-)
+from db.routing import replica_monitor
+from services import settings, texts
+from services.background import background
+from services.deferred import deferred
+from services.discussion_invite import discussion_invite
+from services.fsm_storage import CodecRedisStorage, build_events_isolation, build_storage_codec
+from services.hot_cache import hot_cache
 from services.kill_timeout import kill_timeout_monitor
+from services.leader import leader
+from services.log_pipeline import setup_logging
+from services.loop_monitor import loop_monitor
 from services.matchmaking import MatchmakingService
+from services.redis import redis
+from services.redis_sweeper import redis_sweeper
+from services.startup import StartupStep, run_startup
+from services.tracing import tracer
+from services.update_dedup import update_dedup
 
 logger = logging.getLogger(__name__)
 
@@ -43,11 +56,17 @@ HANDLERS_PATH = Path(__file__).parent / "handlers"
 
 
 def register_all_middlewares(dp: Dispatcher) -> None:
+    dp.update.outer_middleware(update_scheduler)
+    dp.update.middleware(TracingMiddleware())
+    dp.update.middleware(UpdateMetricsMiddleware())
     dp.update.middleware(UserMiddleware())
     dp.update.middleware(VerboseLoggingMiddleware())
+    dp.callback_query.middleware(MetricsMiddleware())
     dp.callback_query.middleware(UserMiddleware())
     dp.callback_query.middleware(GameMiddleware())
     dp.update.middleware(EnvironmentMiddleware(dispatcher=dp))
+    dp.message.outer_middleware(route_index)
+    dp.message.middleware(MetricsMiddleware())
     dp.message.middleware(RegisterUserMiddleware())
     dp.message.middleware(PrivateMessagesMiddleware("/stats", "/rollbackkill"))
 
@@ -67,6 +86,9 @@ def register_all_handlers(dp: Dispatcher) -> None:
         router = getattr(module, "router", None)
         if router is None:
             continue
+        route_index.add(
+            module.__name__.removeprefix(f"{HANDLERS_PACKAGE}."), router, getattr(module, "route_scope", None)
+        )
         routers.append(router)
 
     if routers:
@@ -77,6 +99,10 @@ def register_all_handlers(dp: Dispatcher) -> None:
 
 # Global web server instance
 _web_server: web.AppRunner | None = None
+_webhook_handler: QueuedRequestHandler | None = None
+
+# Сколько ждать уже начатые HTTP-запросы (вебхук, матчмейкинг) при остановке веб-сервера
+WEB_SHUTDOWN_TIMEOUT = 5.0
 
 
 def _normalize_webhook_path() -> str:
@@ -93,21 +119,52 @@ def _normalize_webhook_path() -> str:
     return path
 
 
+def _setup_dispatcher_hooks(app: web.Application, dp: Dispatcher, bot: Bot) -> None:
+    """
+    Запуск и остановка диспетчера вместе с веб-сервером вебхука.
+
+    В отличие от setup_application из aiogram, остановка висит на on_cleanup, а не на on_shutdown: aiohttp
+    вызывает on_shutdown до того, как дождется начатых запросов, и тогда /match и вебхук дорабатывали бы
+    на уже закрытых пулах базы и Redis. on_cleanup идет после ожидания (AppRunner(shutdown_timeout=...)).
+    """
+    workflow_data = {"app": app, "dispatcher": dp, "bot": bot, **dp.workflow_data}
+
+    async def on_startup(_: web.Application) -> None:
+        await dp.emit_startup(**workflow_data)
+
+    async def on_cleanup(_: web.Application) -> None:
+        await dp.emit_shutdown(**workflow_data)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+
 async def start_web_server(bot: Bot, dp: Dispatcher) -> None:
     """Start the HTTP web server for metrics/matchmaking and webhook endpoints."""
-    global _web_server
+    global _web_server, _webhook_handler
 
     app = web.Application()
     setup_metrics_routes(app)
     setup_matchmaking_routers(app, bot)
     if settings.webhook_url:
         webhook_path = _normalize_webhook_path()
-        SimpleRequestHandler(dispatcher=dp, bot=bot).register(app, path=webhook_path)
-        setup_application(app, dp, bot=bot)
+        _webhook_handler = QueuedRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            dedup=update_dedup,
+            store=redis,
+            queue_size=settings.webhook_queue_size,
+            workers=settings.webhook_workers,
+        )
+        _webhook_handler.register(app, path=webhook_path)
+        _setup_dispatcher_hooks(app, dp, bot)
         logger.info("Webhook endpoint registered on %s", webhook_path)
 
-    runner = web.AppRunner(app)
+    runner = web.AppRunner(app, shutdown_timeout=WEB_SHUTDOWN_TIMEOUT)
     await runner.setup()
+    if _webhook_handler:
+        # После setup(): on_startup уже поднял базу, можно разбирать сохраненные апдейты
+        await _webhook_handler.start()
 
     site = web.TCPSite(runner, "0.0.0.0", settings.web_server_port)
     await site.start()
@@ -129,81 +186,124 @@ async def stop_web_server() -> None:
         logger.info("HTTP web server stopped")
 
 
-async def on_startup(bot: Bot) -> None:
-    await init_db()
-    await generate_discussion_invite_link(bot)
-    await metrics_updater.start()
+async def _start_serving(bot: Bot) -> None:
+    if settings.dispatcher is None:
+        raise RuntimeError("Dispatcher is not initialized")
     if settings.webhook_url:
-        if settings.dispatcher is None:
-            raise RuntimeError("Dispatcher is not initialized for webhook setup")
         await bot.set_webhook(
             url=settings.webhook_url,
             allowed_updates=settings.dispatcher.resolve_used_update_types(),
         )
     else:
-        if settings.dispatcher is None:
-            raise RuntimeError("Dispatcher is not initialized for polling setup")
         await start_web_server(bot, settings.dispatcher)
-    await MatchmakingService().healthcheck()
-    await MatchmakingService().reset_queues()
-    await kill_timeout_monitor.start(bot)
 
 
-async def on_shutdown(bot: Bot) -> None:
-    await kill_timeout_monitor.stop()
-    await revoke_discussion_invite_link(bot)
-    if settings.webhook_url:
-        await bot.delete_webhook()
-    else:
-        await stop_web_server()
-    await metrics_updater.stop()
-    await close_db()
+async def _prepare_matchmaking() -> None:
+    matchmaking = MatchmakingService()
+    await matchmaking.healthcheck()
+    await matchmaking.reset_queues()
 
 
-class EnhancedJSONEncoder(json.JSONEncoder):
-    """JSON encoder that supports UUID."""
+def _register_leader_jobs(bot: Bot) -> None:
+    """Задачи, которые должны идти в одном экземпляре на все реплики."""
+    leader.add_job("invite_link", partial(discussion_invite.ensure, bot))
+    leader.add_job("metrics_updater", metrics_updater.start, metrics_updater.stop)
+    leader.add_job("redis_sweeper", redis_sweeper.start, redis_sweeper.stop)
+    leader.add_job("kill_timeout_monitor", partial(kill_timeout_monitor.start, bot), kill_timeout_monitor.stop)
+    leader.add_job("deferred", deferred.start, deferred.stop)
 
-    def default(self, obj):
-        if isinstance(obj, UUID):
-            return {"__uuid__": str(obj)}
-        return super().default(obj)
 
+async def on_startup(bot: Bot) -> None:
+    _register_leader_jobs(bot)
+    await run_startup(
+        [
+            StartupStep("loop_monitor", loop_monitor.start),
+            StartupStep("texts", partial(asyncio.to_thread, texts.validate_call_sites)),
+            StartupStep("db", init_db),
+            StartupStep("matchmaking", _prepare_matchmaking),
+            StartupStep("replica_monitor", replica_monitor.start, after=("db",)),
+            StartupStep("hot_cache", hot_cache.warm, after=("db",)),
+            StartupStep("hot_cache_sync", hot_cache.start),
+            StartupStep("leader", leader.start, after=("db", "matchmaking")),
+            # Апдейты начинают приходить только когда база, кэш и очереди готовы
+            StartupStep("serving", partial(_start_serving, bot), after=("texts", "hot_cache", "matchmaking")),
+        ]
+    )
 
-def enhanced_json_loader(data: str):
-    """JSON loader that restores UUIDs."""
 
-    def object_hook(obj):
-        if "__uuid__" in obj:
-            return UUID(obj["__uuid__"])
-        return obj
+async def _drain() -> None:
+    """
+    Доделать начатое перед остановкой: апдейты из очереди вебхука, апдейты в обработке и фоновые задачи.
 
-    return json.loads(data, object_hook=object_hook)
+    Новые апдейты к этому моменту уже не приходят (polling остановлен, веб-сервер закрыт). Все ждут общий
+    дедлайн SHUTDOWN_DRAIN_TIMEOUT_SECONDS; неначатые апдейты вебхука сохраняются в Redis, остальное бросается.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.shutdown_drain_timeout
 
+    webhook = (0, 0, 0)
+    if _webhook_handler:
+        webhook = await _webhook_handler.drain(deadline - loop.time())
+    in_flight = update_scheduler.pending
+    await update_scheduler.wait_idle(deadline - loop.time())
+    tasks_done, tasks_abandoned = await background.drain(deadline - loop.time())
 
-def enhanced_json_dumper(obj) -> str:
-    """JSON dumper that serializes UUIDs."""
-    return json.dumps(obj, cls=EnhancedJSONEncoder)
+    logger.info(
+        "Остановка: апдейтов вебхука обработано %s, сохранено %s, брошено %s; апдейтов в обработке было %s, "
+        "брошено %s; фоновых задач завершено %s, брошено %s",
+        *webhook,
+        in_flight,
+        update_scheduler.pending,
+        tasks_done,
+        tasks_abandoned,
+    )
+
+
+async def on_shutdown(bot: Bot) -> None:
+    if not settings.webhook_url:
+        await stop_web_server()
+    # Фоновые задачи ведущей реплики (и прием отложенных действий) останавливаем до ожидания
+    await leader.stop()
+    await _drain()
+    # Вебхук общий для всех реплик: снимать его при остановке одной из них нельзя
+    if settings.webhook_url and not settings.multi_replica:
+        await bot.delete_webhook()
+    await hot_cache.stop()
+    await replica_monitor.stop()
+    await close_db()
+    await loop_monitor.stop()
+    tracer.shutdown()
+
+
+async def _wait_for_stop_signal() -> None:
+    """В режиме вебхука сигналы ловит не aiogram: без этого SIGTERM убивает процесс, минуя on_shutdown."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    logger.info("Получен сигнал остановки")
 
 
 async def run_bot() -> None:
-    storage = RedisStorage(
-        redis=Redis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            password=settings.redis_password,
-            db=settings.redis_db,
-        ),
+    if settings.multi_replica and not settings.webhook_url:
+        # getUpdates отдает апдейты только одному получателю, остальные реплики получат конфликт
+        raise RuntimeError("MULTI_REPLICA работает только с вебхуком (BOT_WEBHOOK_URL)")
+
+    storage = CodecRedisStorage(
+        redis=redis,
+        codec=build_storage_codec(),
+        context_ttl=settings.fsm_context_ttl,
         key_builder=DefaultKeyBuilder(
             with_destiny=True,
         ),
-        json_dumps=enhanced_json_dumper,
-        json_loads=enhanced_json_loader,
     )
 
     bot = Bot(
         token=settings.bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    bot.session.middleware(TelegramApiMetricsMiddleware())
     dp = Dispatcher(storage=storage)
 
     settings.bot = bot
@@ -211,7 +311,7 @@ async def run_bot() -> None:
 
     register_all_middlewares(dp)
     register_all_handlers(dp)
-    setup_dialogs(dp)
+    setup_dialogs(dp, events_isolation=build_events_isolation(storage))
 
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
@@ -219,7 +319,7 @@ async def run_bot() -> None:
     if settings.webhook_url:
         try:
             await start_web_server(bot, dp)
-            await asyncio.Event().wait()
+            await _wait_for_stop_signal()
         finally:
             await stop_web_server()
             await dp.storage.close()
@@ -233,11 +333,7 @@ async def run_bot() -> None:
 
 
 async def main() -> None:
-    logging.basicConfig(
-        level=os.environ.get("LOGLEVEL", "INFO").upper(),
-        format="%(levelname)s:\t[%(asctime)s] - %(message)s",
-        # format="%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s",
-    )
+    setup_logging(os.environ.get("LOGLEVEL", "INFO").upper())
     logger.info("Запущен бот в проекте: %s", settings.project_name)
 
     await run_bot()
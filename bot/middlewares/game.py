@@ -4,7 +4,7 @@ from typing import Any
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
-from db.models import Game
+from services.hot_cache import hot_cache
 
 
 class GameMiddleware(BaseMiddleware):
@@ -14,4 +14,4 @@ class GameMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: dict[str, Any],
     ) -> Any:
-        return await handler(event, {**data, "game": await Game.filter(end_date=None).first()})
+        return await handler(event, {**data, "game": await hot_cache.active_game()})
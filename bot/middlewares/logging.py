@@ -1,31 +1,51 @@
 import logging
 
 from aiogram import BaseMiddleware
-from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+from aiogram.types import Update
+
+from services.log_pipeline import Lazy, measure_update
 
 logger = logging.getLogger("user_actions")
 
 
 class VerboseLoggingMiddleware(BaseMiddleware):
-    async def __call__(self, handler, event: TelegramObject, data: dict):
-        if isinstance(event, Message):
+    async def __call__(self, handler, event: Update, data: dict):
+        with measure_update():
+            self._log(event)
+            return await handler(event, data)
+
+    @staticmethod
+    def _log(event: Update) -> None:
+        if event.message is not None:
+            message = event.message
             logger.info(
-                "MESSAGE: user=%s chat=%s text=%r",
-                event.from_user.id,
-                event.chat.id,
-                event.text,
+                "MESSAGE",
+                extra={
+                    "fields": {
+                        "user": message.from_user.id if message.from_user else None,
+                        "chat": message.chat.id,
+                        "text": message.text,
+                    }
+                },
             )
 
-        elif isinstance(event, CallbackQuery):
+        elif event.callback_query is not None and event.callback_query.message is not None:
+            callback = event.callback_query
             logger.info(
-                "CALLBACK: user=%s chat=%s data=%r message_id=%s",
-                event.from_user.id,
-                event.message.chat.id,
-                event.data,
-                event.message.message_id,
+                "CALLBACK",
+                extra={
+                    "fields": {
+                        "user": callback.from_user.id,
+                        "chat": callback.message.chat.id,
+                        "data": callback.data,
+                        "message_id": callback.message.message_id,
+                    }
+                },
             )
 
-        elif isinstance(event, Update):
-            logger.debug("RAW UPDATE: %r", event.dict())
-
-        return await handler(event, data)
+        # Дамп апдейта строится, только если DEBUG включен и запись прошла выборку
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "RAW UPDATE",
+                extra={"fields": {"update": Lazy(lambda: event.model_dump(mode="json", exclude_none=True))}},
+            )
@@ -0,0 +1,63 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.filters import CommandObject
+from aiogram.types import TelegramObject, Update
+
+from bot.filters.admin import AdminFilter
+from db.instrumentation import track_queries
+from services.metrics import metrics
+
+
+def _handler_name(handler: HandlerObject | None) -> str:
+    if handler is None:
+        return "unknown"
+    callback = handler.callback
+    return getattr(callback, "__qualname__", None) or type(callback).__name__
+
+
+def _is_admin_handler(handler: HandlerObject | None) -> bool:
+    if handler is None or not handler.filters:
+        return False
+    return any(isinstance(f.callback, AdminFilter) for f in handler.filters)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: к моменту вызова фильтры уже прошли и в data лежит выбранный хендлер,
+    поэтому время и исход считаем отдельно для каждого хендлера.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object: HandlerObject | None = data.get("handler")
+        metrics.increment_message_processed(type(event).__name__)
+
+        command = data.get("command")
+        if isinstance(command, CommandObject):
+            metrics.increment_command_executed(command.command)
+            if _is_admin_handler(handler_object):
+                metrics.increment_admin_action(f"command:{command.command}")
+
+        with metrics.track_operation(f"handler:{_handler_name(handler_object)}"):
+            return await handler(event, data)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Апдейт целиком: общее время обработки и число запросов в базу."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        event_type = event.event_type
+        with metrics.track_operation(f"update:{event_type}"), track_queries(event_type):
+            return await handler(event, data)
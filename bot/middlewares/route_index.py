@@ -0,0 +1,106 @@
+"""
+Предварительный отбор роутеров для входящих сообщений.
+
+aiogram проверяет сообщение фильтрами обработчиков всех роутеров по очереди, пока какой-нибудь не сработает.
+Поэтому каждое сообщение из обсуждения игры, которое боту не нужно, проходило фильтры всех диалогов и
+регулярное выражение profile_moderation.
+
+Модуль обработчиков может объявить рядом с router область route_scope (RouteScope): в каких чатах его сообщения
+вообще могут сработать. RouteIndex стоит внешним middleware сообщений. Для каждого сообщения он один раз
+вычисляет ключ: тип чата, системный чат по id (ключ из таблицы chats через hot_cache) и команда ли это. По ключу
+он находит набор роутеров, которые могут его обработать; наборы кэшируются по ключу. Роутер вне набора
+отсеивается фильтром уровня роутера, одной проверкой по множеству, вместе со своими диалогами. Роутеры без
+области проверяются как раньше.
+
+cukiller_router_filter_total[router, result] показывает, сколько сообщений роутер проверил своими фильтрами
+(evaluated) и сколько отсеял индекс (skipped).
+"""
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram import BaseMiddleware, Router
+from aiogram.filters import Filter
+from aiogram.types import Message
+
+from services.hot_cache import SYSTEM_CHATS, hot_cache
+from services.metrics import metrics
+
+RouteKey = tuple[str, str | None, bool]
+
+
+@dataclass(frozen=True)
+class RouteScope:
+    """
+    Где роутер может сработать на сообщение: типы чатов (chat_types) и системные чаты по ключу (chat_keys).
+
+    commands=True пропускает команды из любого чата: на них в группе PrivateMessagesMiddleware отвечает,
+    что бот работает только в личке.
+    """
+
+    chat_types: tuple[str, ...] = ()
+    chat_keys: tuple[str, ...] = ()
+    commands: bool = False
+
+    def matches(self, chat_type: str, chat_key: str | None, is_command: bool) -> bool:
+        if self.commands and is_command:
+            return True
+        return chat_type in self.chat_types or (chat_key is not None and chat_key in self.chat_keys)
+
+
+PRIVATE_ONLY = RouteScope(chat_types=("private",))
+
+
+class _InRoutes(Filter):
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    async def __call__(self, message: Message, routes: frozenset[str] | None = None, **kwargs) -> bool:
+        if routes is not None and self.name not in routes:
+            metrics.increment_router_filter(self.name, "skipped")
+            return False
+        metrics.increment_router_filter(self.name, "evaluated")
+        return True
+
+
+class RouteIndex(BaseMiddleware):
+    def __init__(self) -> None:
+        self._scopes: dict[str, RouteScope | None] = {}
+        self._routes: dict[RouteKey, frozenset[str]] = {}
+
+    def add(self, name: str, router: Router, scope: RouteScope | None = None) -> None:
+        """Подключить роутер к индексу; без scope он получает все сообщения, но попадает в метрику."""
+        self._scopes[name] = scope
+        self._routes.clear()
+        router.message.filter(_InRoutes(name))
+
+    def routes(self, key: RouteKey) -> frozenset[str]:
+        routes = self._routes.get(key)
+        if routes is None:
+            routes = self._routes[key] = frozenset(
+                name for name, scope in self._scopes.items() if scope is None or scope.matches(*key)
+            )
+        return routes
+
+    @staticmethod
+    async def _chat_key(chat_id: int) -> str | None:
+        for key in SYSTEM_CHATS:
+            chat = await hot_cache.chat(key)
+            if chat is not None and chat.chat_id == chat_id:
+                return key
+        return None
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: dict[str, Any],
+    ) -> Any:
+        chat_type = event.chat.type
+        chat_key = None if chat_type == "private" else await self._chat_key(event.chat.id)
+        is_command = bool(event.text and event.text.startswith("/"))
+        return await handler(event, {**data, "routes": self.routes((chat_type, chat_key, is_command))})
+
+
+route_index = RouteIndex()
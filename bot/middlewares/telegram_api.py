@@ -0,0 +1,59 @@
+import time
+from typing import TYPE_CHECKING
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from services.backpressure import telegram_backpressure
+from services.metrics import metrics
+from services.tracing import tracer
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+# Поля, которые занимают почти весь объем запроса. Запрос целиком заново не сериализуем: это дорого
+_SIZED_FIELDS = ("text", "caption")
+
+
+def _payload_size(method: TelegramMethod) -> int:
+    """Объем текста и подписи в запросе, в байтах."""
+    size = 0
+    for name in _SIZED_FIELDS:
+        value = getattr(method, name, None)
+        if isinstance(value, str):
+            size += len(value.encode())
+    return size
+
+
+class TelegramApiMetricsMiddleware(BaseRequestMiddleware):
+    """Время, ошибки, флуд-контроль и объем отправленных данных для каждого вызова Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        sent_bytes = 0
+        try:
+            with tracer.span(f"telegram:{api_method}"):
+                response = await make_request(bot, method)
+            sent_bytes = _payload_size(method)
+        except TelegramRetryAfter as e:
+            metrics.record_telegram_error(api_method, type(e).__name__)
+            metrics.record_telegram_retry_after(api_method, e.retry_after)
+            telegram_backpressure.observe_retry_after(e.retry_after)
+            raise
+        except Exception as e:
+            metrics.record_telegram_error(api_method, type(e).__name__)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            metrics.record_telegram_call(api_method, duration, sent_bytes)
+            telegram_backpressure.observe_latency(duration)
+        return response
@@ -0,0 +1,23 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from services.events import extract_user
+from services.tracing import tracer
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Корневой спан на каждый апдейт."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        with tracer.trace(f"update:{event.event_type}", update_id=event.update_id) as span:
+            if span is not None and (tg_user := extract_user(event)):
+                span.set_attribute("user_id", tg_user.id)
+            return await handler(event, data)
@@ -0,0 +1,134 @@
+"""
+Планировщик апдейтов: общий предел одновременной обработки и очередь на каждого пользователя.
+
+И polling (start_polling с handle_as_tasks), и вебхук (SimpleRequestHandler с handle_in_background) запускают
+каждый апдейт отдельной задачей без ограничений, поэтому два быстрых нажатия одного игрока обрабатываются
+параллельно (так дважды срабатывал handle_confirm), а всплеск нажатий занимает все соединения базы и Redis.
+
+Планировщик стоит первым внешним middleware апдейтов, когда aiogram уже положил в data event_from_user:
+- апдейты одного пользователя обрабатываются строго по очереди, в порядке поступления;
+- апдейты разных пользователей идут параллельно, но не больше UPDATE_CONCURRENCY одновременно. Место занимает
+  только апдейт, чья очередь подошла, поэтому один нетерпеливый пользователь не держит чужие;
+- если ждущих апдейтов больше UPDATE_MAX_PENDING, или у пользователя их уже UPDATE_PER_USER_PENDING, новый апдейт
+  отбрасывается с короткой подсказкой.
+
+Фоновые апдейты aiogram-dialog (BgManager) встают в очередь своего пользователя, но никогда не отбрасываются:
+это уведомления самого бота, а не нажатия.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Update, User
+from aiogram_dialog.api.entities import DialogUpdate
+
+from services import settings, texts
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+OVERLOADED = "overloaded"
+TOO_FAST = "too_fast"
+
+
+@dataclass
+class _UserQueue:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pending: int = 0
+
+
+class UpdateScheduler(BaseMiddleware):
+    def __init__(self, concurrency: int, max_pending: int, per_user_pending: int) -> None:
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.per_user_pending = per_user_pending
+        self._slots = asyncio.Semaphore(concurrency)
+        self._users: dict[int, _UserQueue] = {}
+        self.pending = 0
+        self.running = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        metrics.update_scheduler.labels(state="queued").set_function(lambda: self.pending - self.running)
+        metrics.update_scheduler.labels(state="running").set_function(lambda: self.running)
+        metrics.update_scheduler.labels(state="users").set_function(lambda: len(self._users))
+
+    def _shed_reason(self, user_id: int | None) -> str | None:
+        if self.pending >= self.max_pending:
+            return OVERLOADED
+        queue = self._users.get(user_id)
+        if queue is not None and queue.pending >= self.per_user_pending:
+            return TOO_FAST
+        return None
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        user_id = user.id if user else None
+
+        if not isinstance(event, DialogUpdate):
+            reason = self._shed_reason(user_id)
+            if reason is not None:
+                metrics.increment_update_shed(reason)
+                logger.warning("Отбросили апдейт %s пользователя %s: %s", event.update_id, user_id, reason)
+                await self._reply_shed(event, reason)
+                return None
+
+        # Апдейты без пользователя (опросы и т.п.) друг с другом не упорядочиваем
+        queue = self._users.setdefault(user_id, _UserQueue()) if user_id is not None else None
+        if queue is not None:
+            queue.pending += 1
+        self.pending += 1
+        self._idle.clear()
+        queued_at = time.perf_counter()
+        try:
+            async with queue.lock if queue is not None else contextlib.nullcontext(), self._slots:
+                metrics.record_update_queue_wait(time.perf_counter() - queued_at)
+                self.running += 1
+                try:
+                    return await handler(event, data)
+                finally:
+                    self.running -= 1
+        finally:
+            self.pending -= 1
+            if not self.pending:
+                self._idle.set()
+            if queue is not None:
+                queue.pending -= 1
+                if not queue.pending:
+                    del self._users[user_id]
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Дождаться, пока не останется апдейтов в обработке и в очередях; False, если не дождались."""
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._idle.wait(), max(timeout, 0))
+        return self._idle.is_set()
+
+    @staticmethod
+    async def _reply_shed(event: Update, reason: str) -> None:
+        text = texts.get("common.overloaded" if reason == OVERLOADED else "common.too_fast")
+        with contextlib.suppress(TelegramAPIError):
+            if event.callback_query is not None:
+                # Без ответа у кнопки так и крутятся часики
+                await event.callback_query.answer(text)
+            elif reason == OVERLOADED and event.message is not None and event.message.chat.type == "private":
+                # На флуд сообщениями не отвечаем каждым сообщением: это только добавит нагрузки
+                await event.message.answer(text)
+
+
+update_scheduler = UpdateScheduler(
+    concurrency=settings.update_concurrency,
+    max_pending=settings.update_max_pending,
+    per_user_pending=settings.update_per_user_pending,
+)
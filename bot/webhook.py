@@ -0,0 +1,163 @@
+"""
+Прием апдейтов через вебхук: быстрый ответ Telegram и локальная очередь.
+
+Telegram ждет ответа на каждую доставку и повторяет ее, если ответ задержался. Поэтому обработчик запроса только
+отсеивает повторы (services.update_dedup), кладет апдейт в ограниченную очередь WEBHOOK_QUEUE_SIZE и сразу
+отвечает 200; обрабатывают очередь WEBHOOK_WORKERS воркеров. Время ответа вебхука не зависит от обработчиков.
+
+Если очередь полна, Telegram получает 503 и доставит апдейт позже: так при перегрузке апдейты ждут у Telegram,
+а не копятся в памяти процесса.
+
+При остановке drain() перестает принимать апдейты (503) и ждет, пока очередь разберется. Что не успело начаться
+к дедлайну, сохраняется в Redis (webhook:pending) и разбирается первой же запущенной репликой.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from services.metrics import metrics
+from services.update_dedup import UpdateDeduplicator
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        *,
+        dedup: UpdateDeduplicator,
+        store: Redis,
+        queue_size: int,
+        workers: int,
+        pending_key: str = "webhook:pending",
+        **data: Any,
+    ) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **data)
+        self.dedup = dedup
+        self.store = store
+        self.pending_key = pending_key
+        self.workers = workers
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=queue_size)
+        self.processing = 0
+        self.processed = 0
+        self.draining = False
+        self._tasks: list[asyncio.Task] = []
+
+        metrics.webhook_queue.labels(state="queued").set_function(self.queue.qsize)
+        metrics.webhook_queue.labels(state="processing").set_function(lambda: self.processing)
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        # Без закрытия по on_shutdown aiohttp: воркеры останавливает drain(), а сессию бота — run_bot
+        app.router.add_route("POST", path, self.handle, **kwargs)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+
+        self._tasks = [asyncio.create_task(self._worker(), name=f"webhook:{i}") for i in range(self.workers)]
+        logger.info("Запустили %s воркеров вебхука, очередь до %s апдейтов", self.workers, self.queue.maxsize)
+        await self._restore()
+
+    async def stop(self) -> None:
+        if not self._tasks:
+            return
+
+        for task in self._tasks:
+            task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Остановили воркеры вебхука")
+
+    async def drain(self, timeout: float) -> tuple[int, int, int]:
+        """
+        Перестать принимать апдейты и разобрать очередь не дольше timeout секунд.
+
+        Возвращает (обработано, сохранено в Redis, брошено): сохраняются апдейты, которые не успели начаться,
+        брошенными считаются прерванные на середине обработки.
+        """
+        self.draining = True
+        processed = self.processed
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self.queue.join(), max(timeout, 0))
+
+        leftover = []
+        while not self.queue.empty():
+            leftover.append(self.queue.get_nowait())
+            self.queue.task_done()
+        interrupted = self.processing
+        await self.stop()
+        persisted = await self._persist(leftover)
+        return self.processed - processed, persisted, interrupted + len(leftover) - persisted
+
+    async def _persist(self, updates: list[dict[str, Any]]) -> int:
+        if not updates:
+            return 0
+        try:
+            await self.store.rpush(self.pending_key, *(json.dumps(u, separators=(",", ":")) for u in updates))
+        except RedisError as e:
+            logger.error("Не удалось сохранить %s необработанных апдейтов: %s", len(updates), e)
+            return 0
+        return len(updates)
+
+    async def _restore(self) -> None:
+        """Забрать апдейты, которые сохранила остановленная реплика."""
+        try:
+            raw = await self.store.lpop(self.pending_key, self.queue.maxsize)
+        except RedisError as e:
+            logger.warning("Не удалось забрать сохраненные апдейты: %s", e)
+            return
+        for item in raw or []:
+            self.queue.put_nowait(json.loads(item))
+        if raw:
+            logger.info("Забрали %s апдейтов, сохраненных при прошлой остановке", len(raw))
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        received = time.perf_counter()
+        if self.draining:
+            # Реплика останавливается: Telegram доставит апдейт позже, возможно в другую реплику
+            metrics.record_webhook_update("rejected", time.perf_counter() - received)
+            return web.Response(status=503)
+        update = await request.json(loads=bot.session.json_loads)
+        update_id = update.get("update_id")
+
+        if update_id is not None and not await self.dedup.first_delivery(update_id):
+            metrics.record_webhook_update("duplicate", time.perf_counter() - received)
+            return web.json_response({}, dumps=bot.session.json_dumps)
+
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning("Очередь вебхука заполнена, апдейт %s вернули Telegram", update_id)
+            if update_id is not None:
+                await self.dedup.forget(update_id)
+            metrics.record_webhook_update("rejected", time.perf_counter() - received)
+            return web.Response(status=503)
+
+        metrics.record_webhook_update("accepted", time.perf_counter() - received)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self.queue.get()
+            self.processing += 1
+            try:
+                await self._background_feed_update(self.bot, update)
+            except Exception as exc:
+                logger.exception("Ошибка обработки апдейта %s из вебхука: %s", update.get("update_id"), exc)
+            finally:
+                self.processing -= 1
+                self.queue.task_done()
+            self.processed += 1
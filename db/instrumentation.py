@@ -0,0 +1,189 @@
+"""
+Инструментирование запросов Tortoise ORM.
+
+Для каждого запроса фиксируем длительность, число строк и место вызова в нашем коде, отдаем гистограмму
+по модели и операции в Prometheus и пишем в лог медленные запросы вместе с хендлером, который их выполнил.
+"""
+
+import logging
+import sys
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any
+
+import tortoise
+from tortoise.models import Model
+from tortoise.queryset import (
+    BulkCreateQuery,
+    BulkUpdateQuery,
+    CountQuery,
+    DeleteQuery,
+    ExistsQuery,
+    QuerySet,
+    RawSQLQuery,
+    UpdateQuery,
+    ValuesListQuery,
+    ValuesQuery,
+)
+
+from services import settings
+from services.metrics import current_operation, metrics
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+_TORTOISE_DIR = str(Path(tortoise.__file__).parent)
+_THIS_FILE = __file__
+
+
+@dataclass
+class QueryStats:
+    """Счетчик запросов в рамках одного апдейта."""
+
+    count: int = 0
+    by_call_site: Counter = field(default_factory=Counter)
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+# Глубина вложенности: prefetch и fetch_related сами вызывают QuerySet, считаем только внешний вызов
+_query_depth: ContextVar[int] = ContextVar("query_depth", default=0)
+
+_installed = False
+
+
+def _call_site() -> str:
+    frame = sys._getframe(2)  # noqa: SLF001
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_TORTOISE_DIR) and filename != _THIS_FILE:
+            return f"{Path(filename).name}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _row_count(operation: str, result: Any) -> int:
+    if operation in {"count", "exists", "save"}:
+        return 1
+    if result is None:
+        return 0
+    if isinstance(result, list | tuple):
+        return len(result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return 1
+
+
+def _record(model: str, operation: str, call_site: str, duration: float, result: Any) -> None:
+    rows = _row_count(operation, result)
+    slow = duration * 1000 >= settings.db_slow_query_threshold_ms
+    metrics.record_db_query(model, operation, duration, rows, slow=slow)
+
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.by_call_site[call_site] += 1
+
+    if slow:
+        logger.warning(
+            "Медленный запрос %s.%s: %.1f мс, строк %d, хендлер %s, вызван из %s",
+            model,
+            operation,
+            duration * 1000,
+            rows,
+            current_operation.get(),
+            call_site,
+        )
+
+
+def _instrument(
+    method: Callable[..., Awaitable[Any]],
+    operation: Callable[[Any], str] | str,
+    model: Callable[[Any], str],
+) -> Callable[..., Awaitable[Any]]:
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        depth = _query_depth.get()
+        if depth:
+            return await method(self, *args, **kwargs)
+
+        call_site = _call_site()
+        model_name = model(self)
+        operation_name = operation if isinstance(operation, str) else operation(self)
+        token = _query_depth.set(depth + 1)
+        started = time.perf_counter()
+        result = None
+        try:
+            with tracer.span(f"db:{model_name}.{operation_name}", call_site=call_site):
+                result = await method(self, *args, **kwargs)
+            return result
+        finally:
+            _query_depth.reset(token)
+            _record(model_name, operation_name, call_site, time.perf_counter() - started, result)
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def _query_model(query) -> str:
+    return query.model.__name__
+
+
+def _instance_model(instance) -> str:
+    return type(instance).__name__
+
+
+def install_query_instrumentation() -> None:
+    """Оборачиваем методы выполнения запросов Tortoise. Повторный вызов ничего не делает."""
+    global _installed
+    if _installed:
+        return
+
+    targets = (
+        (QuerySet, "_execute", lambda q: "get" if q._single else "filter", _query_model),  # noqa: SLF001
+        (CountQuery, "_execute", "count", _query_model),
+        (ExistsQuery, "_execute", "exists", _query_model),
+        (UpdateQuery, "_execute", "update", _query_model),
+        (DeleteQuery, "_execute", "delete", _query_model),
+        (ValuesQuery, "_execute", "values", _query_model),
+        (ValuesListQuery, "_execute", "values", _query_model),
+        (RawSQLQuery, "_execute", "raw", _query_model),
+        (BulkUpdateQuery, "_execute_many", "bulk_update", _query_model),
+        (BulkCreateQuery, "_execute_many", "bulk_create", _query_model),
+        (Model, "save", "save", _instance_model),
+        (Model, "delete", "delete", _instance_model),
+        (Model, "fetch_related", "fetch_related", _instance_model),
+    )
+    for cls, name, operation, model in targets:
+        method = cls.__dict__[name]
+        if getattr(method, "__instrumented__", False):
+            continue
+        setattr(cls, name, _instrument(method, operation, model))
+
+    _installed = True
+    logger.info("Инструментирование запросов Tortoise ORM включено")
+
+
+@contextmanager
+def track_queries(event_type: str) -> Iterator[QueryStats]:
+    """Считаем запросы одного апдейта (или прохода фоновой задачи) и ищем повторяющиеся (N+1)."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+        metrics.record_queries_per_update(event_type, stats.count)
+        for call_site, count in stats.by_call_site.items():
+            if count >= settings.db_repeated_query_threshold:
+                logger.warning(
+                    "Возможный N+1: %d запросов из %s за один апдейт (%s)",
+                    count,
+                    call_site,
+                    event_type,
+                )
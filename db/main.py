@@ -1,7 +1,10 @@
+import asyncio
 import logging
 
 from tortoise import Tortoise
 
+from db.instrumentation import install_query_instrumentation
+from db.pool import install_pool_instrumentation
 from db.models import Chat, User
 from services import settings
 
@@ -11,14 +14,23 @@ logger = logging.getLogger(__name__)
 async def init_db() -> None:
     """Инициализация подключения к Tortoise ORM"""
 
+    if settings.db_instrumentation:
+        install_query_instrumentation()
+        install_pool_instrumentation()
     await Tortoise.init(config=settings.tortoise_config)
     if settings.tortoise_generate_schemas:
         await Tortoise.generate_schemas()
         logger.info("Генерация схем Tortoise ORM выполнена")
-    await _ensure_default_admin_chat()
-    await _ensure_default_discussion_group()
-    await _ensure_default_admins()
-    logger.info("Tortoise ORM инициализирована")
+    await asyncio.gather(
+        _ensure_default_admin_chat(),
+        _ensure_default_discussion_group(),
+        _ensure_default_admins(),
+    )
+    logger.info(
+        "Tortoise ORM инициализирована (пул %s..%s соединений)",
+        settings.pg_pool_min_size,
+        settings.pg_pool_max_size,
+    )
 
 
 async def close_db() -> None:
@@ -59,25 +71,25 @@ async def _ensure_default_discussion_group() -> None:
 
 
 async def _ensure_default_admins() -> None:
-    # Выдаем админки тем, кто указан
-    admins = [int(i) for i in settings.admin_ids_raw.split(",")]
-    for admin_id in admins:
-        user, _created = await User.get_or_create(
-            tg_id=admin_id,
+    # Одним проходом: создаем недостающих, выдаем и забираем админки пачками
+    admins = {int(i) for i in settings.admin_ids_raw.split(",")}
+    existing = dict(await User.filter(tg_id__in=admins).values_list("tg_id", "is_admin"))
+
+    missing = admins - existing.keys()
+    if missing:
+        await User.bulk_create([User(tg_id=tg_id, is_admin=True) for tg_id in missing], ignore_conflicts=True)
+    promoted = [tg_id for tg_id, is_admin in existing.items() if not is_admin]
+    if promoted:
+        await User.filter(tg_id__in=promoted).update(is_admin=True)
+    for admin_id in sorted(missing | set(promoted)):
+        logger.info(
+            f"Админ {admin_id} получил права администратора!",
         )
-        if not user.is_admin:
-            user.is_admin = True
-            await user.save()
-            logger.info(
-                f"Админ {admin_id} получил права администратора!",
-            )
-    # Забираем админки у тех, кто больше не указан
-    for user in await User.filter(is_admin=True).all():
-        if user.tg_id in admins:
-            continue
-        user.is_admin = False
+
+    demoted = await User.filter(is_admin=True).exclude(tg_id__in=admins).values_list("tg_id", flat=True)
+    if demoted:
+        await User.filter(tg_id__in=demoted).update(is_admin=False)
+    for admin_id in demoted:
         logger.info(
-            f"Админ {user.tg_id} лишился права администратора!",
+            f"Админ {admin_id} лишился права администратора!",
         )
-        await user.save()
-    assert len(admins) == await User.filter(is_admin=True).count()
@@ -3,6 +3,7 @@ from .game import Game
 from .kill_event import KillEvent
 from .pending_profile import PendingProfile
 from .player import Player
+from .player_assignment import PlayerAssignment
 from .user import User
 
 __all__ = [
@@ -11,5 +12,6 @@ __all__ = [
     "KillEvent",
     "PendingProfile",
     "Player",
+    "PlayerAssignment",
     "User",
 ]
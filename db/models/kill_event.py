@@ -52,6 +52,12 @@ class KillEvent(TimestampedModel):
     class Meta:
         table = "kill_events"
         table_description = "События «киллов»"
+        # Частичные индексы по status='pending' заданы в миграции 9, Tortoise их не описывает
+        indexes = (
+            ("game_id", "killer_id", "status"),
+            ("game_id", "victim_id", "status"),
+            ("status", "created_at"),
+        )
 
     def __str__(self) -> str:
         return f"<KillEvent with id={self.id}>"
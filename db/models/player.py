@@ -16,6 +16,15 @@ class Player(TimestampedModel):
         on_delete=fields.CASCADE,
     )
     rating = fields.IntField(default=600, validators=[MinValueValidator(0)])
+    # счетчики ведутся вместе со статусами KillEvent, см. services/player_stats.py
+    kills = fields.IntField(default=0)
+    deaths = fields.IntField(default=0)
+    rerolls = fields.IntField(default=0)
+    timeouts = fields.IntField(default=0)
+    kill_streak = fields.IntField(default=0)
+    best_kill_streak = fields.IntField(default=0)
+    last_kill_at = fields.DatetimeField(null=True)
+    last_death_at = fields.DatetimeField(null=True)
 
     class Meta:
         table = "players"
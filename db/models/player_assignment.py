@@ -0,0 +1,50 @@
+from tortoise import fields
+
+from .base import TimestampedModel
+
+
+class PlayerAssignment(TimestampedModel):
+    """
+    Текущее назначение игрока: на кого он охотится и кто охотится на него.
+
+    Денормализация pending-событий из kill_events, чтобы «кто моя цель» читалось одной строкой
+    по уникальному ключу (game, user), а не поиском по событиям. Поддерживается в services.assignments.
+    """
+
+    player = fields.OneToOneField(
+        "models.Player",
+        related_name="assignment",
+        on_delete=fields.CASCADE,
+    )
+    game = fields.ForeignKeyField(
+        "models.Game",
+        related_name="assignments",
+        on_delete=fields.CASCADE,
+    )
+    user = fields.ForeignKeyField(
+        "models.User",
+        related_name="assignments",
+        on_delete=fields.CASCADE,
+    )
+    target_event = fields.ForeignKeyField(
+        "models.KillEvent",
+        related_name="killer_assignments",
+        null=True,
+        on_delete=fields.SET_NULL,
+        index=True,
+    )
+    hunter_event = fields.ForeignKeyField(
+        "models.KillEvent",
+        related_name="victim_assignments",
+        null=True,
+        on_delete=fields.SET_NULL,
+        index=True,
+    )
+
+    class Meta:
+        table = "player_assignments"
+        table_description = "Текущие цели и охотники игроков"
+        unique_together = (("game", "user"),)
+
+    def __str__(self) -> str:
+        return f"<PlayerAssignment u={self.user_id} g={self.game_id}>"
@@ -0,0 +1,75 @@
+"""
+Метрики пула соединений asyncpg.
+
+Сколько соединений занято, сколько простаивает и сколько корутин стоят в очереди за соединением,
+плюс время ожидания свободного соединения. Если при массовом нажатии «Присоединиться» растет
+ожидание, а не длительность запросов, упираемся в размер пула, а не в базу.
+"""
+
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from asyncpg.pool import Pool
+from tortoise import connections
+
+from services.metrics import metrics
+
+_waiting = 0
+_installed = False
+
+
+@dataclass
+class PoolStats:
+    size: int = 0
+    max_size: int = 0
+    idle: int = 0
+    waiting: int = 0
+
+    @property
+    def in_use(self) -> int:
+        return self.size - self.idle
+
+
+def pool_stats(connection_name: str = "default") -> PoolStats:
+    """Снимок состояния пула; пустой, если пул еще не создан."""
+    try:
+        pool: Pool | None = connections.get(connection_name)._pool  # noqa: SLF001
+    except Exception:
+        pool = None
+    if pool is None:
+        return PoolStats(waiting=_waiting)
+    return PoolStats(
+        size=pool.get_size(),
+        max_size=pool.get_max_size(),
+        idle=pool.get_idle_size(),
+        waiting=_waiting,
+    )
+
+
+def install_pool_instrumentation() -> None:
+    """Оборачивает получение соединения из пула и привязывает gauge к состоянию пула. Идемпотентно."""
+    global _installed  # noqa: PLW0603
+    if _installed:
+        return
+
+    original = Pool._acquire  # noqa: SLF001
+
+    @wraps(original)
+    async def _acquire(self: Pool, timeout: float | None):
+        global _waiting  # noqa: PLW0603
+        _waiting += 1
+        started = time.perf_counter()
+        try:
+            return await original(self, timeout)
+        finally:
+            _waiting -= 1
+            metrics.record_db_pool_acquire(time.perf_counter() - started)
+
+    Pool._acquire = _acquire  # noqa: SLF001
+
+    metrics.db_pool_connections.labels(state="in_use").set_function(lambda: pool_stats().in_use)
+    metrics.db_pool_connections.labels(state="idle").set_function(lambda: pool_stats().idle)
+    metrics.db_pool_connections.labels(state="waiting").set_function(lambda: pool_stats().waiting)
+    metrics.db_pool_max_size.set_function(lambda: pool_stats().max_size)
+    _installed = True
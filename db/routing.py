@@ -0,0 +1,144 @@
+"""
+Чтение с реплики для тяжелых read-only запросов.
+
+Статистика, титры, метрики и /restore — агрегации, которым не нужна свежесть до миллисекунды, но которые
+конкурируют с записью (подтверждения киллов, регистрации) на primary. Такой код помечает себя
+`replica_safe`/`replica_reads()`, и роутер Tortoise отправляет его чтения на соединение `replica`.
+Если реплика не настроена, недоступна или отстает больше порога, чтения остаются на primary.
+Запись всегда идет на primary.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import ParamSpec, TypeVar
+
+from tortoise import connections
+
+from services import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+REPLICA_CONNECTION = "replica"
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+_prefer_replica: ContextVar[bool] = ContextVar("prefer_replica", default=False)
+
+
+class ReplicaRouter:
+    """Роутер Tortoise: чтения в контексте replica_reads() уходят на реплику, если она здорова."""
+
+    def db_for_read(self, model) -> str | None:
+        if _prefer_replica.get() and replica_monitor.healthy:
+            metrics.increment_db_replica_read()
+            return REPLICA_CONNECTION
+        return None
+
+    def db_for_write(self, model) -> str | None:
+        return None
+
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    """Чтения внутри блока можно обслужить с реплики."""
+    token = _prefer_replica.set(True)
+    try:
+        yield
+    finally:
+        _prefer_replica.reset(token)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """Чтения внутри блока идут на primary, даже если снаружи открыт replica_reads()."""
+    token = _prefer_replica.set(False)
+    try:
+        yield
+    finally:
+        _prefer_replica.reset(token)
+
+
+def replica_safe(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    """Декоратор для корутин, которые только читают и переживут отставание реплики."""
+
+    @wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with replica_reads():
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaMonitor:
+    """Периодически меряет отставание реплики и решает, можно ли с нее читать."""
+
+    def __init__(self) -> None:
+        self.healthy = False
+        self.lag: float | None = None
+        self._task: asyncio.Task | None = None
+        self._running = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.pg_replica_host)
+
+    async def start(self) -> None:
+        if self._running or not self.enabled:
+            return
+
+        self._running = True
+        await self.check()
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info("Мониторинг реплики запущен (порог отставания %s с)", settings.db_replica_max_lag)
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+
+        self._running = False
+        self.healthy = False
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        logger.info("Мониторинг реплики остановлен")
+
+    async def _run_loop(self) -> None:
+        while self._running:
+            await asyncio.sleep(settings.db_replica_check_interval)
+            await self.check()
+
+    async def check(self) -> None:
+        try:
+            # NULL, если реплика еще ничего не проигрывала или это вовсе не реплика
+            rows = await connections.get(REPLICA_CONNECTION).execute_query_dict(
+                "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) AS lag,"
+                " pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AS caught_up"
+            )
+            row = rows[0]
+            # Без новой записи на primary replay_timestamp стоит на месте, но реплика не отстает
+            lag = 0.0 if row["caught_up"] else float(row["lag"])
+        except Exception as e:
+            lag = None
+            if self.healthy:
+                logger.warning("Реплика недоступна, читаем с primary: %s", e)
+        else:
+            if lag > settings.db_replica_max_lag and self.healthy:
+                logger.warning("Реплика отстает на %.1f с, читаем с primary", lag)
+
+        was_healthy = self.healthy
+        self.lag = lag
+        self.healthy = lag is not None and lag <= settings.db_replica_max_lag
+        if self.healthy and not was_healthy:
+            logger.info("Реплика доступна, отставание %.1f с", lag)
+        metrics.record_db_replica_lag(lag)
+
+
+replica_monitor = ReplicaMonitor()
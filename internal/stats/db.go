@@ -7,7 +7,6 @@ import (
 	"strings"
 	"time"
 
-	"github.com/google/uuid"
 	_ "github.com/lib/pq"
 )
 
@@ -55,17 +54,11 @@ func GetKillsTop(limit, offset int) ([]PlayerEntry, error) {
 			COALESCE(u.given_name, '') AS given_name,
 			COALESCE(u.family_name, '') AS family_name,
 			p.rating,
-			COALESCE(k.kills, 0) AS kills
+			p.kills
 		FROM players p
 		JOIN users u ON u.id = p.user_id
-		LEFT JOIN (
-			SELECT killer_id, COUNT(*) AS kills
-			FROM kill_events
-			WHERE game_id = $1 AND status = 'confirmed'
-			GROUP BY killer_id
-		) k ON k.killer_id = u.id
 		WHERE p.game_id = $1
-		ORDER BY COALESCE(k.kills, 0) DESC, p.rating DESC, u.tg_id ASC
+		ORDER BY p.kills DESC, p.rating DESC, u.tg_id ASC
 		LIMIT $2 OFFSET $3
 	`, gameID, limit, offset)
 	if err != nil {
@@ -167,27 +160,28 @@ func GetUserStats(username string) (UserStats, error) {
 
 	row := db.QueryRow(`
 		SELECT
-			u.id,
 			u.tg_id,
 			COALESCE(u.tg_username, '') AS username,
 			COALESCE(u.given_name, '') AS given_name,
 			COALESCE(u.family_name, '') AS family_name,
-			p.rating
+			p.rating,
+			p.kills,
+			p.deaths
 		FROM users u
 		JOIN players p ON p.user_id = u.id AND p.game_id = $1
 		WHERE LOWER(u.tg_username) = LOWER($2)
 		LIMIT 1
 	`, gameID, username)
 
-	var userID uuid.UUID
 	var stats UserStats
 	if err := row.Scan(
-		&userID,
 		&stats.TgID,
 		&stats.Username,
 		&stats.GivenName,
 		&stats.FamilyName,
 		&stats.Rating,
+		&stats.Kills,
+		&stats.Deaths,
 	); err != nil {
 		if errors.Is(err, sql.ErrNoRows) {
 			return UserStats{}, sql.ErrNoRows
@@ -195,18 +189,6 @@ func GetUserStats(username string) (UserStats, error) {
 		return UserStats{}, err
 	}
 
-	countRow := db.QueryRow(`
-		SELECT
-			COALESCE(SUM(CASE WHEN killer_id = $1 THEN 1 ELSE 0 END), 0) AS kills,
-			COALESCE(SUM(CASE WHEN victim_id = $1 THEN 1 ELSE 0 END), 0) AS deaths
-		FROM kill_events
-		WHERE game_id = $2 AND status = 'confirmed'
-	`, userID, gameID)
-
-	if err := countRow.Scan(&stats.Kills, &stats.Deaths); err != nil {
-		return UserStats{}, err
-	}
-
 	return stats, nil
 }
 
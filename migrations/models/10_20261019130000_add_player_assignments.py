@@ -0,0 +1,108 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "player_assignments" (
+            "id" UUID NOT NULL PRIMARY KEY,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "game_id" UUID NOT NULL REFERENCES "games" ("id") ON DELETE CASCADE,
+            "hunter_event_id" UUID REFERENCES "kill_events" ("id") ON DELETE SET NULL,
+            "target_event_id" UUID REFERENCES "kill_events" ("id") ON DELETE SET NULL,
+            "user_id" UUID NOT NULL REFERENCES "users" ("id") ON DELETE CASCADE,
+            "player_id" UUID NOT NULL UNIQUE REFERENCES "players" ("id") ON DELETE CASCADE,
+            CONSTRAINT "uid_player_assi_game_id_1e3f5e" UNIQUE ("game_id", "user_id")
+        );
+        CREATE INDEX IF NOT EXISTS "idx_player_assi_hunter__b91e47" ON "player_assignments" ("hunter_event_id");
+        CREATE INDEX IF NOT EXISTS "idx_player_assi_target__7ec738" ON "player_assignments" ("target_event_id");
+        COMMENT ON TABLE "player_assignments" IS 'Текущие цели и охотники игроков';
+
+        INSERT INTO "player_assignments" ("id", "game_id", "user_id", "player_id", "target_event_id", "hunter_event_id")
+        SELECT
+            gen_random_uuid(),
+            p."game_id",
+            p."user_id",
+            p."id",
+            (
+                SELECT ke."id" FROM "kill_events" ke
+                WHERE ke."game_id" = p."game_id" AND ke."killer_id" = p."user_id" AND ke."status" = 'pending'
+                ORDER BY ke."created_at" DESC LIMIT 1
+            ),
+            (
+                SELECT ke."id" FROM "kill_events" ke
+                WHERE ke."game_id" = p."game_id" AND ke."victim_id" = p."user_id" AND ke."status" = 'pending'
+                ORDER BY ke."created_at" DESC LIMIT 1
+            )
+        FROM "players" p
+        JOIN "games" g ON g."id" = p."game_id"
+        JOIN "users" u ON u."id" = p."user_id"
+        WHERE g."end_date" IS NULL AND u."is_in_game"
+        ON CONFLICT DO NOTHING;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "player_assignments";"""
+
+
+MODELS_STATE = (
+    "eJztXXlv2zgW/yqC/0qBNLBlO04HiwWcNO1km6NInN3BdApBlmhHqCy5OpIGhb/78pJFip"
+    "Qs2ZaPmCigOhQfJf4ej3fx6Xdj4tvADU8unsyo8Yf2u+GZEwB/cOXHWsOcTtNSVBCZQxdX"
+    "tGANXGIOwygwLdTMyHRDAItsEFqBM40c30NV/4mbnVYTXdsdfLXw9Qxf7ffov04P/4ErdX"
+    "R8HWoD4IJxYE7QU2zfgo9xvDFs0ItdFxbFnvMzBkbkj0H0BAJ449s3/FqGYyOSH+C18f07"
+    "/OF4NvgFQr4CvPEtrTL9YYwc4NocFqQZXG5Er1Nc9vh49fETroleamhYvhtPvLT29DV68r"
+    "159Th27BNEg+6NgQcCMwI2AxXqC4U0KSL9ggVREIP569tpgQ1GZuwiwBv/GsWehXDW8JPQ"
+    "pfPvhsACipgERMv3EPscL0L4/J6RXqV9xqUN9KiLP/v3R+3Td7iXfhiNA3wTI9KYYUIzMg"
+    "kpxjoF0goA6rZBxhQP6Ed4J3ImQA4qT5kB16akJ8mPZUBOClKU01GcwJzAtxymDdgH+85z"
+    "XykHCzAeXN1cPgz6N19RTyZh+NPFEPUHl+iOjktfM6VHhCU+nINkZs4b0f53NfhTQ39qf9"
+    "/dXmYZN683+LuB3smMI9/w/BfDtJnBlpQmwMCaKWPjqb0kY3lKxditMpa+PDNh01WUZ+q5"
+    "M77yopy5mhJl+AkBWw8HhQVwRQaO0WPef9D1drunN9unZ91Or9c9a57BuvidxFu9Ai6fX3"
+    "2+uh3wTEMFMw5ctOkIwMINN5DDSqtnIIXd2E1IJ+YvwwXeOHqCf7aaeqcAr//27/Gugqpl"
+    "xvotvafTm7MZ2qZHP5j9BRUMTevHixnYhnDH1/28uuKtiT7JlpieOcYAoX6iPlDJ6DPhoi"
+    "Ax4fJCiWkMa1SRmIh81MbCEBGMhuUlIUHuCSMziAy0oCqJR0k8amNUEs8hM1aQeDy6fJfd"
+    "lZP6dW3La+ccty/r3W6JbRnWyt2V8T1ermF2mIpTg6dcw9SgDN+c2LMnEyHBoXCJA569FB"
+    "dZOsXDzfOwgoDMKCOO6xrgGXjEmJfR9ijxpy/3wDUxniJvqfz7BTZ0idrZzfVvlozWpFS2"
+    "CUxd8xUEKwLxFTeyxyiYYeiMvcnqQ4Ig0Z83t2eY1KlFprNFokpyUylfn8xM3XJapd7CWi"
+    "XA1xbRKlOjO7HJd0Ya/K9p4httkzHWD5kraQKRNYerKKZILU4s9rBHIKB/QKEgikNip2fq"
+    "PDtQ+5tI6tDfx5wKpVRdperWK1e/FY1IqbpvlLHC/k5XWdjfkRNMgMzK7/suML0ce7SEPM"
+    "PiIaSvi6vyvW0da+D53d01x8Hzq4wt//bx5vzy/qiFWQcrOVGeiT+D0RJzKKeJjShWNYlY"
+    "uz53SmnHVP5YdvbIyNXsmRVCvMTsyWlCzZ4tz55USC9raE0pNuYBbUyBZyOOrCA98G7Q0z"
+    "JO0CxfGBfoadbWitTBYEnpLEurJsWWJ4UTGlDLD/znyrtJhlJtJPwsYcwGZRV9hmSd2v42"
+    "jdcLdXtBbq0GGUd0gKDR9dSviluWbgXodmr9rQAdZ8wrixtHdCDjTfDt8IucCN8nPwDO2P"
+    "sCXjGIV/A9TM+S+eYy8Uu7Cppgn4fFgfkyt+yyKzfsHewTINvCRf/hov/xsiFZ6NYA22O4"
+    "Ll/PlmDjVm8OuHso2NxfXQwakimrkMusQyWQm6/3mwNva/vCQvCymx+H38PlQLt9vL5uzM"
+    "q4sCkftum23B2cZeKcQqZ2f+5XYjH4GvgjB/dbcOpmahwXeXap/cGYkspVgoZHabgw8dB2"
+    "OoL/9uxYYzy4p8z9DnMKi1B/YO52Neb0FmAIusxDCTHb6NkKzmHWwRuHZJ9SPl3l0611BX"
+    "kzrj/l032jjBV2+rHzDDyjahAzT7WUfX3z+/sGIplH5sRxXyvDmSFTeCZ4YggqAJnU30sE"
+    "23oJANt6Ln7oFg+f5cdBCAwvngxlNouHiem6+acys8RLnc3cAqjkbGZb753OT2OiP4rOXz"
+    "7c9K+vJW6AwI+n1RdHjmovh2Itk3n65Ee+COQA/MoZgXOCPcGwSCq4/GvACQQJUkc3/b/e"
+    "cULB9d3t56Q6g+zF9d15BlBz6MeREYeyuZ2PKk+loJVD67pQinqKx2OkTkOAkEWkoo81tw"
+    "3lbRXOfx1gbMf6t3snNDzwkhh/qkcEZIjVMOXhhTpgSIycZZfalEIts9Jl1noyvTGwE1OS"
+    "AO1/Hu5uc6RTgTID8aMH+/7NdqzoWHOdMPpe19hlLHPD2HEjxwtP0ANrMs4hSIr5kIX8mL"
+    "cZoAYkfNh82patqQYbTtsyAWFojuXxREX48nQK4gKIw3g4cSJkZURybVWFTU69J0t23UKF"
+    "ClJaOkgp8TtVQI0hqTdAaXcQK4hQkqu2WwwY2VbQAzMsFocoqXCRsuEic/jyo0Vq9f2TA/"
+    "8yn/88FUCBrz/NObBsXjDqi6cHtYmTXtcYDzxbt9uQM0aaTTWZuTjGUMylim/PD2grx7xy"
+    "zCv/rXLMHzJjBcc8xJlaG3me5qqLKUFdSVRF5p02myvwjqiKeqvT65y1TztzDXFeUqQY7t"
+    "ehnd0Rt5WCohSULSsoO3fwZFuoLTx5sia9RJaiS2KLpMR3Hhj48HIIYd2VtTWms7l6Gw/I"
+    "Ig0uG2VfMh2XngZQEwWu086Ju6Yx1V02kFtj/yMB213mN2ncZpridMRiRZLm98qqi2Veu8"
+    "uGi9tpWHi7ly2h3/3oCi/aLfOKzT+4R2jC27fJbzbc3S4G64z5AkkrTYY2x8xk6oIlm+Je"
+    "12YAoK978o8H/yFVnwmvpxUBA4XFIDtk4GK/pcIE4sPHU+f3+/SdijPBtT+wbOhpTMo5co"
+    "aA8C/Bg21KSCHHg8YcIqCwiOO7gyo1h0PmSSyoXM8BA7PF8ruTBY/2idbVC0f/B8KH9oh5"
+    "dTLSJbOqmXlz/qkWoWXHKKkKGBzb2hHaTI41tBG/o8c0+IGisS/EQNISXt7SxHcvlf2PUJ"
+    "9gihb7pA5zZc98sKc9WNZ082aArsH+PTsWCE+YZfOkcZxjh0pEDWJwytihlNVJWZ2UcUJZ"
+    "nQ6XseJxEGVDKbXkpYg9xV4EhXgs21RETkJaq5d8Z5JScEc8zABu2EvhJyE9PPyUDa8qYl"
+    "TtroYZR7RZWW8H7Z7KglfWgpedqspaXNVazK7ya0CvyucmtrUlLARQsvPl5EHJE1UUkgRJ"
+    "iQxWOaOMaIvPbjYi2omRvSTWy38bZEP7y0KguQ20hLdjYWQVY5rHK6LEHJ+slPkmeLQSVc"
+    "6SQo1arMGux5QzhqwOa+6mltbyYVSFSU2isUppomxYytShbFgHzliV0kSlNNkjPFVKE5XS"
+    "RKU0eSOTWaU0USlN9gZaldJkAexrzBVBtHMR3ILj3nOS9YTv12332c5BbwjSMie8M2RrWS"
+    "FqB7hmSYqR0I0A/IydAFT9ikxeE2o1EBLzOJ4hd5otSsrDENYGqzBy9wVV0544kow8Cz99"
+    "lJApRDlEwS8ngkj5ru2/eEbsRY5EQCg2jeU0sZFPhW3Oc75LFrEEhzfw+TzTipxnsIIHoI"
+    "49UwiDyHcE8h9QgOtMaOR9L6bK1xOqOFp3yOsvS0oBbObD85tBZIdOHGU/sYFHSN53cQ53"
+    "hLBfr1geE/G7Gfs5UGTf9NggKrs6XJj0JyugsXRYxY6gsM0v9OwSJnWm6emDwLGeGpL4En"
+    "rnuCjCxEzrLAoxyYdhcXBIpTiQXBtUWQMUXSp3wP60YvaI/LCPZ7i4OLJ0r/kiM0NSl8y8"
+    "hz4SNDUqgEir7yeArWazBICwVv4Xu9G9rMvTi6QRmwXZcVOSbaXFrU33XlsC3AqK3fq3l9"
+    "n/AZhWg4E="
+)
@@ -0,0 +1,148 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "players" ADD "kills" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "players" ADD "deaths" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "players" ADD "rerolls" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "players" ADD "timeouts" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "players" ADD "kill_streak" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "players" ADD "best_kill_streak" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "players" ADD "last_kill_at" TIMESTAMPTZ;
+        ALTER TABLE "players" ADD "last_death_at" TIMESTAMPTZ;
+
+        WITH "timeline" AS (
+            SELECT "game_id", "killer_id" AS "user_id", "updated_at" AS "at", 1 AS "is_kill"
+            FROM "kill_events" WHERE "status" = 'confirmed'
+            UNION ALL
+            SELECT "game_id", "victim_id", "updated_at", 0
+            FROM "kill_events" WHERE "status" = 'confirmed'
+        ), "numbered" AS (
+            -- серия убийств: убийства с одинаковым числом смертей перед ними
+            SELECT *, SUM(1 - "is_kill") OVER (
+                PARTITION BY "game_id", "user_id" ORDER BY "at", "is_kill" ROWS UNBOUNDED PRECEDING
+            ) AS "deaths_before"
+            FROM "timeline"
+        ), "streaks" AS (
+            SELECT "game_id", "user_id", "deaths_before", SUM("is_kill") AS "streak"
+            FROM "numbered"
+            GROUP BY "game_id", "user_id", "deaths_before"
+        ), "totals" AS (
+            SELECT
+                "game_id",
+                "user_id",
+                SUM("is_kill") AS "kills",
+                SUM(1 - "is_kill") AS "deaths",
+                MAX("at") FILTER (WHERE "is_kill" = 1) AS "last_kill_at",
+                MAX("at") FILTER (WHERE "is_kill" = 0) AS "last_death_at"
+            FROM "numbered"
+            GROUP BY "game_id", "user_id"
+        )
+        UPDATE "players" p SET
+            "kills" = t."kills",
+            "deaths" = t."deaths",
+            "last_kill_at" = t."last_kill_at",
+            "last_death_at" = t."last_death_at",
+            "kill_streak" = COALESCE(
+                (
+                    SELECT s."streak" FROM "streaks" s
+                    WHERE s."game_id" = t."game_id" AND s."user_id" = t."user_id" AND s."deaths_before" = t."deaths"
+                ),
+                0
+            ),
+            "best_kill_streak" = (
+                SELECT MAX(s."streak") FROM "streaks" s WHERE s."game_id" = t."game_id" AND s."user_id" = t."user_id"
+            )
+        FROM "totals" t
+        WHERE p."game_id" = t."game_id" AND p."user_id" = t."user_id";
+
+        UPDATE "players" p SET
+            "rerolls" = c."rerolls",
+            "timeouts" = c."timeouts"
+        FROM (
+            SELECT
+                "game_id",
+                "killer_id",
+                COUNT(*) FILTER (WHERE "status" = 'rejected') AS "rerolls",
+                COUNT(*) FILTER (WHERE "status" = 'timeout') AS "timeouts"
+            FROM "kill_events"
+            GROUP BY "game_id", "killer_id"
+        ) c
+        WHERE p."game_id" = c."game_id" AND p."user_id" = c."killer_id";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "players" DROP COLUMN "kills";
+        ALTER TABLE "players" DROP COLUMN "deaths";
+        ALTER TABLE "players" DROP COLUMN "rerolls";
+        ALTER TABLE "players" DROP COLUMN "timeouts";
+        ALTER TABLE "players" DROP COLUMN "kill_streak";
+        ALTER TABLE "players" DROP COLUMN "best_kill_streak";
+        ALTER TABLE "players" DROP COLUMN "last_kill_at";
+        ALTER TABLE "players" DROP COLUMN "last_death_at";"""
+
+
+MODELS_STATE = (
+    "eJztXXtv2zgS/yqC/0qBNPAzTheHA5w07eaaR5E4d4vtFgIt0bYQWXL1SBoU+e7Hh2SRIi"
+    "VLtmXLNVFAdUgORf6Gj+EMZ/SrMXNNaPsnF1MQNP7QfjUcMIPoB5d+rDXAfJ6k4oQAjGxS"
+    "0EAlSAoY+YEHDFzNGNg+REkm9A3PmgeW6+Ci/4TNbquJn50ueRrkeUae5nv8X7dP/iCFum"
+    "3yHGlDaMOJB2b4LaZroNdYzgRV6IS2jZJCx/oRQj1wJzCYQg9lfPtGmqVbJiZ5gq+N79/R"
+    "D8sx4U/o8wVQxrekyPxJH1vQNjksaDUkXQ9e5yTt8fHq4ydSEjdqpBuuHc6cpPT8NZi6zq"
+    "J4GFrmCabBeRPoQA8E0GSgwn2JII2TaL9QQuCFcNF8M0kw4RiENga88a9x6BgYZ428CT+6"
+    "/24ILIgQk4BouA5mn+UEGJ9fb7RXSZ9JagO/6uLPwf1R5/Qd6aXrBxOPZBJEGm+EEASAkh"
+    "KsEyAND+Ju63RM8YB+RDmBNYNyUHnKFLhmRHoS/1gF5DghQTkZxTHMMXyrYdpAfTDvHPs1"
+    "4mAOxsOrm8uH4eDmK+7JzPd/2ASiwfAS57RJ6msq9YiyxEVzkM7MRSXa/66Gf2r4T+3vu9"
+    "vLNOMW5YZ/N3CbQBi4uuO+6MBkBlucGgODSiaMDefmiozlKRVjd8rYqPHMhE1WUZ6p59bk"
+    "ygky5mpClOInAmwzHBQWwDUZOMGvef+h3e50+u1m5/Ss1+33e2fNM1SWtEnM6udw+fzq89"
+    "XtkGcaTnjjwMWbjgAs2nA9OaxR8RSkqBv1hHQGfuo2dCbBFP3Zara7OXj9d3BPdhVcLDXW"
+    "b6O8dpT59oa36fETs7/ghBEwnl6AZ+pCjtt2s8qKWbP2LJ0CHDAhAOF+4j5EktFnykVBYi"
+    "LpuRLTBJUoIzFR+ahDhCEqGI2KS0KC3OMHwAt0vKAqiUdJPGpjVBLPITNWkHicaPkuuivH"
+    "5avaljfOOW5fbvd6BbZlVCpzVyZ5vFzD7DAlpwZPuYGpETF8e2LPnkyEGIfcJQ465kpcZO"
+    "kUD7fPwxICMnMYsWxbh8/Qocq81GkvIv705R7agOAp8jaSf7+gii5xPfVc/97i0RqnyjaB"
+    "uQ1eobcmEF9JJXuMAvB9a+LM1h8SFInBoro9w6TKU2QyWyRHSW4qZZ8nU1O32Kmy3SKnSk"
+    "ieLXqqTJTuVCffHWvovyYgGR3AKOtHzJNWgcmao3UOpvhYHGvsUY+gF/2BhIIg9Kmeninz"
+    "bKHT30xSJvp9zB2h1FFXHXWrlat/lxOROur+powV9vdolUX9HVveDMq0/K5rQ+Bk6KMl5C"
+    "kWjxB9VVyV722bWAPP7+6uOQ6eX6V0+bePN+eX90ctwjpUyAqyVPwpjFaYQxlVbOVgVZGI"
+    "Vfe5U+h0HMkfq84eGbmaPW+5EK8wezKqULNnx7MnEdKLKloTiq1ZQBtz6JiYI2tID7wZ9L"
+    "SIETTNF8YEeprWteLjoLeidJamVZNix5PC8nV0yvfc59K7SYpSbST8LGHUBkUP+gzJJk/7"
+    "u1ReLz3bC3JrOcg4ogMELVpP3bK4penWgK5W628J6DhlXlHcOKIDGW+CbYdf5ET4PrketC"
+    "bOF/hKQLxC7QCOIbPNpe4v1RU0QT+Pkj3wstDssis36h3qE6TbwsXg4WLw8bIhWeg2ANuj"
+    "vylbz45g41ZvDrh7JNjcX10MG5Ipq5BLrUMFkFus99sDb2f7wlLw0psfh9/D5VC7fby+br"
+    "wVMWFHfNil2bI+OMvEOYVM5fbcr1Rj8NVzxxbpt2DUTZU4zrPsRvoHfU4Ll7k0PE6uC1ML"
+    "bbcr2G/PjjXGgnvK5HcZLyxK/YHJ7WmM9xZkCHrMSykxW+nZGsZh1sAb+nSfUjZdZdOtdA"
+    "X5bUx/yqb7mzJW2Okn1jN09LKXmHmqlfTr29/ft3CTeQxmlv1aGs4UmcIzxpNAUALIuPxe"
+    "IthpFwCw087ED2fx8Blu6PlQd8LZSKazeJgB2872ykwTr+SbuQNQqW9mp90/XXhj4j/y/C"
+    "8fbgbX1xIzgOeG8/KLI0e1l0Oxksk8n7qBKwI5hD8zRuCCYE8wzJMKLv8acgJBjNTRzeCv"
+    "d5xQcH13+zkuziB7cX13ngIUjNww0ENfNrezUeWpFLRyaG0bSVHTcDLBx2kEENaIlLSxZt"
+    "ahrK2C/9cB3u3Y/HZv+boDX2LlT/kbASliNUx5eNEZ0KdKzqJLbUKhllnpMmtMgTOBZqxK"
+    "EqD9z8PdbYZ0KlCmIH50UN+/mZYRHGu25Qffqxq7jGZuFFp2YDn+CX5hRco5DEk+H9KQH/"
+    "M6A1yBhA/bD9uys6PBlsO2zKDvg4n8PlEevjydgjgHYj8czawAaxmxXFv2wCan3pMlu2qh"
+    "Ql1SWvmSUmx3KoEaQ1LtBaX6IJZzQ0l+tN3hhZFdXXpghsXyK0rqukjR6yIL+LJvi1Rq+6"
+    "cO/zKb/yIUQI6tP4k5sGpcsMgWHzlqUyN9W2Ms8GzZXkPOGGk01XjmkjuGYixVkr1w0FaG"
+    "eWWYV/ZbZZg/ZMYKhnmEc6Rt5HmaeVxMCKoKoioy77TZXIN39KjYbnX73bPOaXdxQlyk5B"
+    "0M5b7TEh1SJmCL8tvDq0ZomWhVn5aBKyE4SLw86LnlxhdDcZCI4V3DDWVXhzMhY0kOEjMS"
+    "mgm9AIKnkisZQ3WQyI2gH+irwScjPUgMbRADUV6aTNMq5/AdO4cThpBNe1VussSKnTtmZ5"
+    "1d0uujTFbqd6V+37H6vXZu1btCbalf9Ya07rIAtBJLe0R858Chix6H4LRY2hbBdDbTKsED"
+    "ssw+kfYhLRhstp24B1LzRLeT4VUYeQz2WDdFjf2PuiP2mN+0cpOpirOA5JtJoui1aWNIkW"
+    "b3WGdIM3F67PTTKdFX7XpCQ3tFmtj8g3uFJrS+Q3+zzpxmPlhnzPf1Wkmo3wVmgCkLV6yK"
+    "a67JABA19+QfB/3DhizGeTQqCBkoDAbZEQMX+6VAxs0UvT662vk+aVN+nOPOB5YNfY0JqE"
+    "w9ZCn/YjzYqoQAyTxojItsBIs4vru4UHM0Yt7Egsr1HDIwGyy/u2nwoj5FZdu5o/8D5UNn"
+    "zDSdjnTJrGqmWs6/1aC07BilRSGDY0c7wpvJsYY34neREzI/UDS2QQwkLaHxhia2vVBsa0"
+    "p9Qiha7Ju6zJP1aGZ9mVnW9LJmQFtD/Xu2DOifMMvmSeM4w8oaixrUnJqysiqbqrKpKtOb"
+    "sqkeLmNFZ2elQym05CWITUMnQEI8kW1KIichrfQOaG1CrnE2MOChDXsl/CSkh4ef0uGVRS"
+    "w6dpfDjCParqxXQ72n0uAV1eClp6rSFpfVFrOr/AbQK/MxtV1tCUsBlOx8GVH+skQVhSRF"
+    "UiKDlY6XKOri05uNiHasZC+I9epfvtvS/rIUaG4DLWDtWOo3wKjmyYooUcfHK2W2Ch6vRK"
+    "VjAEZKLVZh12fSGUVWl1V3R5rWtF4820lAcApgQ/YFExWwT+mwlKpD6bAOnLEqYJ8K2LdH"
+    "eBIISgAZl99LBFXAPhWwryZDUQXs24dwRypgX3XQqoB9S2DfYCQ0ejoXwc0JZrQg2YxjTd"
+    "V6n92EMUIgrRK/KEW2kRWicoArlqQYCV334I/Q8qBsxOYtB1lVqNVACDtpObrcaLYs5CRD"
+    "WBmswsjdF1SBObMk8SaXftgzJlOIcojCn1aAkHJt031x9NAJLImAkK8ay6hiK85x27Oc10"
+    "kjVsg3bj8CCAMjsJ7hGhaAKvZM4RpEtiEwFWlDB76e9TXEMt8GK2NorZHVnxuAyZexqRfA"
+    "9hCpkceREIsFj5Csrz4e7ghhv822OibiV+H2c6DIvli3RVTqOlyY4H5roLHytYqaoLDL70"
+    "/WCZNS7rAlHT8H0LOMaUNyvyTKOc67YQKSMsuumGTDsPxySKl7IJk6qKIKqGiprIH+ac3I"
+    "LtnXPp7R4mLJPmaQLTIzJFXJzHtoI8FTowSIUfH9BLDVbBYAEJXKBJDkpU2eTiC9sZnz7Y"
+    "eEZFcffajs7L2xzzuUONhtfnt5+z8tUvJ6"
+)
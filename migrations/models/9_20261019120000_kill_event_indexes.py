@@ -0,0 +1,75 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_kill_events_game_id_9bab18" ON "kill_events" ("game_id", "killer_id", "status");
+        CREATE INDEX IF NOT EXISTS "idx_kill_events_game_id_f0c6fc" ON "kill_events" ("game_id", "victim_id", "status");
+        CREATE INDEX IF NOT EXISTS "idx_kill_events_status_b2c1b2" ON "kill_events" ("status", "created_at");
+        CREATE INDEX IF NOT EXISTS "idx_kill_events_pending_killer" ON "kill_events" ("game_id", "killer_id")
+            WHERE "status" = 'pending';
+        CREATE INDEX IF NOT EXISTS "idx_kill_events_pending_victim" ON "kill_events" ("game_id", "victim_id")
+            WHERE "status" = 'pending';
+        CREATE INDEX IF NOT EXISTS "idx_kill_events_pending_created_at" ON "kill_events" ("created_at")
+            WHERE "status" = 'pending';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_kill_events_pending_created_at";
+        DROP INDEX IF EXISTS "idx_kill_events_pending_victim";
+        DROP INDEX IF EXISTS "idx_kill_events_pending_killer";
+        DROP INDEX IF EXISTS "idx_kill_events_status_b2c1b2";
+        DROP INDEX IF EXISTS "idx_kill_events_game_id_f0c6fc";
+        DROP INDEX IF EXISTS "idx_kill_events_game_id_9bab18";"""
+
+
+MODELS_STATE = (
+    "eJztXVlv2zgQ/iuGnlIgLRzbObpYLOCkaettLiTObtFsIdAWrRCRKFdHDhT+70tSkkVKlC"
+    "zZlo+EL0pMzlDmNzzmIv1bsx0DWt6Hk3vga380fmsY2JD8I5TvNjQwHieltMAHA4sRDgkF"
+    "KwEDz3fBkDYzApYHSZEBvaGLxj5yMCX9L2h29pr02e6w55A9j9jTeE//dA7ZB0bUabHnoN"
+    "GHFjRdYNO3GM6QvAZhkzSIA8siRQFGvwKo+44J/Xvokoq7O/a1dGRQlgf4ov38Sf5B2IDP"
+    "0BMJSMVdQjJ+0EcIWoaARdgMK9f9lzEru73tffrMKOmXGuhDxwpsnFCPX/x7B0/JgwAZHy"
+    "gPrTMhhi7wocFBRfsSQRoXhf0iBb4bwOnXN5ICA45AYFHAtT9HAR5SnBvsTfTR+UvLiCBC"
+    "TALi0MFUfAj7FJ/fk7BXSZ9ZqUZfdfK1e73TPnjHeul4vumySoaINmGMwAchK8M6AXLoQt"
+    "ptPRxTIqCfSI2PbCgHVeRMgWtErB/if+YBOS5IUE5GcQxzDN98mGqkD8Yltl4iCRZg3O+d"
+    "n970u+dXtCe25/2yGETd/imtabHSl1TpTigSh8zBcGZOG2n82+t/bdCPjR+XF6dpwU3p+j"
+    "80+p1A4Ds6dp50YHCDLS6NgSGUiWCDsTGnYEVOJdi1Cjb68tyETVZRUajHyOxhP2euJkwp"
+    "eRLAliPBzAK4oABN+pr3H1utdvuw1WwfHO13Dg/3j5pHhJZ9p2zVYYGUj3tfehd9UWi0YC"
+    "KASzedDLBkw3XlsEbkKUhJNzYTUhs86xbEpn9PPu41W50CvP7pXrNdhZKlxvpFVNeKKicT"
+    "uk2PHrj9hRYMwPDhCbiGnqlxWk4ebbbKbtnpEoCByQCi/aR9iDSjL6EUMxoTKy/UmExCUU"
+    "VjCvWjNlOGQsVoUF4Tyug9ng9cX6cLqtJ4lMajNkal8bxlwWY0Hhwt32V35Zi+rm156ZIT"
+    "9uXW/n6JbZlQ5e7KrE7Ua7gdpuLUEDmXMDUiga9O7dmSiRDjULjEQWzMJUWeT8lw9TKsoC"
+    "BzxgiyLB0+Qhw681LWXsT8+ds1tADDMyvbSP/9Rho6pe1s5vo3iUdrXCrbBMYWeIHugkBc"
+    "sUa2DIU6LaZkZEjMJmHY5NtOqWFazoJq7TELCrLnXmhBJQ7m0P/cGTXInyZgFW3AOaYH3D"
+    "NsgrI1B4sYYdQEjL3TpEfQjT6QDdAPvNAnzdE8ImLp2BKa6P9dwVxQZp0y65T2X0b7V2bd"
+    "KxVsZkePVlnS3xFybSjzaDuOBQHO8b1K2FMiHhD+uqQq39uWsQYeX16eCRI87qX81he358"
+    "en1zt7THSECPl57uwURnPMoZwmVmJE1KRibfrcKWUJRvrHvLNHxq5mz6QQ4jlmT04Tavas"
+    "efYkSnpZp2LCsbJonzaG2KASWUB7EEN+B2UCfmm5cOG+g7RfkZqD7pzaWZpXTYo1Twrk6c"
+    "TKd53HyrtJilNtJOIs4dwGZQ19jmWZ1v46HbUzbfuM3loNMoHpDYIWradOVdzSfAtAt1Hr"
+    "bwXoBGdeWdwEpjcy3jJxDHGRy8L32XEhMvE3+MJA7JHvAfBQFodK5epsKmgZ/zwpdsHT1L"
+    "PLr9ykd6RPMNwWTro3J91Pp5pkoVsCbLfesuIaa4JNWL0F4K6JYnPdO+lrkimrkEutQyWQ"
+    "m673qwNvbfvCTPDSm5+A381pv3Fxe3amTdaTz3gV2n9XrjNCDMdMiC5FsVsUp4usSX0cEl"
+    "dJdxwliY5hvK3TyUTjjnYbXDzugKvvcOdHQu6PXO1+gzt3AjmGfe6lITPf6NECoT4+XBd4"
+    "4aqjInQqQlfrivRqAjkqQvdKBZuJ0JnoEWK9avqlyDWXt3T1+sIKcjBHwEbWS2U4U2wKzx"
+    "hPBkEFIGP6rUSw3SoBYLuVix+tEuEbOoHrQR0H9kBmgd7YwLLyz5Olmec6VbYGUMNTZe3W"
+    "4cH0HBn9UHRy7Oa8e3Ymceq6TjCuvjgKXFs5FGuZzON7x3eyQPbhc84InDJsCYZFWsHp97"
+    "6gEMRI7Zx3v78TlIKzy4svMTmH7MnZ5XEKUDBwAl8PPNnczkdV5FLQyqG1LKJF3QemSc1p"
+    "AhD1XVWMmOW2oWJnmZMrbzBSv/ztHnk6hk+x86d6fDfFrIapCC+xAb3w5EHZpTbhUMusdJ"
+    "kd3gNsQiN2JWWg/fvm8iJHO81wpiC+xaTvdwYa+rsNC3n+z7rGLueZGwTI8hH2PtAX1uSc"
+    "o5AUyyEN+a7oM6ANSOSw+gsn1mYarPjCCRt6HjDl2SFF+Ip8CuICiL1gYCOfehmpXlvVYJ"
+    "Nzb8mSXbdSoVJO5k45ieNOFVDjWOpNN9kcxAryTeSm7RrD/+sKYXPDYnbCiQr+lw3+T+Fb"
+    "U+w/PKosi/lPDzEXxPqT09Lz3mgUxeKjY7dhkL7V4CLwPO2+JheM9B7IeOayjLHsLZCsen"
+    "rcVgXmVWBexW9VYP4tCzYTmCc4R95GUaa55mLCUNf1j1nhHTSbC8guNBVbe53DzlH7oDO1"
+    "EKclRYbhdh3B2Bx1WxkoykBZs4GycccI1oXazHME67FL2HCUWCXxMM23SegwqJx0HFkh4d"
+    "1AYY7wYeraH+Fq+jBrOE5JLm+VFOYI+6bKEFaGiNJXlSHyxgWrMoRVhvAW4akyhFWGsMoQ"
+    "fiWTWWUIqwzhrYFWZQjPgH2JqZehdZ4FtyB7asqyHG/4bPt7G/OmCEjzJEyl2JayQtQOcM"
+    "2aFKeh6y78FSC38hVbeU2o1SCT546wLvciz8px5xhrgzUzcrcFVWDYSJLgPvNeuJhNISog"
+    "Cp+RT5ByLMN5wnqAfSRREGb8qIe8CfX7Hupu0dknlsDQR49wgQhAHXtmJpqaH+MS79Ai64"
+    "yn512m9dZ+KiW5WHXVPx6zOameAiDTEZJ3adjbHSH8ZVDzY5K9hmo7B4rsiqwVorKpw0X9"
+    "9lIdmRRd6KLhvSbJpYhqdouyKUBCMyudIh+G2YkQlXIecv0tZZ0t0bKwAb6WBRMP81McHs"
+    "lEQrKTwvnqIceiftIy8bGSqVEBxIh8OwHcazZLAEioCn6pu5kN72E/UmNEEAsOVics6zpR"
+    "XZudubSz0xWMmOVvL5P/ARLhKWg="
+)
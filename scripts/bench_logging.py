@@ -0,0 +1,115 @@
+"""
+Сколько времени event loop тратит на логирование одного апдейта: как было и через очередь.
+
+Как было: синхронный StreamHandler, дамп апдейта собирается до проверки уровня. Через очередь:
+VerboseLoggingMiddleware._log, запись в поток записи, дамп ленивый. Приемник строк — медленный поток
+(--sink-delay-us на строку), как stderr, который docker читает с задержкой.
+
+    uv run python -m scripts.bench_logging --updates 20000 --sample-rate 0.1
+"""
+
+import argparse
+import io
+import logging
+import sys
+import time
+
+from aiogram.types import Update
+
+from bot.middlewares.logging import VerboseLoggingMiddleware
+from services import log_pipeline
+
+logger = logging.getLogger("bench_logging")
+
+
+class _SlowSink(io.TextIOBase):
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    def write(self, s: str) -> int:
+        # Запись в занятый pipe блокирует поток, но отпускает GIL
+        time.sleep(self.delay)
+        return len(s)
+
+
+def _update(i: int) -> Update:
+    user = {"id": 1000 + i % 100, "is_bot": False, "first_name": "Bench"}
+    return Update.model_validate(
+        {
+            "update_id": i,
+            "message": {
+                "message_id": i,
+                "date": 0,
+                "chat": {"id": user["id"], "type": "private"},
+                "from": user,
+                "text": f"сообщение {i}",
+            },
+        }
+    )
+
+
+def _legacy(actions: logging.Logger, update: Update) -> None:
+    message = update.message
+    actions.info("MESSAGE: user=%s chat=%s text=%r", message.from_user.id, message.chat.id, message.text)
+    actions.debug("RAW UPDATE: %r", update.dict())
+
+
+def _configure(handler: logging.Handler, level: int) -> None:
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def _per_update(func, updates: list[Update]) -> float:
+    started = time.perf_counter()
+    for update in updates:
+        func(update)
+    return (time.perf_counter() - started) / len(updates)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--sink-delay-us", type=float, default=20.0)
+    parser.add_argument("--sample-rate", type=float, default=1.0)
+    args = parser.parse_args()
+
+    report = logging.StreamHandler(sys.stdout)
+    report.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(report)
+    logger.propagate = False
+
+    updates = [_update(i) for i in range(args.updates)]
+    actions = logging.getLogger("user_actions")
+    sink = _SlowSink(args.sink_delay_us / 1_000_000)
+
+    legacy = logging.StreamHandler(sink)
+    legacy.setFormatter(logging.Formatter(log_pipeline.TEXT_FORMAT))
+    _configure(legacy, logging.INFO)
+    legacy_cost = _per_update(lambda u: _legacy(actions, u), updates)
+
+    log_pipeline.settings.log_sample_rates = f"user_actions={args.sample_rate}"
+    log_pipeline.setup_logging(logging.INFO)
+    writer = log_pipeline._listener.handlers[0]  # noqa: SLF001
+    writer.setStream(sink)
+    queued = logging.getLogger().handlers[0]
+    pipeline_cost = _per_update(VerboseLoggingMiddleware._log, updates)  # noqa: SLF001
+    backlog = queued.queue.qsize()
+    log_pipeline.shutdown_logging()
+
+    logger.info("Апдейтов: %s, приемник %.0f мкс/строка", args.updates, args.sink_delay_us)
+    logger.info("Синхронно, дамп всегда: %7.2f мкс/апдейт", legacy_cost * 1_000_000)
+    logger.info(
+        "Через очередь:          %7.2f мкс/апдейт (x%.1f), выборка %.2f, в очереди осталось %s",
+        pipeline_cost * 1_000_000,
+        legacy_cost / pipeline_cost,
+        args.sample_rate,
+        backlog,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
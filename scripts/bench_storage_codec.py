@@ -0,0 +1,85 @@
+"""
+Сравнение кодеков FSM-хранилища: размер значения и время полного цикла dumps + loads.
+
+Образец — стек aiogram-dialog игрока в главном меню с открытым подтверждением убийства: так выглядит
+значение, которое бот читает и пишет на каждое нажатие кнопки.
+
+    uv run python -m scripts.bench_storage_codec
+"""
+
+import json
+import logging
+import sys
+import timeit
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+
+from services import settings
+from services.fsm_storage import EnhancedJSONEncoder, JsonCodec, MsgpackCodec, StorageCodec
+
+logger = logging.getLogger("bench_storage_codec")
+
+ROUNDS = 5_000
+
+
+def _intent(state: str, start_data: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "intent_id": uuid4().hex[:10],
+        "stack_id": "",
+        "state": state,
+        "start_data": start_data,
+        "dialog_data": {"confirm": False, "opened_at": datetime.now(settings.timezone).isoformat()},
+        "widget_data": {"scroll": 0, "selected": None},
+    }
+
+
+def sample(intents: int) -> dict[str, Any]:
+    game_id = uuid4()
+    stack = [
+        _intent(f"MainLoop:state_{i}", {"user_tg_id": 1_000_000 + i, "game_id": game_id, "kill_event_id": uuid4()})
+        for i in range(intents)
+    ]
+    return {
+        "aiogd_stack": {"_id": "", "intents": [i["intent_id"] for i in stack], "last_message_id": 4242},
+        **{f"aiogd_context:{i['intent_id']}": i for i in stack},
+    }
+
+
+def _legacy_json() -> tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    """Как писал бот раньше: json.dumps с EnhancedJSONEncoder и object_hook на чтении."""
+    codec = JsonCodec()
+    return (lambda data: json.dumps(data, cls=EnhancedJSONEncoder).encode()), codec.decode
+
+
+def _variants() -> dict[str, tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    variants = {"legacy json": _legacy_json()}
+    for codec in (JsonCodec(), MsgpackCodec()):
+        plain = StorageCodec(codec, compress_threshold=0)
+        compressed = StorageCodec(codec, compress_threshold=1)
+        variants[codec.name] = (plain.dumps, plain.loads)
+        variants[f"{codec.name} + zlib"] = (compressed.dumps, compressed.loads)
+    return variants
+
+
+def bench(data: dict[str, Any]) -> None:
+    for name, (dumps, loads) in _variants().items():
+        value = dumps(data)
+        if loads(value) != data:
+            logger.error("%-16s не восстанавливает исходные данные", name)
+            continue
+        seconds = timeit.timeit(lambda dumps=dumps, loads=loads: loads(dumps(data)), number=ROUNDS)
+        logger.info("%-16s %7d байт  %8.1f мкс/цикл", name, len(value), seconds / ROUNDS * 1_000_000)
+
+
+def main() -> int:
+    for intents in (1, 3, 8):
+        logger.info("Стек из %s интентов:", intents)
+        bench(sample(intents))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Сравнение рендера шаблонов: как было (dedent + format на каждый вызов) и через texts.render.
+
+texts.render берет текст, выровненный один раз при импорте, и вызывает format_map: строка разбирается на каждом
+рендере, как и в обычном format, выигрыш только в dedent. Относительно format без dedent render немного
+медленнее: поиск ключа и понятная ошибка при пропущенном поле.
+
+Берутся все шаблоны с полями из services.texts, значения полей — заглушки.
+
+    uv run python -m scripts.bench_texts
+"""
+
+import logging
+import sys
+import timeit
+from pathlib import Path
+from textwrap import dedent
+
+from services import texts
+
+logger = logging.getLogger("bench_texts")
+
+ROUNDS = 2_000
+
+
+def _values(template: texts.Template) -> dict[str, object]:
+    return {field: 42 for field in template.fields}
+
+
+def _legacy(key: str, values: dict[str, object]) -> str:
+    return dedent(texts._TEXTS[key]).format(**values)  # noqa: SLF001
+
+
+def main() -> int:
+    templates = [t for t in texts._TEMPLATES.values() if t.fields]  # noqa: SLF001
+    cases = [(t.key, _values(t)) for t in templates]
+    for key, values in cases:
+        if texts.render(key, **values) != _legacy(key, values):
+            logger.error("%s рендерится не так, как раньше", key)
+            return 1
+
+    legacy = timeit.timeit(lambda: [_legacy(key, values) for key, values in cases], number=ROUNDS)
+    plain = timeit.timeit(
+        lambda: [texts.get(key).format(**values) for key, values in cases],
+        number=ROUNDS,
+    )
+    rendered = timeit.timeit(lambda: [texts.render(key, **values) for key, values in cases], number=ROUNDS)
+    calls = ROUNDS * len(cases)
+    logger.info("Шаблонов с полями: %s", len(cases))
+    logger.info("dedent + format:   %6.2f мкс/рендер", legacy / calls * 1_000_000)
+    logger.info("format без dedent: %6.2f мкс/рендер", plain / calls * 1_000_000)
+    logger.info("texts.render:      %6.2f мкс/рендер (x%.1f)", rendered / calls * 1_000_000, legacy / rendered)
+
+    started = timeit.default_timer()
+    problems = texts.find_call_site_problems(
+        Path(texts.__file__).resolve().parent.parent / package for package in texts.CALL_SITE_PACKAGES
+    )
+    logger.info("Проверка вызовов: %.0f мс, проблем: %s", (timeit.default_timer() - started) * 1000, len(problems))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
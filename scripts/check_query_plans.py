@@ -0,0 +1,207 @@
+"""
+Проверка планов горячих запросов к kill_events и player_assignments.
+
+Создает отдельную базу в локальном Postgres, накатывает схему и частичные индексы из миграций, засевает
+игру реалистичного размера и прогоняет EXPLAIN для каждого горячего запроса. Если хоть один из них ушел
+в последовательное сканирование этих таблиц, скрипт завершается с кодом 1.
+
+    uv run python -m scripts.check_query_plans
+
+Подключение берется из обычных настроек POSTGRES_*, имя временной базы — из PLAN_CHECK_DB.
+"""
+
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import random
+import sys
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from tortoise import Tortoise, connections
+from tortoise.queryset import QuerySet
+
+from db.models import Game, KillEvent, Player, PlayerAssignment, User
+from services import settings
+
+logger = logging.getLogger("check_query_plans")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations" / "models"
+# Миграции, которые добавляют индексы, не описанные в моделях (частичные)
+RAW_INDEX_MIGRATIONS = ("9_20261019120000_kill_event_indexes.py",)
+
+USERS = 1500
+FINISHED_GAMES = 3
+HISTORY_EVENTS_PER_GAME = 6000
+FINISHED_STATUSES = ("confirmed", "rejected", "canceled", "timeout")
+
+
+def _config(database: str) -> dict[str, Any]:
+    connection = settings.tortoise_connection
+    connection["credentials"] = {**connection["credentials"], "database": database, "minsize": 1, "maxsize": 2}
+    return {
+        "connections": {"default": connection},
+        "apps": {"models": {"models": ["db.models"], "default_connection": "default"}},
+    }
+
+
+async def _apply_raw_indexes() -> None:
+    db = connections.get("default")
+    for name in RAW_INDEX_MIGRATIONS:
+        spec = importlib.util.spec_from_file_location(name.removesuffix(".py"), MIGRATIONS_DIR / name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        await db.execute_script(await module.upgrade(db))
+
+
+async def _seed() -> tuple[Game, list[User]]:
+    now = datetime.now(settings.timezone)
+    users = [User(tg_id=100_000 + i, given_name=f"user{i}", is_in_game=True) for i in range(USERS)]
+    await User.bulk_create(users, batch_size=1000)
+    users = await User.all().order_by("tg_id")
+
+    games = [
+        Game(
+            name=f"finished {i}",
+            start_date=now - timedelta(days=60 - i * 14),
+            end_date=now - timedelta(days=50 - i * 14),
+        )
+        for i in range(FINISHED_GAMES)
+    ]
+    current = Game(name="current", start_date=now - timedelta(days=3))
+    await Game.bulk_create([*games, current])
+    games = await Game.all().order_by("start_date")
+    current = games[-1]
+
+    await Player.bulk_create(
+        [Player(user_id=u.id, game_id=g.id) for g in games for u in users],
+        batch_size=2000,
+    )
+
+    rng = random.Random(42)
+    events = []
+    for game in games:
+        for _ in range(HISTORY_EVENTS_PER_GAME):
+            killer, victim = rng.sample(users, 2)
+            events.append(
+                KillEvent(
+                    game_id=game.id,
+                    killer_id=killer.id,
+                    victim_id=victim.id,
+                    status=rng.choice(FINISHED_STATUSES),
+                    created_at=game.start_date + timedelta(minutes=rng.randint(0, 10_000)),
+                )
+            )
+    # Текущая игра: у каждого игрока ровно одна активная цель, цепочкой
+    shuffled = users[:]
+    rng.shuffle(shuffled)
+    for killer, victim in zip(shuffled, shuffled[1:] + shuffled[:1], strict=True):
+        events.append(
+            KillEvent(
+                game_id=current.id,
+                killer_id=killer.id,
+                victim_id=victim.id,
+                status="pending",
+                created_at=now - timedelta(hours=rng.randint(0, 70)),
+            )
+        )
+    await KillEvent.bulk_create(events, batch_size=2000)
+
+    players = {p.user_id: p for p in await Player.filter(game_id=current.id)}
+    pending = await KillEvent.filter(game_id=current.id, status="pending")
+    targets = {e.killer_id: e.id for e in pending}
+    hunters = {e.victim_id: e.id for e in pending}
+    await PlayerAssignment.bulk_create(
+        [
+            PlayerAssignment(
+                player_id=player.id,
+                game_id=current.id,
+                user_id=user_id,
+                target_event_id=targets.get(user_id),
+                hunter_event_id=hunters.get(user_id),
+            )
+            for user_id, player in players.items()
+        ],
+        batch_size=2000,
+    )
+    await connections.get("default").execute_script("ANALYZE")
+    logger.info("Засеяно: %s пользователей, %s игр, %s килл-ивентов", len(users), len(games), len(events))
+    return current, users
+
+
+def _hot_queries(game: Game, user: User, event: KillEvent) -> dict[str, Callable[[], QuerySet]]:
+    cutoff = datetime.now(settings.timezone) - timedelta(hours=48)
+    return {
+        "assignments.get_current_events": lambda: PlayerAssignment.get_or_none(
+            game_id=game.id, user_id=user.id
+        ).select_related("target_event", "hunter_event"),
+        "assignments.release (target)": lambda: PlayerAssignment.filter(target_event_id=event.id),
+        "assignments.release (hunter)": lambda: PlayerAssignment.filter(hunter_event_id=event.id),
+        "pending by killer": lambda: KillEvent.filter(game_id=game.id, killer_id=user.id, status="pending"),
+        "pending by victim": lambda: KillEvent.filter(game_id=game.id, victim_id=user.id, status="pending"),
+        "KillTimeoutMonitor": lambda: KillEvent.filter(status="pending", created_at__lt=cutoff),
+    }
+
+
+def _seq_scans(plan: dict[str, Any], table: str) -> list[dict[str, Any]]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table:
+        found.append(plan)
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child, table))
+    return found
+
+
+def _indexes(plan: dict[str, Any]) -> list[str]:
+    found = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", []):
+        found.extend(_indexes(child))
+    return found
+
+
+async def _check(game: Game, users: list[User]) -> list[str]:
+    db = connections.get("default")
+    user = users[len(users) // 2]
+    event = await KillEvent.filter(game_id=game.id, killer_id=user.id, status="pending").first()
+    tables = {KillEvent._meta.db_table, PlayerAssignment._meta.db_table}  # noqa: SLF001
+    failed = []
+    for name, build in _hot_queries(game, user, event).items():
+        sql = build().sql(params_inline=True)
+        rows = await db.execute_query_dict(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = rows[0]["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+        if any(_seq_scans(root, table) for table in tables):
+            failed.append(name)
+            logger.error("SEQ SCAN  %s\n    %s", name, sql)
+        else:
+            logger.info("ok        %s -> %s", name, ", ".join(_indexes(root)) or root["Node Type"])
+    return failed
+
+
+async def main() -> int:
+    database = os.environ.get("PLAN_CHECK_DB", f"{settings.pg_db}_plan_check")
+    await Tortoise.init(config=_config(database), _create_db=True)
+    try:
+        await Tortoise.generate_schemas()
+        await _apply_raw_indexes()
+        game, users = await _seed()
+        failed = await _check(game, users)
+    finally:
+        await Tortoise._drop_databases()  # noqa: SLF001
+
+    if failed:
+        logger.error("Последовательное сканирование в %s запросах: %s", len(failed), ", ".join(failed))
+        return 1
+    logger.info("Все горячие запросы идут по индексам")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,115 @@
+"""
+Нагрузочный прогон вебхука: сколько апдейтов в секунду обрабатывают все реплики бота вместе.
+
+Шлет в вебхук (через балансировщик) синтетические сообщения от USERS пользователей и ждет, пока счетчик
+обработанных апдейтов (cukiller_update_queue_wait_seconds_count), просуммированный по всем репликам, не вырастет
+на число отправленных. Реплики находятся по DNS-имени сервиса бота, поэтому скрипт запускают внутри сети compose:
+
+    docker compose -f docker-compose.yml -f docker-compose-scale.yml run --rm loadtest --updates 5000
+
+Синтетические пользователи создаются в базе (tg_id от --first-user-id), а ответы им Telegram отклоняет —
+поэтому прогон делают на тестовом боте и тестовой базе. Сравните результат для --scale bot=1 и bot=3.
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import sys
+import time
+from itertools import count
+
+import aiohttp
+
+logger = logging.getLogger("load_webhook")
+
+PROCESSED_METRIC = "cukiller_update_queue_wait_seconds_count"
+
+
+def _update(update_id: int, user_id: int, text: str) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": "Load", "last_name": str(user_id)}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": "Load"},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+def _replica_urls(host: str, port: int) -> list[str]:
+    addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    return [f"http://{address}:{port}/metrics" for address in sorted(addresses)]
+
+
+async def _processed(session: aiohttp.ClientSession, urls: list[str]) -> float:
+    total = 0.0
+    for url in urls:
+        async with session.get(url) as response:
+            for line in (await response.text()).splitlines():
+                if line.startswith(PROCESSED_METRIC):
+                    total += float(line.rsplit(" ", 1)[1])
+    return total
+
+
+async def run(args: argparse.Namespace) -> int:
+    urls = _replica_urls(args.replicas_host, args.replicas_port)
+    logger.info("Реплик: %s", len(urls))
+    ids = count(int(time.time()) * 1000)
+    semaphore = asyncio.Semaphore(args.connections)
+    ack_times: list[float] = []
+
+    async with aiohttp.ClientSession() as session:
+        before = await _processed(session, urls)
+
+        async def send(i: int) -> None:
+            update = _update(next(ids), args.first_user_id + i % args.users, args.text)
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(args.webhook, json=update) as response:
+                    response.raise_for_status()
+                ack_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(args.updates)))
+        sent = time.perf_counter() - started
+
+        while True:
+            done = await _processed(session, urls) - before
+            if done >= args.updates or time.perf_counter() - started > args.timeout:
+                break
+            await asyncio.sleep(0.5)
+        elapsed = time.perf_counter() - started
+
+    ack_times.sort()
+    logger.info(
+        "Отправлено %s за %.1f с, ответ вебхука p50 %.1f мс, p99 %.1f мс",
+        args.updates,
+        sent,
+        ack_times[len(ack_times) // 2] * 1000,
+        ack_times[int(len(ack_times) * 0.99)] * 1000,
+    )
+    logger.info("Обработано %d за %.1f с: %.0f апдейтов/с", done, elapsed, done / elapsed)
+    return 0 if done >= args.updates else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--webhook", default="http://bot-lb/telegram/webhook")
+    parser.add_argument("--replicas-host", default="bot")
+    parser.add_argument("--replicas-port", type=int, default=8000)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--first-user-id", type=int, default=9_000_000_000)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--text", default="/start")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
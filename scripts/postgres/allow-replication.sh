@@ -0,0 +1,3 @@
+#!/bin/sh
+# Разрешает потоковую репликацию для db-replica (выполняется только при инициализации нового тома)
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -6,6 +6,7 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from db.models import User
 from db.models.chat import Chat
+from services.hot_cache import hot_cache
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +48,7 @@ class AdminChatService:
 
     @staticmethod
     async def _get_chat(key: str) -> Chat:
-        chat = await Chat.get_or_none(key=key)
+        chat = await hot_cache.chat(key)
         if chat is None:
             raise ChatNotFoundError(key)
         return chat
@@ -0,0 +1,87 @@
+"""
+Текущие назначения игроков (таблица player_assignments).
+
+Для каждого активного игрока храним его pending-событие как киллера (цель) и как жертвы (охотник).
+Меняем назначения в той же транзакции, что и статус KillEvent: матч назначает, подтверждение, реролл,
+таймаут и выход из игры освобождают.
+"""
+
+import logging
+
+from tortoise import BaseDBAsyncClient
+
+from db.models import KillEvent, Player, PlayerAssignment
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_assignment(player: Player, using_db: BaseDBAsyncClient | None = None) -> PlayerAssignment:
+    assignment, _ = await PlayerAssignment.get_or_create(
+        game_id=player.game_id,
+        user_id=player.user_id,
+        defaults={"player_id": player.id},
+        using_db=using_db,
+    )
+    return assignment
+
+
+async def get_current_events(game_id, user_id) -> tuple[KillEvent | None, KillEvent | None]:
+    """Текущее событие игрока как киллера и как жертвы — одно чтение по ключу (game, user)."""
+    assignment = await PlayerAssignment.get_or_none(game_id=game_id, user_id=user_id).select_related(
+        "target_event", "hunter_event"
+    )
+    if assignment is None:
+        return None, None
+    return assignment.target_event, assignment.hunter_event
+
+
+class AssignmentTakenError(Exception):
+    """У игрока уже есть pending-событие в этой роли: новое назначение затерло бы его."""
+
+
+async def assign(kill_event: KillEvent, using_db: BaseDBAsyncClient | None = None) -> None:
+    """Новый матч: киллер получает цель, жертва — охотника. Занятое место не перезаписываем."""
+    for user_id, field in ((kill_event.killer_id, "target_event_id"), (kill_event.victim_id, "hunter_event_id")):
+        updated = (
+            await PlayerAssignment.filter(game_id=kill_event.game_id, user_id=user_id, **{field: None})
+            .using_db(using_db)
+            .update(**{field: kill_event.id})
+        )
+        if updated:
+            continue
+        taken = (
+            await PlayerAssignment.filter(game_id=kill_event.game_id, user_id=user_id)
+            .using_db(using_db)
+            .values_list(field, flat=True)
+        )
+        if taken:
+            logger.error(
+                "У игрока %s в игре %s уже назначено %s, событие %s не назначаем",
+                user_id,
+                kill_event.game_id,
+                taken[0],
+                kill_event.id,
+            )
+            raise AssignmentTakenError(f"{field} игрока {user_id} уже занят событием {taken[0]}")
+        player = await Player.get_or_none(game_id=kill_event.game_id, user_id=user_id, using_db=using_db)
+        if player is None:
+            logger.warning("Нет игрока %s в игре %s для назначения по %s", user_id, kill_event.game_id, kill_event.id)
+            continue
+        await PlayerAssignment.create(
+            player_id=player.id,
+            game_id=kill_event.game_id,
+            user_id=user_id,
+            using_db=using_db,
+            **{field: kill_event.id},
+        )
+
+
+async def release(kill_event: KillEvent, using_db: BaseDBAsyncClient | None = None) -> None:
+    """Событие больше не pending: снимаем его с киллера и жертвы."""
+    await PlayerAssignment.filter(target_event_id=kill_event.id).using_db(using_db).update(target_event_id=None)
+    await PlayerAssignment.filter(hunter_event_id=kill_event.id).using_db(using_db).update(hunter_event_id=None)
+
+
+async def remove(game_id, user_id, using_db: BaseDBAsyncClient | None = None) -> None:
+    """Игрок выбыл из игры."""
+    await PlayerAssignment.filter(game_id=game_id, user_id=user_id).using_db(using_db).delete()
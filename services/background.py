@@ -0,0 +1,53 @@
+"""
+Учет фоновых задач процесса, которые нельзя просто оборвать при остановке.
+
+Задачи, запущенные «в фоне» от обработчиков (отложенные действия, рассылки), регистрируются через spawn().
+При остановке drain() ждет их до дедлайна и отменяет оставшиеся, возвращая, сколько завершилось и сколько
+брошено.
+"""
+
+import asyncio
+import logging
+from collections.abc import Coroutine
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    def __init__(self) -> None:
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], *, name: str | None = None) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Фоновая задача %s завершилась ошибкой", task.get_name(), exc_info=task.exception())
+
+    async def drain(self, timeout: float) -> tuple[int, int]:
+        """Дождаться задач не дольше timeout секунд; оставшиеся отменить. Возвращает (завершено, брошено)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        finished = 0
+        # Пока ждем, задачи могут запускать новые: ждем и их
+        while self._tasks and (remaining := deadline - loop.time()) > 0:
+            done, _ = await asyncio.wait(set(self._tasks), timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            finished += len(done)
+
+        abandoned = set(self._tasks)
+        for task in abandoned:
+            task.cancel()
+        if abandoned:
+            await asyncio.wait(abandoned)
+        return finished, len(abandoned)
+
+
+background = BackgroundTasks()
@@ -0,0 +1,57 @@
+"""
+Сигнал перегрузки Telegram Bot API.
+
+Заполняется из request-middleware бота: флуд-контроль (429, retry_after) блокирует отправку до указанного
+момента, а скользящее среднее задержки показывает, что Telegram начал отвечать медленно. Рассылки
+(создание и завершение игры) ждут снятия блокировки перед каждой отправкой.
+"""
+
+import asyncio
+import logging
+import time
+
+from services import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramBackpressure:
+    def __init__(self, *, latency_alpha: float = 0.2) -> None:
+        self.latency_alpha = latency_alpha
+        self._blocked_until = 0.0
+        self._latency_ewma = 0.0
+        metrics.telegram_flood_wait.set_function(self.flood_wait_remaining)
+
+    def flood_wait_remaining(self) -> float:
+        """Сколько секунд еще действует флуд-контроль."""
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    @property
+    def latency(self) -> float:
+        """Скользящее среднее задержки вызовов Bot API в секундах."""
+        return self._latency_ewma
+
+    @property
+    def is_saturated(self) -> bool:
+        return self.flood_wait_remaining() > 0 or self._latency_ewma * 1000 >= settings.telegram_slow_call_threshold_ms
+
+    def observe_latency(self, duration: float) -> None:
+        if self._latency_ewma == 0.0:
+            self._latency_ewma = duration
+        else:
+            self._latency_ewma += self.latency_alpha * (duration - self._latency_ewma)
+
+    def observe_retry_after(self, retry_after: float) -> None:
+        blocked_until = time.monotonic() + retry_after
+        if blocked_until > self._blocked_until:
+            self._blocked_until = blocked_until
+            logger.warning("Telegram включил флуд-контроль на %s с", retry_after)
+
+    async def wait(self) -> None:
+        """Дождаться окончания флуд-контроля, если он активен."""
+        while (remaining := self.flood_wait_remaining()) > 0:
+            await asyncio.sleep(remaining)
+
+
+telegram_backpressure = TelegramBackpressure()
@@ -3,20 +3,23 @@ import math
 from datetime import datetime, timedelta
 
 from aiogram_dialog.manager.bg_manager import BgManagerFactoryImpl
+from tortoise import BaseDBAsyncClient
 from tortoise.expressions import Q
 
 from db.models import User
 from db.models import Game, Player, KillEvent
-from services import settings, texts
+from services import assignments, player_stats, settings, texts
 from services.admin_chat import AdminChatService
+from services.leaderboard import leaderboards
 from services.matchmaking import MatchmakingService
+from services.menu_snapshot import menu_snapshots
 
 
 logger = logging.getLogger(__name__)
 
 
-async def modify_rating(killer_player: Player, victim_player: Player, killer_k=1, victim_k=0, p=1):
-    """After successful kill, update ELO ratings of killer and victim."""
+def rate(killer_player: Player, victim_player: Player, killer_k=1, victim_k=0, p=1) -> tuple[int, int]:
+    """Compute new ELO ratings in place (without saving) and return the rounded deltas."""
     killer_rating = killer_player.rating
     victim_rating = victim_player.rating
 
@@ -26,14 +29,21 @@ async def modify_rating(killer_player: Player, victim_player: Player, killer_k=1
     killer_delta = settings.K_KILLER * (killer_k - expected_killer) * p
     victim_delta = settings.K_VICTIM * (victim_k - expected_victim) * p
 
-    killer_new = killer_rating + killer_delta
-    victim_new = victim_rating + victim_delta
+    killer_player.rating = round(killer_rating + killer_delta)
+    victim_player.rating = round(victim_rating + victim_delta)
+
+    return round(killer_delta), round(victim_delta)
+
+
+async def save_ratings(*players: Player, using_db: BaseDBAsyncClient | None = None) -> None:
+    # только рейтинг: счетчики обновляются F-выражениями, устаревшие значения их бы затерли
+    for player in players:
+        await player.save(update_fields=["rating"], using_db=using_db)
 
-    killer_player.rating = round(killer_new)
-    victim_player.rating = round(victim_new)
 
-    await killer_player.save()
-    await victim_player.save()
+async def after_rating_change(killer_player: Player, victim_player: Player) -> None:
+    """Side effects of saved ratings: leaderboard and ban on non-positive rating. Call after commit."""
+    await leaderboards.update_ratings(killer_player, victim_player)
 
     if killer_player.rating <= 0:
         await killer_player.fetch_related("user")
@@ -42,7 +52,13 @@ async def modify_rating(killer_player: Player, victim_player: Player, killer_k=1
         await victim_player.fetch_related("user")
         await ban(victim_player.user, "Отрицательный рейтинг, game over")
 
-    return round(killer_delta), round(victim_delta)
+
+async def modify_rating(killer_player: Player, victim_player: Player, killer_k=1, victim_k=0, p=1):
+    """After successful kill, update ELO ratings of killer and victim."""
+    deltas = rate(killer_player, victim_player, killer_k, victim_k, p)
+    await save_ratings(killer_player, victim_player)
+    await after_rating_change(killer_player, victim_player)
+    return deltas
 
 
 def calculate_penalty_at(creation: datetime, at: datetime | None = None) -> float:
@@ -83,6 +99,11 @@ async def recalc_game_ratings(game: Game) -> None:
             penalty = calculate_penalty_at(event.created_at, event.updated_at)
             await modify_rating(killer_player, victim_player, 0, 1, penalty)
 
+    # убийства и смерти тоже могли поменяться (бан, откат килла)
+    await player_stats.rebuild(game.id)
+    await leaderboards.rebuild(game.id)
+    await menu_snapshots.invalidate_game(game.id)
+
 
 async def ban(user: User, reason: str) -> str:
     user.status = "banned"
@@ -107,6 +128,7 @@ async def ban(user: User, reason: str) -> str:
         removed_events = len(evs)
         if evs:
             await KillEvent.filter(id__in=[ev.id for ev in evs]).delete()
+        await assignments.remove(game.id, user.id)
 
         await recalc_game_ratings(game)
 
@@ -1,10 +1,11 @@
-from collections import Counter
 from datetime import datetime
 from uuid import UUID
 
 from pydantic import BaseModel
 
 from db.models import Game, KillEvent, Player, User
+from db.routing import replica_safe
+from services.leaderboard import DEATHS, KILLS, RATING, leaderboards
 from services.settings import settings
 from services.strings import format_timedelta
 from services.time import human_time
@@ -30,11 +31,10 @@ class CreditsInfo(BaseModel):
         arbitrary_types_allowed = True
 
     @classmethod
-    async def from_game(cls, game: Game, top_count: int = 3) -> "CreditsInfo":
-        players = await Player.filter(game_id=game.id).order_by("-rating").limit(top_count).prefetch_related("user")
-
-        # Rating TOP
-        rating_top = cls._format_top([(p.user, p.rating) for p in players], empty="Нет участников")
+    @replica_safe
+    async def from_game(cls, game: Game, top_count: int = 3, *, with_players: bool = False) -> "CreditsInfo":
+        """Топы берутся из лидербордов; полная статистика по игрокам (для титров) — только с with_players."""
+        tops = {board: await leaderboards.top(game.id, board, top_count) for board in (RATING, KILLS, DEATHS)}
 
         # Game duration
         duration = (
@@ -43,31 +43,22 @@ class CreditsInfo(BaseModel):
             else format_timedelta(datetime.now(settings.timezone) - game.start_date)
         )
 
-        # --- Load all confirmed kill events ---
-        kills = await KillEvent.filter(game_id=game.id, status="confirmed").values(
-            "killer_id", "victim_id", "updated_at"
-        )
-
-        # Build counters
-        killer_counts = Counter(k["killer_id"] for k in kills)
-        victim_counts = Counter(k["victim_id"] for k in kills)
-
-        # Load users for involved players
-        all_user_ids = set(killer_counts) | set(victim_counts)
-        users = {u.id: u for u in await User.filter(id__in=all_user_ids)}
+        # Load users for all ids in the tops
+        top_user_ids = {user_id for top in tops.values() for user_id, _ in top}
+        users = {u.id: u for u in await User.filter(id__in=top_user_ids)}
 
-        # Killers top / victims top
+        rating_top = cls._format_top(
+            [(users[uid], value) for uid, value in tops[RATING] if uid in users], empty="Нет участников"
+        )
         killers_top = cls._format_top(
-            [(users[uid], killer_counts[uid]) for uid, _ in killer_counts.most_common(top_count)],
-            empty="Нет данных",
+            [(users[uid], value) for uid, value in tops[KILLS] if uid in users], empty="Нет данных"
         )
         victims_top = cls._format_top(
-            [(users[uid], victim_counts[uid]) for uid, _ in victim_counts.most_common(top_count)],
-            empty="Нет данных",
+            [(users[uid], value) for uid, value in tops[DEATHS] if uid in users], empty="Нет данных"
         )
 
         # --- Per-player full stats ---
-        per_player = await cls._build_player_stats(game, users, kills)
+        per_player = await cls._build_player_stats(game) if with_players else {}
 
         return cls(
             name=game.name,
@@ -87,20 +78,21 @@ class CreditsInfo(BaseModel):
         return "\n".join(f"{i}: {user.mention_html(max_len=20)} — {value}" for i, (user, value) in enumerate(items, 1))
 
     @staticmethod
-    async def _build_player_stats(game: Game, users: dict[int, User], kills: list[dict]) -> dict[UUID, PlayerStats]:
+    async def _build_player_stats(game: Game) -> dict[UUID, PlayerStats]:
+        # --- Load all confirmed kill events ---
+        kills = await KillEvent.filter(game_id=game.id, status="confirmed").values(
+            "killer_id", "victim_id", "updated_at"
+        )
         # preload all players
         all_players = await Player.filter(game_id=game.id).prefetch_related("user").all()
-        stats = {p.user.id: PlayerStats(rating=p.rating) for p in all_players}
+        users = {p.user.id: p.user for p in all_players}
+        stats = {p.user.id: PlayerStats(rating=p.rating, kills=p.kills, deaths=p.deaths) for p in all_players}
 
         for k in kills:
             killer_id = k["killer_id"]
             victim_id = k["victim_id"]
             ts = human_time(k["updated_at"])
 
-            # increment stats
-            stats[killer_id].kills += 1
-            stats[victim_id].deaths += 1
-
             # logs with HTML mentions
             stats[killer_id].log.append(f"Вы убили {users[victim_id].mention_html(max_len=25)} в {ts}")
             stats[victim_id].log.append(f"Вас убил {users[killer_id].mention_html(max_len=25)} в {ts}")
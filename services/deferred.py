@@ -0,0 +1,138 @@
+"""
+Отложенные действия, которые переживают перезапуск бота.
+
+Раньше «удалить сообщение через 10 секунд» или «напомнить модератору через 10 минут» были задачами
+с asyncio.sleep внутри процесса и терялись при каждом деплое. Теперь действие кладется в sorted set Redis
+со временем запуска, а ведущая реплика (services.leader) раз в DEFERRED_POLL_INTERVAL_SECONDS забирает
+наступившие и выполняет их фоновыми задачами (services.background), которые при остановке дожидаются.
+Действие, которое не успело завершиться до дедлайна остановки, возвращается в очередь и выполнится еще раз.
+
+Вид действия регистрируется декоратором @deferred.handler("kind"); аргументы должны сериализоваться в JSON.
+Если Redis недоступен, действие выполняется таймером в процессе, как раньше.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from services import settings
+from services.background import background
+from services.metrics import metrics
+from services.redis import redis
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[..., Awaitable[None]]
+
+# Забрать наступившие действия атомарно, чтобы одно действие не выполнилось дважды
+_CLAIM_DUE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+
+class DeferredJobs:
+    def __init__(self, client: Redis, *, poll_interval: float, batch: int = 100, key: str = "deferred") -> None:
+        self.client = client
+        self.poll_interval = poll_interval
+        self.batch = batch
+        self.key = key
+        self._handlers: dict[str, Handler] = {}
+        self._claim = client.register_script(_CLAIM_DUE)
+        self._task: asyncio.Task | None = None
+        self._running = False
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        def register(func: Handler) -> Handler:
+            self._handlers[kind] = func
+            return func
+
+        return register
+
+    async def schedule(self, kind: str, delay: float, **payload: Any) -> None:
+        if kind not in self._handlers:
+            raise KeyError(f"Неизвестное отложенное действие: {kind}")
+        job = json.dumps({"id": uuid4().hex, "kind": kind, "payload": payload}, separators=(",", ":"))
+        try:
+            await self.client.zadd(self.key, {job: time.time() + delay})
+        except RedisError as e:
+            logger.warning("Не удалось сохранить отложенное действие %s, выполним его в процессе: %s", kind, e)
+            background.spawn(self._run_later(delay, kind, payload), name=f"deferred:{kind}")
+
+    async def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info("Запустили отложенные действия (%s видов)", len(self._handlers))
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        logger.info("Остановили отложенные действия")
+
+    async def _run_loop(self) -> None:
+        while self._running:
+            try:
+                for raw in await self._claim(keys=[self.key], args=[time.time(), self.batch]):
+                    job = json.loads(raw)
+                    background.spawn(self._run_claimed(raw, job), name=f"deferred:{job['kind']}")
+            except asyncio.CancelledError:
+                break
+            except Exception as exc:
+                logger.exception("Не удалось забрать отложенные действия: %s", exc)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run_claimed(self, raw: str, job: dict[str, Any]) -> None:
+        try:
+            await self._run(job["kind"], job["payload"])
+        except asyncio.CancelledError:
+            # Действие уже убрано из очереди при захвате: если остановка оборвала его, возвращаем обратно,
+            # чтобы следующая ведущая реплика выполнила его заново
+            try:
+                await self.client.zadd(self.key, {raw: time.time()})
+            except RedisError as e:
+                logger.error("Отложенное действие %s потеряно при остановке: %s", job["kind"], e)
+            else:
+                metrics.increment_deferred_job(job["kind"], "requeued")
+            raise
+
+    async def _run_later(self, delay: float, kind: str, payload: dict[str, Any]) -> None:
+        await asyncio.sleep(delay)
+        await self._run(kind, payload)
+
+    async def _run(self, kind: str, payload: dict[str, Any]) -> None:
+        handler = self._handlers.get(kind)
+        if handler is None:
+            logger.error("Отложенное действие %s никто не обрабатывает", kind)
+            metrics.increment_deferred_job(kind, "unknown")
+            return
+        try:
+            with metrics.track_operation(f"deferred:{kind}"):
+                await handler(**payload)
+        except Exception as exc:
+            logger.exception("Отложенное действие %s завершилось ошибкой: %s", kind, exc)
+            metrics.increment_deferred_job(kind, "error")
+            return
+        metrics.increment_deferred_job(kind, "done")
+
+
+deferred = DeferredJobs(redis, poll_interval=settings.deferred_poll_interval)
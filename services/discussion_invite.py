@@ -1,32 +1,71 @@
+"""
+Ссылка-приглашение в чат обсуждения, одна на все реплики.
+
+Ссылку создает только ведущая реплика (services.leader) и кладет в Redis, остальные читают ее оттуда. Ссылка
+переживает перезапуски: новая ведущая реплика берет уже созданную, а не плодит новые на каждый деплой.
+"""
+
 import logging
+import time
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
 from services import settings
+from services.redis import redis
 
 logger = logging.getLogger(__name__)
 
 
-async def generate_discussion_invite_link(bot: Bot):
-    try:
-        settings.discussion_chat_invite_link = await bot.create_chat_invite_link(
-            settings.discussion_chat_id,
-            name="bot",
-            creates_join_request=True,
-        )
-    except TelegramBadRequest as e:
-        logger.warning("Какая-то ошибка %s", e)
-        settings.discussion_chat_invite_link = None
-
-
-async def revoke_discussion_invite_link(bot: Bot):
-    if not settings.discussion_chat_invite_link:
-        return
-    try:
-        await bot.revoke_chat_invite_link(
-            settings.discussion_chat_id,
-            settings.discussion_chat_invite_link.invite_link,
-        )
-    except TelegramBadRequest as e:
-        logger.warning("Какая-то ошибка: %s", e)
+class DiscussionInvite:
+    def __init__(self, client: Redis, cache_ttl: float, key: str = "discussion_invite") -> None:
+        self.client = client
+        self.cache_ttl = cache_ttl
+        self.key = key
+        self._cached: tuple[float, str | None] | None = None
+
+    async def ensure(self, bot: Bot) -> None:
+        """Создать ссылку, если ее еще нет. Вызывается только в ведущей реплике."""
+        try:
+            if await self.client.exists(self.key):
+                return
+        except RedisError as e:
+            logger.warning("Ссылка-приглашение недоступна: %s", e)
+            return
+
+        try:
+            invite = await bot.create_chat_invite_link(
+                settings.discussion_chat_id,
+                name="bot",
+                creates_join_request=True,
+            )
+        except TelegramBadRequest as e:
+            logger.warning("Какая-то ошибка %s", e)
+            return
+
+        try:
+            await self.client.set(self.key, invite.invite_link)
+        except RedisError as e:
+            logger.warning("Не удалось сохранить ссылку-приглашение: %s", e)
+            return
+        self._cached = None
+        logger.info("Создали ссылку-приглашение в чат обсуждения")
+
+    async def link(self) -> str | None:
+        """Текущая ссылка; из Redis читается не чаще раза в cache_ttl секунд."""
+        cached = self._cached
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        try:
+            raw = await self.client.get(self.key)
+        except RedisError as e:
+            logger.warning("Ссылка-приглашение недоступна: %s", e)
+            return cached[1] if cached else None
+        value = raw.decode() if raw is not None else None
+        self._cached = (time.monotonic() + self.cache_ttl, value)
+        return value
+
+
+discussion_invite = DiscussionInvite(redis, cache_ttl=settings.hot_cache_ttl)
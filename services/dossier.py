@@ -0,0 +1,47 @@
+"""
+Карточки цели (досье) в Redis.
+
+Карточка — то, что киллер видит о жертве: имя, tg_id для ссылки, file_id фото и текст анкеты. Собирается один раз
+при матче (handle_match) и хранится по id KillEvent, поэтому окно цели и навигация по нему не читают профиль жертвы
+из базы. Если жертва поменяла анкету и модерация ее одобрила, карточка пересобирается. Живет DOSSIER_TTL_SECONDS —
+дольше дедлайна на убийство; если ключа нет (Redis очищен), карточку соберут заново при первом показе.
+"""
+
+import json
+import logging
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from services import settings
+from services.redis import redis
+
+logger = logging.getLogger(__name__)
+
+
+class DossierCards:
+    def __init__(self, client: Redis, ttl: int, prefix: str = "dossier") -> None:
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, kill_event_id) -> str:
+        return f"{self.prefix}:{kill_event_id}"
+
+    async def get(self, kill_event_id) -> dict[str, Any] | None:
+        try:
+            raw = await self.client.get(self._key(kill_event_id))
+        except RedisError as e:
+            logger.warning("Карточка цели %s недоступна: %s", kill_event_id, e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def put(self, kill_event_id, card: dict[str, Any]) -> None:
+        try:
+            await self.client.set(self._key(kill_event_id), json.dumps(card, separators=(",", ":")), ex=self.ttl)
+        except RedisError as e:
+            logger.warning("Не удалось сохранить карточку цели %s: %s", kill_event_id, e)
+
+
+dossier_cards = DossierCards(redis, ttl=settings.dossier_ttl)
@@ -0,0 +1,320 @@
+"""
+Хранилище FSM и стеков aiogram-dialog в Redis с подключаемым кодеком.
+
+Стек диалога читается и пишется несколько раз на каждое нажатие кнопки, поэтому формат хранения важен.
+Поддерживаются два кодека:
+
+- ``json`` — исторический формат (JSON с UUID в виде ``{"__uuid__": ...}``);
+- ``msgpack`` — бинарный, с родными UUID и datetime через ext-типы (по умолчанию, ``auto``).
+
+Значения больше порога сжимаются zlib. Новые значения начинаются с байта-заголовка (кодек и флаг сжатия),
+несжатый JSON пишется без заголовка, как раньше, поэтому на ``FSM_STORAGE_CODEC=json`` можно откатиться.
+Старые ключи читаются как есть и при первом чтении переписываются в текущем формате (compare-and-set,
+чтобы не затереть параллельную запись).
+
+Запись контекста и стека диалога за одно обновление собирается в пачку и уходит одним pipeline при снятии
+блокировки стека (``BatchingEventIsolation``). Чтения внутри пачки видят ее записи и не ходят в Redis повторно
+за уже прочитанным ключом. Сами чтения в один round-trip не собрать: ключ контекста становится известен только
+после чтения стека (и наоборот для callback-кнопок).
+
+Контексты диалогов пишутся с TTL (FSM_CONTEXT_TTL_SECONDS), остальное чистит services.redis_sweeper.
+
+Блокировка стека по умолчанию живет в процессе. Если реплик несколько (MULTI_REPLICA), стек блокируется
+ключом в Redis, и нажатия одного пользователя, пришедшие в разные реплики, все равно обрабатываются по очереди.
+"""
+
+import contextlib
+import json
+import logging
+import zlib
+from collections.abc import AsyncGenerator, Mapping
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Protocol
+from uuid import UUID
+
+import msgpack
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from aiogram.fsm.storage.memory import SimpleEventIsolation
+from aiogram.fsm.storage.redis import RedisEventIsolation, RedisStorage
+from redis.asyncio import Redis
+
+from services import settings
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED = 0x80
+STACK_MARKER = ":aiogd:stack:"
+CONTEXT_MARKER = ":aiogd:context:"
+_LEGACY_JSON_START = ord("{")
+
+# Переписать значение, только если его никто не поменял с момента чтения
+_COMPARE_AND_SET = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+end
+return nil
+"""
+
+
+class Codec(Protocol):
+    id: int
+    name: str
+
+    def encode(self, data: Any) -> bytes: ...
+
+    def decode(self, payload: bytes) -> Any: ...
+
+
+class EnhancedJSONEncoder(json.JSONEncoder):
+    """JSON encoder that supports UUID."""
+
+    def default(self, obj):
+        if isinstance(obj, UUID):
+            return {"__uuid__": str(obj)}
+        return super().default(obj)
+
+
+def _json_object_hook(obj):
+    if "__uuid__" in obj:
+        return UUID(obj["__uuid__"])
+    return obj
+
+
+class JsonCodec:
+    id = 0x01
+    name = "json"
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, cls=EnhancedJSONEncoder, separators=(",", ":")).encode()
+
+    def decode(self, payload: bytes) -> Any:
+        return json.loads(payload, object_hook=_json_object_hook)
+
+
+_EXT_UUID = 1
+_EXT_DATETIME = 2
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, UUID):
+        return msgpack.ExtType(_EXT_UUID, obj.bytes)
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    msg = f"Object of type {type(obj).__name__} is not msgpack serializable"
+    raise TypeError(msg)
+
+
+def _msgpack_ext_hook(code: int, data: bytes):
+    if code == _EXT_UUID:
+        return UUID(bytes=data)
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+class MsgpackCodec:
+    id = 0x02
+    name = "msgpack"
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+
+def build_codec(name: str) -> Codec:
+    if name in {"auto", "msgpack"}:
+        return MsgpackCodec()
+    if name == "json":
+        return JsonCodec()
+    msg = f"Неизвестный кодек хранилища: {name}"
+    raise ValueError(msg)
+
+
+class StorageCodec:
+    """Кодек + сжатие + байт-заголовок. Читает все известные форматы, пишет текущий."""
+
+    def __init__(self, codec: Codec, compress_threshold: int, compress_level: int = 6) -> None:
+        self.codec = codec
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self._decoders = {c.id: c for c in (JsonCodec(), MsgpackCodec())}
+
+    def dumps(self, data: Any) -> bytes:
+        payload = self.codec.encode(data)
+        if self.compress_threshold and len(payload) >= self.compress_threshold:
+            return bytes((self.codec.id | COMPRESSED,)) + zlib.compress(payload, self.compress_level)
+        if isinstance(self.codec, JsonCodec):
+            return payload
+        return bytes((self.codec.id,)) + payload
+
+    def loads(self, value: bytes | str) -> Any:
+        if isinstance(value, str):
+            value = value.encode()
+        header = value[0]
+        if header == _LEGACY_JSON_START:
+            return self._decoders[JsonCodec.id].decode(value)
+        payload = value[1:]
+        if header & COMPRESSED:
+            payload = zlib.decompress(payload)
+        return self._decoders[header & ~COMPRESSED].decode(payload)
+
+    def is_current(self, value: bytes) -> bool:
+        """Записано ли значение так же, как его записал бы dumps()."""
+        header = value[0]
+        if header == _LEGACY_JSON_START:
+            return isinstance(self.codec, JsonCodec) and not (
+                self.compress_threshold and len(value) >= self.compress_threshold
+            )
+        return header & ~COMPRESSED == self.codec.id
+
+
+class _Batch:
+    """Значения ключей, прочитанные и записанные за время одной блокировки."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes | None] = {}
+        self.dirty: set[str] = set()
+        self.closed = False
+
+
+_batch: ContextVar[_Batch | None] = ContextVar("fsm_storage_batch", default=None)
+
+
+def _open_batch() -> _Batch | None:
+    batch = _batch.get()
+    if batch is None or batch.closed:
+        return None
+    return batch
+
+
+class CodecRedisStorage(RedisStorage):
+    """RedisStorage, который отдает кодеку сырые байты и лениво переводит старые ключи в текущий формат."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        codec: StorageCodec,
+        *,
+        context_ttl: int | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(redis, json_dumps=codec.dumps, json_loads=codec.loads, **kwargs)
+        self.codec = codec
+        self.context_ttl = context_ttl
+        self._compare_and_set = redis.register_script(_COMPARE_AND_SET)
+
+    def _expiry(self, redis_key: str):
+        """Контексты диалогов живут context_ttl с последней записи, остальные данные — data_ttl."""
+        if self.context_ttl and CONTEXT_MARKER in redis_key:
+            return self.context_ttl
+        return self.data_ttl
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            await super().set_data(key, data)
+            return
+        redis_key = self.key_builder.build(key, "data")
+        # Кодируем сразу, как и RedisStorage: последующие изменения словаря не должны попасть в запись
+        value = self.codec.dumps(data) if data else None
+        batch = _open_batch()
+        if batch is not None:
+            batch.values[redis_key] = value
+            batch.dirty.add(redis_key)
+        elif value is None:
+            await self.redis.delete(redis_key)
+        else:
+            await self.redis.set(redis_key, value, ex=self._expiry(redis_key))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        redis_key = self.key_builder.build(key, "data")
+        batch = _open_batch()
+        if batch is not None and redis_key in batch.values:
+            value = batch.values[redis_key]
+            return {} if value is None else self.codec.loads(value)
+        value = await self.redis.get(redis_key)
+        if batch is not None:
+            batch.values[redis_key] = value
+        if value is None:
+            return {}
+        data = self.codec.loads(value)
+        if not self.codec.is_current(value):
+            await self._migrate(redis_key, value, data)
+        return data
+
+    async def _migrate(self, redis_key: str, old: bytes, data: dict[str, Any]) -> None:
+        try:
+            await self._compare_and_set(keys=[redis_key], args=[old, self.codec.dumps(data)])
+        except Exception as e:
+            logger.warning("Не удалось перевести ключ %s в формат %s: %s", redis_key, self.codec.codec.name, e)
+
+    async def flush(self, batch: _Batch) -> None:
+        """Записать накопленные изменения одним pipeline."""
+        batch.closed = True
+        if not batch.dirty:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for redis_key in batch.dirty:
+                value = batch.values[redis_key]
+                if value is None:
+                    pipe.delete(redis_key)
+                else:
+                    pipe.set(redis_key, value, ex=self._expiry(redis_key))
+            await pipe.execute()
+
+
+class BatchingEventIsolation(BaseEventIsolation):
+    """
+    Изоляция событий aiogram-dialog, которая на время блокировки стека копит записи хранилища.
+
+    Пачка сбрасывается до снятия внутренней блокировки, так что следующее событие того же стека видит уже
+    записанное состояние. Записи после сброса (например, из задач, созданных обработчиком) идут напрямую.
+    """
+
+    def __init__(self, storage: CodecRedisStorage, inner: BaseEventIsolation | None = None) -> None:
+        self.storage = storage
+        self.inner = inner or SimpleEventIsolation()
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        async with self.inner.lock(key):
+            batch = _Batch()
+            token = _batch.set(batch)
+            try:
+                yield
+            finally:
+                with contextlib.suppress(ValueError):
+                    _batch.reset(token)
+                await self.storage.flush(batch)
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+
+def build_events_isolation(storage: CodecRedisStorage) -> BaseEventIsolation:
+    """Изоляция событий aiogram-dialog по настройкам: распределенная или в процессе, с пачками записей или без."""
+    if settings.multi_replica:
+        inner = RedisEventIsolation(
+            storage.redis,
+            key_builder=storage.key_builder,
+            # timeout — ключ отпустится сам, если реплика упала с блокировкой; blocking_timeout — сколько ждать
+            lock_kwargs={"timeout": settings.dialog_lock_timeout, "blocking_timeout": settings.dialog_lock_wait},
+        )
+    else:
+        inner = SimpleEventIsolation()
+    if settings.fsm_storage_pipelining:
+        return BatchingEventIsolation(storage, inner=inner)
+    return inner
+
+
+def build_storage_codec() -> StorageCodec:
+    codec = build_codec(settings.fsm_storage_codec)
+    logger.info(
+        "Кодек FSM-хранилища: %s, сжатие от %s байт",
+        codec.name,
+        settings.fsm_storage_compress_threshold or "—",
+    )
+    return StorageCodec(codec, settings.fsm_storage_compress_threshold)
@@ -0,0 +1,155 @@
+"""
+Кэш горячих справочников процесса: активная игра, системные чаты и множество админов.
+
+Их читает почти каждый апдейт (GameMiddleware, уведомления в чаты, проверки модерации), а меняются они
+редко: игра — при создании/старте/завершении, чаты и админы — при старте бота. Значения живут
+HOT_CACHE_TTL_SECONDS и сбрасываются явно там, где бот их меняет. Прогревается при старте.
+
+Кэш у каждой реплики свой, поэтому сброс рассылается остальным через канал Redis (invalidate_everywhere).
+Если сообщение потерялось (Redis был недоступен), реплика увидит изменение не позже чем через TTL.
+
+Закэшированные объекты общие для всех апдейтов, их нельзя менять на месте.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from db.models import Chat, Game, User
+from services import settings
+from services.metrics import metrics
+from services.redis import redis
+
+logger = logging.getLogger(__name__)
+
+GAME = "game"
+ADMINS = "admins"
+SYSTEM_CHATS = ("logs", "discussion")
+CHANNEL = "hot_cache:invalidate"
+
+
+def _chat_name(key: str) -> str:
+    return f"chat:{key}"
+
+
+class HotCache:
+    def __init__(self, ttl: float, client: Redis, channel: str = CHANNEL) -> None:
+        self.ttl = ttl
+        self.client = client
+        self.channel = channel
+        # Свои же сообщения из канала пропускаем: локально значения уже сброшены
+        self.origin = uuid4().hex
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._task: asyncio.Task | None = None
+        self._running = False
+
+    async def _get(self, name: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(name)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        # один запрос в базу на промах, даже если значение ждут сразу несколько апдейтов
+        async with self._locks.setdefault(name, asyncio.Lock()):
+            entry = self._entries.get(name)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            value = await load()
+            self._entries[name] = (time.monotonic() + self.ttl, value)
+            return value
+
+    async def active_game(self) -> Game | None:
+        return await self._get(GAME, lambda: Game.filter(end_date=None).first())
+
+    async def chat(self, key: str) -> Chat | None:
+        return await self._get(_chat_name(key), lambda: Chat.get_or_none(key=key))
+
+    async def admin_ids(self) -> frozenset[int]:
+        return await self._get(ADMINS, self._load_admin_ids)
+
+    @staticmethod
+    async def _load_admin_ids() -> frozenset[int]:
+        return frozenset(await User.filter(is_admin=True).values_list("tg_id", flat=True))
+
+    def invalidate(self, *names: str) -> None:
+        """Сбросить значения по именам (GAME, ADMINS, chat:<key>) или все сразу."""
+        if not names:
+            self._entries.clear()
+            return
+        for name in names:
+            self._entries.pop(name, None)
+
+    async def invalidate_everywhere(self, *names: str) -> None:
+        """Сбросить значения в этой реплике и разослать сброс остальным."""
+        self.invalidate(*names)
+        metrics.increment_hot_cache_invalidation("local")
+        try:
+            await self.client.publish(self.channel, json.dumps({"origin": self.origin, "names": names}))
+        except RedisError as e:
+            logger.warning("Не удалось разослать сброс кэша %s: %s", names or "целиком", e)
+
+    async def invalidate_game(self) -> None:
+        await self.invalidate_everywhere(GAME)
+
+    async def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._listen_loop())
+        logger.info("Подписались на сбросы кэша из других реплик")
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        logger.info("Отписались от сбросов кэша")
+
+    async def _listen_loop(self) -> None:
+        while self._running:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                break
+            except Exception as exc:
+                logger.warning("Подписка на сбросы кэша прервалась: %s", exc)
+                await asyncio.sleep(1)
+
+    async def _listen(self) -> None:
+        async with self.client.pubsub() as pubsub:
+            await pubsub.subscribe(self.channel)
+            # Пока подписки не было, сбросы могли пройти мимо
+            self.invalidate()
+            while self._running:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                payload = json.loads(message["data"])
+                if payload["origin"] == self.origin:
+                    continue
+                self.invalidate(*payload["names"])
+                metrics.increment_hot_cache_invalidation("remote")
+
+    async def warm(self) -> None:
+        await asyncio.gather(
+            self.active_game(),
+            self.admin_ids(),
+            *(self.chat(key) for key in SYSTEM_CHATS),
+        )
+        logger.info("Кэш прогрет: %s значений", len(self._entries))
+
+
+hot_cache = HotCache(settings.hot_cache_ttl, redis)
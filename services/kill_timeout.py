@@ -4,10 +4,15 @@ import logging
 from datetime import datetime, timedelta
 
 from aiogram import Bot
+from tortoise.transactions import in_transaction
 
+from db.instrumentation import track_queries
 from db.models import Chat, KillEvent, Player
-from services import settings, texts
-from services.kills_confirmation import add_back_to_queues
+from services import assignments, player_stats, settings, texts
+from services.hot_cache import hot_cache
+from services.kills_confirmation import add_back_to_queues, locked_kill_event
+from services.menu_snapshot import menu_snapshots
+from services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +55,8 @@ class KillTimeoutMonitor:
     async def _run_loop(self) -> None:
         while self._running:
             try:
-                await self._process_timeouts()
+                with metrics.track_operation("job:kill_timeout"), track_queries("kill_timeout"):
+                    await self._process_timeouts()
             except asyncio.CancelledError:
                 break
             except Exception as exc:
@@ -72,13 +78,12 @@ class KillTimeoutMonitor:
         if not events:
             return
 
-        discussion_chat = await Chat.get_or_none(key="discussion")
+        discussion_chat = await hot_cache.chat("discussion")
 
         for event in events:
             if event.game and event.game.end_date:
-                event.status = self.timeout_status
-                await event.save()
-                logger.info("KillEvent %s отменено, так как игра закончилась", event.id)
+                if await self._expire(event):
+                    logger.info("KillEvent %s отменено, так как игра закончилась", event.id)
                 continue
 
             killer_player = await Player.get_or_none(game_id=event.game_id, user_id=event.killer_id)
@@ -86,15 +91,28 @@ class KillTimeoutMonitor:
 
             if not killer_player or not victim_player:
                 logger.warning("Отсутствуют записи об игроках для KillEvent %s", event.id)
-                event.status = self.timeout_status
-                await event.save()
+                await self._expire(event)
                 continue
 
+            # Событие могли закрыть после выборки (подтверждение, реролл): тогда очереди и уведомления не трогаем
+            if not await self._expire(event):
+                continue
             await add_back_to_queues(event.killer, event.victim, killer_player, victim_player)
-            event.status = self.timeout_status
-            await event.save()
             await self._notify_participants(event, discussion_chat)
 
+    async def _expire(self, event: KillEvent) -> bool:
+        """Перевести событие в таймаут, если оно все еще pending. False — его уже закрыли."""
+        async with in_transaction() as conn:
+            locked = await locked_kill_event(event.id, conn)
+            if locked is None or locked.status != "pending":
+                return False
+            locked.status = self.timeout_status
+            await locked.save(using_db=conn)
+            await assignments.release(locked, using_db=conn)
+            await player_stats.record_timeout(locked, using_db=conn)
+        await menu_snapshots.invalidate(event.game_id, event.killer.tg_id, event.victim.tg_id)
+        return True
+
     async def _notify_participants(self, event: KillEvent, discussion_chat: Chat | None) -> None:
         killer = event.killer
         victim = event.victim
@@ -1,5 +1,127 @@
-from db.models import Player, User
+"""
+Переходы KillEvent из pending: подтверждение киллером и жертвой, реролл, таймаут.
+
+Каждый переход идет в одной транзакции под SELECT ... FOR UPDATE строки события (locked_kill_event) и только
+если событие все еще pending. В транзакции — отметка роли, смена статуса, освобождение назначений, счетчики и
+рейтинги обоих игроков (их строки тоже блокируются, одним запросом). Одновременные переходы выстраиваются на
+блокировке: событие закрывает ровно одна транзакция, остальные видят, что оно уже не pending, и ничего не
+меняют — рейтинг применяется один раз.
+
+Побочные эффекты (лидерборды, бан, очереди матчмейкинга, сообщения) выполняет вызывающий код после коммита и
+только если переход случился (KillTransition.changed).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from tortoise import BaseDBAsyncClient
+from tortoise.transactions import in_transaction
+
+from db.models import KillEvent, Player, User
+from services import assignments, player_stats, settings
+from services.ban import rate, save_ratings
 from services.matchmaking import MatchmakingService
+from services.menu_snapshot import menu_snapshots
+
+
+@dataclass
+class KillTransition:
+    kill_event: KillEvent
+    # False — событие уже закрыто (или роль его уже подтвердила): ничего не поменялось
+    changed: bool
+    # событие закрыто этим переходом, рейтинги сохранены
+    completed: bool = False
+    killer_player: Player | None = None
+    victim_player: Player | None = None
+    killer_delta: int = 0
+    victim_delta: int = 0
+
+
+def locked_kill_event(kill_event_id, conn: BaseDBAsyncClient):
+    """Событие с киллером и жертвой под блокировкой строки до конца транзакции conn."""
+    # of: блокируем только строку события, присоединенные пользователи не меняются
+    return (
+        KillEvent.filter(id=kill_event_id)
+        .select_related("killer", "victim")
+        .select_for_update(of=("kill_events",))
+        .using_db(conn)
+        .first()
+    )
+
+
+async def confirm_kill(kill_event_id, role: str) -> KillTransition | None:
+    """Отметить подтверждение роли (killer/victim); если подтвердили обе — засчитать убийство."""
+    async with in_transaction() as conn:
+        kill_event = await locked_kill_event(kill_event_id, conn)
+        if kill_event is None:
+            return None
+        if kill_event.status != "pending" or getattr(kill_event, f"{role}_confirmed"):
+            return KillTransition(kill_event, changed=False)
+
+        setattr(kill_event, f"{role}_confirmed", True)
+        setattr(kill_event, f"{role}_confirmed_at", datetime.now(settings.timezone))
+        completed = kill_event.killer_confirmed and kill_event.victim_confirmed
+        if completed:
+            kill_event.status = "confirmed"
+        await kill_event.save(using_db=conn)
+        if not completed:
+            return KillTransition(kill_event, changed=True)
+
+        await assignments.release(kill_event, using_db=conn)
+        await player_stats.record_kill(kill_event, using_db=conn)
+        return await _rate(kill_event, conn)
+
+
+async def reject_kill(kill_event_id, penalty: float) -> KillTransition | None:
+    """Реролл: киллер отказывается от цели и теряет рейтинг с множителем penalty."""
+    async with in_transaction() as conn:
+        kill_event = await locked_kill_event(kill_event_id, conn)
+        if kill_event is None:
+            return None
+        if kill_event.status != "pending":
+            return KillTransition(kill_event, changed=False)
+
+        kill_event.status = "rejected"
+        await kill_event.save(using_db=conn)
+        await assignments.release(kill_event, using_db=conn)
+        await player_stats.record_reroll(kill_event, using_db=conn)
+        return await _rate(kill_event, conn, 0, 1, penalty)
+
+
+async def _rate(kill_event: KillEvent, conn: BaseDBAsyncClient, killer_k=1, victim_k=0, p=1) -> KillTransition:
+    players = {
+        player.user_id: player
+        for player in await Player.filter(
+            game_id=kill_event.game_id,
+            user_id__in=(kill_event.killer_id, kill_event.victim_id),
+        )
+        .select_for_update()
+        .using_db(conn)
+    }
+    killer_player, victim_player = players[kill_event.killer_id], players[kill_event.victim_id]
+    killer_delta, victim_delta = rate(killer_player, victim_player, killer_k, victim_k, p)
+    await save_ratings(killer_player, victim_player, using_db=conn)
+    return KillTransition(
+        kill_event,
+        changed=True,
+        completed=True,
+        killer_player=killer_player,
+        victim_player=victim_player,
+        killer_delta=killer_delta,
+        victim_delta=victim_delta,
+    )
+
+
+async def deny_kill(kill_event_id, role: str) -> KillEvent | None:
+    """Снять подтверждение роли, пока событие ждет подтверждения; None, если событие уже закрыто."""
+    async with in_transaction() as conn:
+        kill_event = await locked_kill_event(kill_event_id, conn)
+        if kill_event is None or kill_event.status != "pending":
+            return None
+        setattr(kill_event, f"{role}_confirmed", False)
+        setattr(kill_event, f"{role}_confirmed_at", None)
+        await kill_event.save(using_db=conn)
+    return kill_event
 
 
 async def add_back_to_queues(killer: User, victim: User, killer_player: Player, victim_player: Player):
@@ -20,3 +142,4 @@ async def add_back_to_queues(killer: User, victim: User, killer_player: Player,
             },
             queue_type=qtype,
         )
+    await menu_snapshots.invalidate(killer_player.game_id, killer.tg_id, victim.tg_id)
@@ -0,0 +1,166 @@
+"""
+Выбор ведущей реплики для фоновых задач.
+
+Когда бот запущен в нескольких репликах, задачи, которые должны идти в одном экземпляре (дедлайны убийств,
+уборка Redis, обновление метрик из базы, ссылка-приглашение), запускает только ведущая реплика. Ведущая держит
+ключ LEADER_KEY в Redis со своим id и продлевает его каждые LEADER_RENEW_SECONDS; если реплика упала, ключ
+истекает через LEADER_TTL_SECONDS, и его забирает другая. Не смогла продлить (Redis недоступен или ключ уже
+чужой) — сразу останавливает свои задачи, чтобы две реплики не работали одновременно. Если ключ после такого
+сбоя все еще ее, на следующем тике она забирает его обратно, а не ждет, пока он истечет.
+
+С одной репликой она становится ведущей сразу при старте, поведение то же, что и раньше.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from services import settings
+from services.metrics import metrics
+from services.redis import redis
+
+logger = logging.getLogger(__name__)
+
+# Занять свободный ключ или продлить свой: после сбоя продления ключ может все еще быть нашим
+_ACQUIRE = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+# Продлить или отпустить ключ, только если он все еще наш
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class LeaderJob:
+    name: str
+    start: Callable[[], Awaitable[None]]
+    stop: Callable[[], Awaitable[None]] | None = None
+
+
+class LeaderElection:
+    def __init__(self, client: Redis, *, key: str, ttl: float, renew_interval: float) -> None:
+        self.client = client
+        self.key = key
+        self.ttl_ms = int(ttl * 1000)
+        self.renew_interval = renew_interval
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.is_leader = False
+        self._jobs: list[LeaderJob] = []
+        self._acquire = client.register_script(_ACQUIRE)
+        self._renew = client.register_script(_RENEW)
+        self._release = client.register_script(_RELEASE)
+        self._task: asyncio.Task | None = None
+        self._running = False
+
+    def add_job(
+        self,
+        name: str,
+        start: Callable[[], Awaitable[None]],
+        stop: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        self._jobs.append(LeaderJob(name, start, stop))
+
+    async def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        # Первая попытка — сразу, чтобы одиночная реплика не ждала интервал
+        await self._tick()
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info("Запустили выбор ведущей реплики (%s)", self.instance_id)
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        if self.is_leader:
+            await self._step_down()
+            # Отпускаем ключ сразу, чтобы следующая реплика не ждала его истечения
+            with contextlib.suppress(RedisError):
+                await self._release(keys=[self.key], args=[self.instance_id])
+        logger.info("Остановили выбор ведущей реплики")
+
+    async def _run_loop(self) -> None:
+        while self._running:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                break
+            except Exception as exc:
+                logger.exception("Выбор ведущей реплики завершился ошибкой: %s", exc)
+
+    async def _tick(self) -> None:
+        try:
+            if self.is_leader:
+                holds = bool(await self._renew(keys=[self.key], args=[self.instance_id, self.ttl_ms]))
+            else:
+                holds = bool(await self._acquire(keys=[self.key], args=[self.instance_id, self.ttl_ms]))
+        except RedisError as e:
+            logger.warning("Не удалось обновить ключ ведущей реплики: %s", e)
+            holds = False
+
+        if holds and not self.is_leader:
+            await self._take_over()
+        elif not holds and self.is_leader:
+            logger.warning("Реплика %s больше не ведущая", self.instance_id)
+            await self._step_down()
+
+    async def _take_over(self) -> None:
+        self.is_leader = True
+        metrics.record_leader(True)
+        logger.info("Реплика %s стала ведущей, запускаем: %s", self.instance_id, ", ".join(j.name for j in self._jobs))
+        for job in self._jobs:
+            try:
+                await job.start()
+            except Exception as exc:
+                logger.exception("Не удалось запустить %s: %s", job.name, exc)
+
+    async def _step_down(self) -> None:
+        self.is_leader = False
+        metrics.record_leader(False)
+        for job in reversed(self._jobs):
+            if job.stop is None:
+                continue
+            try:
+                await job.stop()
+            except Exception as exc:
+                logger.exception("Не удалось остановить %s: %s", job.name, exc)
+
+
+leader = LeaderElection(
+    redis,
+    key=settings.leader_key,
+    ttl=settings.leader_ttl,
+    renew_interval=settings.leader_renew_interval,
+)
@@ -0,0 +1,181 @@
+"""
+Лидерборды игры по рейтингу, убийствам и смертям.
+
+Для каждой игры держим три sorted set в Redis и обновляем их точечно: при каждом изменении рейтинга и
+каждом подтвержденном убийстве. Топ-N и место игрока — O(log n) без чтения всех киллов из базы.
+
+Если ключей игры нет (первое обращение, Redis очищен, массовый пересчет рейтингов), лидерборд целиком
+пересобирается из базы. Если Redis недоступен, чтения считаются по базе, а запись пропускается и помечает
+лидерборд как устаревший.
+
+Пересборка пишет во временные ключи и подменяет ими живые одним скриптом, только если с момента чтения базы
+не было точечных обновлений (каждое увеличивает счетчик записей игры). Иначе снимок мог не увидеть убийство,
+которое уже попало в живой ключ, и затер бы его. Тогда пересборка повторяется.
+"""
+
+import contextlib
+import logging
+from uuid import UUID, uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from db.models import KillEvent, Player
+from db.routing import primary_reads
+from services.redis import redis
+
+logger = logging.getLogger(__name__)
+
+RATING = "rating"
+KILLS = "kills"
+DEATHS = "deaths"
+BOARDS = (RATING, KILLS, DEATHS)
+
+REBUILD_ATTEMPTS = 3
+# Временные ключи пересборки, брошенные упавшим процессом, не живут дольше этого
+REBUILD_KEY_TTL = 60
+
+# KEYS: счетчик записей, флаг готовности, затем пары (временный ключ, живой ключ); ARGV[1]: счетчик при чтении базы
+_SWAP = """
+if (redis.call('GET', KEYS[1]) or '') ~= ARGV[1] then
+    return 0
+end
+for i = 3, #KEYS, 2 do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('RENAME', KEYS[i], KEYS[i + 1])
+    else
+        redis.call('DEL', KEYS[i + 1])
+    end
+end
+redis.call('SET', KEYS[2], 1)
+return 1
+"""
+
+
+class Leaderboards:
+    def __init__(self, client: Redis, prefix: str = "leaderboard") -> None:
+        self.client = client
+        self.prefix = prefix
+        self._swap = client.register_script(_SWAP)
+
+    def _key(self, game_id, board: str) -> str:
+        return f"{self.prefix}:{game_id}:{board}"
+
+    def _ready_key(self, game_id) -> str:
+        return f"{self.prefix}:{game_id}:ready"
+
+    def _writes_key(self, game_id) -> str:
+        return f"{self.prefix}:{game_id}:writes"
+
+    @staticmethod
+    async def _scores_from_db(game_id) -> dict[str, dict[UUID, int]]:
+        # Пересборка должна видеть последние записи, поэтому не читаем с реплики
+        with primary_reads():
+            rows = await Player.filter(game_id=game_id).values_list("user_id", "rating", "kills", "deaths")
+        return {
+            RATING: {user_id: rating for user_id, rating, _, _ in rows},
+            KILLS: {user_id: kills for user_id, _, kills, _ in rows if kills},
+            DEATHS: {user_id: deaths for user_id, _, _, deaths in rows if deaths},
+        }
+
+    async def rebuild(self, game_id) -> None:
+        """Пересобрать все лидерборды игры из базы."""
+        try:
+            for _ in range(REBUILD_ATTEMPTS):
+                players = await self._try_rebuild(game_id)
+                if players is not None:
+                    logger.info("Пересобрали лидерборд игры %s: %s игроков", game_id, players)
+                    return
+            logger.warning("Лидерборд игры %s менялся во время каждой пересборки, соберем его позже", game_id)
+            await self.client.delete(self._ready_key(game_id))
+        except RedisError as e:
+            logger.warning("Не удалось пересобрать лидерборд игры %s: %s", game_id, e)
+
+    async def _try_rebuild(self, game_id) -> int | None:
+        """Одна попытка пересборки: число игроков или None, если во время нее лидерборд обновили точечно."""
+        writes = await self.client.get(self._writes_key(game_id))
+        scores = await self._scores_from_db(game_id)
+        suffix = uuid4().hex[:8]
+        keys = [self._writes_key(game_id), self._ready_key(game_id)]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for board, values in scores.items():
+                temp = f"{self._key(game_id, board)}:rebuild:{suffix}"
+                keys += [temp, self._key(game_id, board)]
+                if values:
+                    pipe.zadd(temp, {str(user_id): score for user_id, score in values.items()})
+                    pipe.expire(temp, REBUILD_KEY_TTL)
+            await pipe.execute()
+        swapped = await self._swap(keys=keys, args=[(writes or b"").decode()])
+        if not swapped:
+            with contextlib.suppress(RedisError):
+                await self.client.delete(*keys[2::2])
+            return None
+        return len(scores[RATING])
+
+    async def _ensure(self, game_id) -> None:
+        if not await self.client.exists(self._ready_key(game_id)):
+            await self.rebuild(game_id)
+
+    async def _invalidate(self, game_id, error: RedisError) -> None:
+        logger.warning("Не удалось обновить лидерборд игры %s, он будет пересобран: %s", game_id, error)
+        with contextlib.suppress(RedisError):
+            await self.client.delete(self._ready_key(game_id))
+
+    async def update_ratings(self, *players: Player) -> None:
+        """Записать текущий рейтинг игроков (после сохранения в базу)."""
+        if not players:
+            return
+        game_id = players[0].game_id
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.zadd(self._key(game_id, RATING), {str(p.user_id): p.rating for p in players})
+                pipe.incr(self._writes_key(game_id))
+                await pipe.execute()
+        except RedisError as e:
+            await self._invalidate(game_id, e)
+
+    async def record_kill(self, kill_event: KillEvent) -> None:
+        """Подтвержденное убийство: +1 киллеру в убийства, +1 жертве в смерти."""
+        game_id = kill_event.game_id
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.zincrby(self._key(game_id, KILLS), 1, str(kill_event.killer_id))
+                pipe.zincrby(self._key(game_id, DEATHS), 1, str(kill_event.victim_id))
+                pipe.incr(self._writes_key(game_id))
+                await pipe.execute()
+        except RedisError as e:
+            await self._invalidate(game_id, e)
+
+    async def top(self, game_id, board: str, count: int) -> list[tuple[UUID, int]]:
+        """Первые count игроков по убыванию значения."""
+        try:
+            await self._ensure(game_id)
+            rows = await self.client.zrevrange(self._key(game_id, board), 0, count - 1, withscores=True)
+        except RedisError as e:
+            logger.warning("Лидерборд игры %s недоступен, считаем по базе: %s", game_id, e)
+            values = (await self._scores_from_db(game_id))[board]
+            return sorted(values.items(), key=lambda item: item[1], reverse=True)[:count]
+        return [(UUID(member.decode()), int(score)) for member, score in rows]
+
+    async def rank(self, game_id, board: str, user_id: UUID) -> tuple[int, int] | None:
+        """Место игрока (с 1) и его значение или None, если игрока нет в лидерборде."""
+        key = self._key(game_id, board)
+        try:
+            await self._ensure(game_id)
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.zrevrank(key, str(user_id))
+                pipe.zscore(key, str(user_id))
+                position, score = await pipe.execute()
+        except RedisError as e:
+            logger.warning("Лидерборд игры %s недоступен, считаем по базе: %s", game_id, e)
+            values = (await self._scores_from_db(game_id))[board]
+            if user_id not in values:
+                return None
+            score = values[user_id]
+            return sum(1 for value in values.values() if value > score) + 1, score
+        if position is None:
+            return None
+        return position + 1, int(score)
+
+
+leaderboards = Leaderboards(redis)
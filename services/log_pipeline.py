@@ -0,0 +1,207 @@
+"""
+Логирование через очередь: строки пишет отдельный поток, на event loop остается только постановка в очередь.
+
+Раньше каждый logger.info обработчиков синхронно писал в stderr прямо из event loop. Если stderr читается
+медленно (docker logs под нагрузкой), вместе с ним вставали все апдейты. setup_logging() ставит на корневой
+логгер один QueueHandler:
+- запись попадает в очередь, только если прошла выборку своей категории. Категория — имя логгера или его
+  родителя, доли задает LOG_SAMPLE_RATES, например user_actions=0.1. WARNING и выше пишутся всегда;
+- дорогие поля передаются как Lazy(...) в extra={"fields": {...}}. Они вычисляются, только если запись прошла
+  уровень и выборку;
+- очередь ограничена LOG_QUEUE_SIZE. Если поток записи не успевает, запись отбрасывается, а обработка апдейтов
+  не тормозит;
+- поток записи (QueueListener) форматирует записи в JSON (LOG_FORMAT=json) или в прежний текст (text).
+
+Время, которое апдейт тратит на логирование, — cukiller_update_logging_seconds (меряет VerboseLoggingMiddleware).
+Записи по результату — cukiller_log_records_total.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+from services import settings
+from services.metrics import metrics
+from services.tracing import tracer
+
+TEXT_FORMAT = "%(levelname)s:\t[%(asctime)s] - %(message)s"
+
+_update_spent: ContextVar[list[float] | None] = ContextVar("update_logging_spent", default=None)
+_listener: QueueListener | None = None
+
+
+class Lazy:
+    """Поле записи, которое вычисляется только для записей, которые действительно будут записаны."""
+
+    __slots__ = ("func",)
+
+    def __init__(self, func: Callable[[], Any]) -> None:
+        self.func = func
+
+    def resolve(self) -> Any:
+        try:
+            return self.func()
+        except Exception as exc:
+            return f"<{type(exc).__name__}: {exc}>"
+
+
+def parse_sample_rates(raw: str) -> dict[str, float]:
+    """'user_actions=0.1,dialog_actions=0.5' -> {'user_actions': 0.1, 'dialog_actions': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        category, _, rate = item.partition("=")
+        rates[category.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+        self._by_logger: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._by_logger.get(name)
+        if rate is None:
+            # Ближайшая настроенная категория: aiogram.event -> aiogram
+            category = name
+            while category not in self.rates and "." in category:
+                category = category.rsplit(".", 1)[0]
+            rate = self._by_logger[name] = self.rates.get(category, 1.0)
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:  # noqa: S311
+            return True
+        metrics.increment_log_record("sampled_out")
+        return False
+
+
+class _QueueHandler(QueueHandler):
+    def handle(self, record: logging.LogRecord) -> bool:
+        started = time.perf_counter()
+        try:
+            return super().handle(record)
+        finally:
+            spent = _update_spent.get()
+            if spent is not None:
+                spent[0] += time.perf_counter() - started
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщение и ленивые поля собираем здесь: пока запись ждет в очереди, аргументы могут поменяться
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {k: v.resolve() if isinstance(v, Lazy) else v for k, v in fields.items()}
+        span = tracer.current_span()
+        if span is not None:
+            record.trace_id = span.trace_id
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment_log_record("dropped")
+            return
+        metrics.increment_log_record("queued")
+
+
+class _QueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Очередь может быть полна: ждем места, а не падаем при остановке
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            **(getattr(record, "fields", None) or {}),
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            payload["trace_id"] = trace_id
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None)
+        if not fields:
+            return super().format(record)
+        record = copy.copy(record)
+        record.msg = " ".join((record.getMessage(), *(f"{k}={v!r}" for k, v in fields.items())))
+        record.args = None
+        return super().format(record)
+
+
+def setup_logging(level: str | int) -> None:
+    """Направить все логи процесса через очередь в поток записи."""
+    global _listener
+
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter(TEXT_FORMAT))
+
+    handler = _QueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    handler.addFilter(SamplingFilter(parse_sample_rates(settings.log_sample_rates)))
+    metrics.log_queue.set_function(handler.queue.qsize)
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = _QueueListener(handler.queue, stream)
+    _listener.start()
+    # Поток дописывает очередь при выходе из процесса, в том числе строки после остановки бота
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Дописать очередь и остановить поток записи."""
+    global _listener
+
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+
+
+@contextmanager
+def measure_update() -> Iterator[None]:
+    """Посчитать время, которое апдейт провел в вызовах логгеров."""
+    spent = [0.0]
+    token = _update_spent.set(spent)
+    try:
+        yield
+    finally:
+        _update_spent.reset(token)
+        metrics.record_update_logging(spent[0])
@@ -3,9 +3,20 @@ import logging
 
 from aiogram.types import CallbackQuery, Message
 
+from services.log_pipeline import Lazy
+from services.metrics import metrics
+
 logger = logging.getLogger("dialog_actions")
 
 
+def _dialog_state(manager) -> str | None:
+    if not manager:
+        return None
+    with contextlib.suppress(Exception):
+        return str(manager.current_context().state)
+    return None
+
+
 def log_dialog_action(action_name: str):
     def decorator(func):
         async def wrapper(*args, **kwargs):
@@ -22,20 +33,22 @@ def log_dialog_action(action_name: str):
             else:
                 data = None
 
-            state = None
-            if manager:
-                with contextlib.suppress(Exception):
-                    state = manager.current_context().state
-
             logger.info(
-                "DIALOG ACTION: user=%s state=%s action=%s data=%s",
-                user_id,
-                state,
-                action_name,
-                data,
+                "DIALOG ACTION",
+                extra={
+                    "fields": {
+                        "user": user_id,
+                        "state": Lazy(lambda: _dialog_state(manager)),
+                        "action": action_name,
+                        "data": data,
+                    }
+                },
             )
+            if action_name.startswith("ADMIN_"):
+                metrics.increment_admin_action(action_name)
 
-            return await func(*args, **kwargs)
+            with metrics.track_operation(f"dialog_action:{action_name}"):
+                return await func(*args, **kwargs)
 
         return wrapper
 
@@ -62,7 +75,8 @@ def log_filter(call_name: str):
 def log_getter(call_name: str):
     def decorator(func):
         async def wrapper(*args, **kwargs):
-            ret = await func(*args, **kwargs)
+            with metrics.track_operation(f"getter:{call_name}"):
+                ret = await func(*args, **kwargs)
             logger.debug(
                 "GETTER: %s called and returned %s",
                 call_name,
@@ -0,0 +1,116 @@
+"""
+Мониторинг здоровья event loop.
+
+Вся работа бота идет в одном asyncio loop, поэтому любой синхронный участок тормозит всех пользователей сразу.
+Корутина-пульс меряет задержку планирования, а сторожевой поток замечает, что пульс давно не обновлялся,
+и снимает стек главного потока — так видно, какой именно код заблокировал loop.
+"""
+
+import asyncio
+import contextlib
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+from services import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SlowCallback:
+    detected_at: datetime
+    blocked_for: float
+    stack: str
+
+
+class LoopMonitor:
+    def __init__(self, *, history_size: int = 20) -> None:
+        self.slow_callbacks: deque[SlowCallback] = deque(maxlen=history_size)
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._running = False
+        self._heartbeat = 0.0
+        self._loop_thread_id: int | None = None
+
+    @property
+    def interval(self) -> float:
+        return settings.loop_monitor_interval
+
+    @property
+    def threshold(self) -> float:
+        return settings.loop_slow_callback_threshold_ms / 1000
+
+    async def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._run_loop())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("Мониторинг event loop запущен (порог %.0f мс)", self.threshold * 1000)
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join, self.threshold * 2)
+        logger.info("Мониторинг event loop остановлен")
+
+    async def _run_loop(self) -> None:
+        while self._running:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            metrics.record_loop_lag(max(0.0, now - expected), len(asyncio.all_tasks()))
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while self._running:
+            time.sleep(self.threshold / 2)
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.threshold or heartbeat == reported_heartbeat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001
+            if frame is None:
+                continue
+            reported_heartbeat = heartbeat
+            stack = "".join(traceback.format_stack(frame))
+            self.slow_callbacks.append(
+                SlowCallback(detected_at=datetime.now(settings.timezone), blocked_for=blocked_for, stack=stack)
+            )
+            metrics.increment_slow_callback()
+            logger.warning("Event loop заблокирован дольше %.0f мс:\n%s", blocked_for * 1000, stack)
+
+    @staticmethod
+    def dump_tasks(stack_limit: int = 5) -> str:
+        """Текстовый снимок всех задач loop со стеками."""
+        lines = []
+        tasks = sorted(asyncio.all_tasks(), key=lambda t: t.get_name())
+        for task in tasks:
+            coro = task.get_coro()
+            lines.append(f"{task.get_name()}: {getattr(coro, '__qualname__', coro)} done={task.done()}")
+            for frame in task.get_stack(limit=stack_limit):
+                lines.append(f"    {frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}")
+        return f"{len(tasks)} tasks\n" + "\n".join(lines)
+
+
+loop_monitor = LoopMonitor()
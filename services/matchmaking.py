@@ -5,6 +5,7 @@ from typing import Any
 import aiohttp
 
 from services import settings
+from services.tracing import tracer
 
 
 # ---------- SERVICE ----------
@@ -27,20 +28,21 @@ class MatchmakingService:
         """Unified helper to call the Go microservice via REST"""
         url = f"{self.base_url}{path}"
         try:
-            async with (
-                aiohttp.ClientSession() as session,
-                session.request(
-                    method,
-                    url,
-                    json=json_data,
-                    timeout=10,
-                    headers={"secret-key": settings.secret_key},
-                ) as resp,
-            ):
-                resp.raise_for_status()
-                if "application/json" in resp.headers.get("Content-Type", ""):
-                    return resp.status, await resp.json()
-                return resp.status, None
+            with tracer.span(f"matchmaking:{method} {path}"):
+                async with (
+                    aiohttp.ClientSession() as session,
+                    session.request(
+                        method,
+                        url,
+                        json=json_data,
+                        timeout=10,
+                        headers={"secret-key": settings.secret_key},
+                    ) as resp,
+                ):
+                    resp.raise_for_status()
+                    if "application/json" in resp.headers.get("Content-Type", ""):
+                        return resp.status, await resp.json()
+                    return resp.status, None
         except Exception as e:
             self.logger.exception(f"Failed {method} {url}: {e}")
             return None, None
@@ -0,0 +1,153 @@
+"""
+Снимок главного меню игрока в Redis.
+
+Главное меню перерисовывается на каждое нажатие, а собрать его — это пользователь, игрок, оба KillEvent,
+профиль жертвы и два запроса в матчмейкинг. Меняется же все это только по событиям игры: матч, подтверждение,
+реролл, таймаут, выход и бан. Поэтому снимок (рейтинг, карточка цели, флаги охоты, статус в очереди) хранится
+в Redis и пересобирается только после того, как событие сбросило его через invalidate()/invalidate_game().
+
+Сброс — это не удаление, а увеличение версии: версия игрока и версия игры читаются одним MGET вместе со
+снимком, а снимок записывается, только если версии не поменялись, пока он собирался. Так параллельное событие
+не перетрется снимком, собранным до него. Длины очередей общие для всех и в снимок не входят: они кэшируются
+в процессе на несколько секунд.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from services import settings
+from services.metrics import metrics
+from services.redis import redis
+
+logger = logging.getLogger(__name__)
+
+# Записать снимок, только если версии игры и игрока те же, что были до сборки. Версии живут вдвое дольше
+# снимков, чтобы после истечения ключа версии счетчик не начался заново под еще живым снимком.
+_PUT_IF_CURRENT = """
+local game_version = redis.call('GET', KEYS[1]) or ''
+local player_version = redis.call('GET', KEYS[2]) or ''
+if game_version ~= ARGV[1] or player_version ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[3], ARGV[3], 'EX', ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return 1
+"""
+
+
+def _text(value: bytes | None) -> str:
+    return value.decode() if value is not None else ""
+
+
+class MenuSnapshots:
+    def __init__(self, client: Redis, ttl: int, queue_lengths_ttl: float, prefix: str = "menu") -> None:
+        self.client = client
+        self.ttl = ttl
+        self.queue_lengths_ttl = queue_lengths_ttl
+        self.prefix = prefix
+        self._put = client.register_script(_PUT_IF_CURRENT)
+        self._queue_lengths: tuple[float, tuple[int, int]] | None = None
+        self._queue_lengths_lock = asyncio.Lock()
+
+    def _game_version_key(self, game_id) -> str:
+        return f"{self.prefix}:{game_id}:version"
+
+    def _player_version_key(self, game_id, tg_id: int) -> str:
+        return f"{self.prefix}:{game_id}:{tg_id}:version"
+
+    def _snapshot_key(self, game_id, tg_id: int) -> str:
+        return f"{self.prefix}:{game_id}:{tg_id}"
+
+    def _keys(self, game_id, tg_id: int) -> list[str]:
+        return [
+            self._game_version_key(game_id),
+            self._player_version_key(game_id, tg_id),
+            self._snapshot_key(game_id, tg_id),
+        ]
+
+    async def get_or_build(
+        self,
+        game_id,
+        tg_id: int,
+        build: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        """Снимок из Redis или собранный заново (и сохраненный, если за время сборки его не сбросили)."""
+        keys = self._keys(game_id, tg_id)
+        try:
+            game_version, player_version, raw = await self.client.mget(keys)
+        except RedisError as e:
+            logger.warning("Снимки меню недоступны, собираем меню по базе: %s", e)
+            metrics.increment_menu_snapshot("error")
+            return await build()
+
+        versions = [_text(game_version), _text(player_version)]
+        if raw is not None:
+            stored = json.loads(raw)
+            if stored["versions"] == versions:
+                metrics.increment_menu_snapshot("hit")
+                return stored["data"]
+
+        metrics.increment_menu_snapshot("miss")
+        data = await build()
+        payload = json.dumps({"versions": versions, "data": data}, separators=(",", ":"))
+        try:
+            await self._put(keys=keys, args=[*versions, payload, self.ttl, self.ttl * 2])
+        except RedisError as e:
+            logger.warning("Не удалось сохранить снимок меню %s: %s", tg_id, e)
+        return data
+
+    async def invalidate(self, game_id, *tg_ids: int) -> None:
+        """Событие затронуло этих игроков: их снимки пересоберутся при следующей отрисовке."""
+        if game_id is None or not tg_ids:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for tg_id in tg_ids:
+                    key = self._player_version_key(game_id, tg_id)
+                    pipe.incr(key)
+                    pipe.expire(key, self.ttl * 2)
+                await pipe.execute()
+        except RedisError as e:
+            # Снимок доживет до TTL: лучше так, чем уронить обработку события
+            logger.warning("Не удалось сбросить снимки меню игроков %s: %s", tg_ids, e)
+
+    async def invalidate_game(self, game_id) -> None:
+        """Событие затронуло всех игроков игры (бан, пересчет рейтинга, сброс очередей)."""
+        if game_id is None:
+            return
+        key = self._game_version_key(game_id)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.incr(key)
+                pipe.expire(key, self.ttl * 2)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Не удалось сбросить снимки меню игры %s: %s", game_id, e)
+
+    async def queue_lengths(self, load: Callable[[], Awaitable[tuple[int, int]]]) -> tuple[int, int]:
+        """Длины очередей матчмейкинга, не чаще одного запроса за queue_lengths_ttl секунд."""
+        cached = self._queue_lengths
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        async with self._queue_lengths_lock:
+            cached = self._queue_lengths
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            value = await load()
+            self._queue_lengths = (time.monotonic() + self.queue_lengths_ttl, value)
+            return value
+
+
+menu_snapshots = MenuSnapshots(
+    redis,
+    ttl=settings.menu_snapshot_ttl,
+    queue_lengths_ttl=settings.menu_queue_lengths_ttl,
+)
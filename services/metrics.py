@@ -3,13 +3,35 @@ Prometheus metrics collection for the bot.
 """
 
 import logging
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
 
+from aiogram.dispatcher.event.bases import SkipHandler
 from prometheus_client import Counter, Gauge, Histogram, Info, generate_latest
 
 from db.models import Game, Player, User
+from services.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# Most handlers finish within tens of milliseconds, so buckets are dense below 100 ms
+OPERATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DB_QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DB_POOL_ACQUIRE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+QUERIES_PER_UPDATE_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+REDIS_COMMAND_BUCKETS = (0.0002, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+PIPELINE_SIZE_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16, 32, 64)
+UPDATE_QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WEBHOOK_ACK_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+UPDATE_LOGGING_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+TELEGRAM_API_BUCKETS = (0.025, 0.05, 0.1, 0.2, 0.35, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+# Innermost operation (handler, dialog action, getter) being tracked in the current context
+current_operation: ContextVar[str | None] = ContextVar("current_operation", default=None)
+
 
 class BotMetrics:
     """Bot metrics collector for Prometheus."""
@@ -64,7 +86,231 @@ class BotMetrics:
             "cukiller_response_time_seconds",
             "Response time for bot operations",
             ["operation_type"],
-            buckets=[0.1, 0.5, 1.0, 2.5, 5.0, 10.0],
+            buckets=OPERATION_BUCKETS,
+        )
+        self.operations_in_progress = Gauge(
+            "cukiller_operations_in_progress",
+            "Number of bot operations currently being processed",
+            ["operation_type"],
+        )
+        self.operations_total = Counter(
+            "cukiller_operations_total",
+            "Total number of bot operations by outcome",
+            ["operation_type", "outcome"],
+        )
+
+        # Database metrics
+        self.db_query_duration = Histogram(
+            "cukiller_db_query_duration_seconds",
+            "Duration of ORM queries",
+            ["model", "operation"],
+            buckets=DB_QUERY_BUCKETS,
+        )
+        self.db_query_rows = Counter(
+            "cukiller_db_query_rows_total",
+            "Total number of rows returned or affected by ORM queries",
+            ["model", "operation"],
+        )
+        self.db_slow_queries = Counter(
+            "cukiller_db_slow_queries_total",
+            "Total number of ORM queries slower than the configured threshold",
+            ["model", "operation"],
+        )
+        self.db_queries_per_update = Histogram(
+            "cukiller_db_queries_per_update",
+            "Number of ORM queries issued while processing one update",
+            ["event_type"],
+            buckets=QUERIES_PER_UPDATE_BUCKETS,
+        )
+        self.db_pool_connections = Gauge(
+            "cukiller_db_pool_connections",
+            "Database pool connections by state (in_use, idle, waiting)",
+            ["state"],
+        )
+        self.db_pool_max_size = Gauge("cukiller_db_pool_max_size", "Configured maximum size of the database pool")
+        self.db_replica_lag = Gauge(
+            "cukiller_db_replica_lag_seconds",
+            "Replication lag of the read replica (-1 if unavailable)",
+        )
+        self.db_replica_reads = Counter(
+            "cukiller_db_replica_reads_total",
+            "Total number of ORM reads routed to the read replica",
+        )
+        self.db_pool_acquire_wait = Histogram(
+            "cukiller_db_pool_acquire_wait_seconds",
+            "Time spent waiting for a free database pool connection",
+            buckets=DB_POOL_ACQUIRE_BUCKETS,
+        )
+
+        # Redis metrics
+        self.redis_command_duration = Histogram(
+            "cukiller_redis_command_duration_seconds",
+            "Duration of Redis commands (PIPELINE is one round-trip of a whole pipeline)",
+            ["command"],
+            buckets=REDIS_COMMAND_BUCKETS,
+        )
+        self.redis_pipeline_size = Histogram(
+            "cukiller_redis_pipeline_commands",
+            "Number of commands sent in one Redis pipeline",
+            buckets=PIPELINE_SIZE_BUCKETS,
+        )
+        self.redis_pool_wait = Histogram(
+            "cukiller_redis_pool_wait_seconds",
+            "Time spent waiting for a free Redis pool connection",
+            buckets=DB_POOL_ACQUIRE_BUCKETS,
+        )
+        self.redis_pool_connections = Gauge(
+            "cukiller_redis_pool_connections",
+            "Redis pool connections by state (in_use, idle, waiting)",
+            ["state"],
+        )
+        self.redis_pool_max_size = Gauge("cukiller_redis_pool_max_size", "Configured maximum size of the Redis pool")
+        self.redis_keys = Gauge("cukiller_redis_keys", "Number of Redis keys by family at the last sweep", ["family"])
+        self.redis_key_memory = Gauge(
+            "cukiller_redis_key_memory_bytes",
+            "Memory used by Redis keys by family at the last sweep",
+            ["family"],
+        )
+        self.redis_swept_keys = Counter(
+            "cukiller_redis_swept_keys_total",
+            "Total number of stale Redis keys removed by the sweeper",
+            ["family"],
+        )
+        self.menu_snapshots = Counter(
+            "cukiller_menu_snapshots_total",
+            "Main menu renders by snapshot outcome (hit, miss, error)",
+            ["result"],
+        )
+        self.redis_sweep_duration = Gauge("cukiller_redis_sweep_duration_seconds", "Duration of the last Redis sweep")
+
+        # Update scheduler metrics
+        self.update_scheduler = Gauge(
+            "cukiller_update_scheduler",
+            "Updates in the scheduler by state (queued, running) and users with pending updates",
+            ["state"],
+        )
+        self.update_queue_wait = Histogram(
+            "cukiller_update_queue_wait_seconds",
+            "Time an update waited for its user's turn and a free processing slot",
+            buckets=UPDATE_QUEUE_WAIT_BUCKETS,
+        )
+        self.update_shed = Counter(
+            "cukiller_update_shed_total",
+            "Updates dropped by the scheduler because of overload",
+            ["reason"],
+        )
+
+        # Logging pipeline metrics
+        self.log_records = Counter(
+            "cukiller_log_records_total",
+            "Log records by result (queued, sampled_out, dropped on a full queue)",
+            ["result"],
+        )
+        self.log_queue = Gauge(
+            "cukiller_log_queue",
+            "Log records waiting for the writer thread",
+        )
+        self.span_queue = Gauge(
+            "cukiller_span_queue",
+            "Finished spans waiting for the exporter thread",
+        )
+        self.span_queue.set_function(lambda: getattr(tracer.exporter, "qsize", int)())
+        self.spans_dropped = Gauge(
+            "cukiller_spans_dropped",
+            "Spans dropped by the exporter on a full queue since start",
+        )
+        self.spans_dropped.set_function(lambda: getattr(tracer.exporter, "dropped", 0))
+        self.update_logging = Histogram(
+            "cukiller_update_logging_seconds",
+            "Event loop time an update spent handing its log records to the queue",
+            buckets=UPDATE_LOGGING_BUCKETS,
+        )
+
+        # Message routing metrics
+        self.router_filter = Counter(
+            "cukiller_router_filter_total",
+            "Messages a router checked with its handler filters (evaluated) or was skipped for by the route index",
+            ["router", "result"],
+        )
+
+        # Deferred job metrics
+        self.deferred_jobs = Counter(
+            "cukiller_deferred_jobs_total",
+            "Deferred jobs by kind and result (done, error, unknown, requeued on shutdown)",
+            ["kind", "result"],
+        )
+
+        # Webhook metrics
+        self.webhook_updates = Counter(
+            "cukiller_webhook_updates_total",
+            "Webhook deliveries by outcome (accepted, duplicate, rejected)",
+            ["result"],
+        )
+        self.webhook_ack_duration = Histogram(
+            "cukiller_webhook_ack_duration_seconds",
+            "Time from receiving a webhook request to answering Telegram",
+            buckets=WEBHOOK_ACK_BUCKETS,
+        )
+        self.webhook_queue = Gauge(
+            "cukiller_webhook_queue",
+            "Webhook updates by state (queued, processing)",
+            ["state"],
+        )
+
+        # Telegram Bot API metrics
+        self.telegram_api_duration = Histogram(
+            "cukiller_telegram_api_duration_seconds",
+            "Duration of Telegram Bot API calls",
+            ["method"],
+            buckets=TELEGRAM_API_BUCKETS,
+        )
+        self.telegram_api_errors = Counter(
+            "cukiller_telegram_api_errors_total",
+            "Total number of failed Telegram Bot API calls",
+            ["method", "error"],
+        )
+        self.telegram_api_sent_bytes = Counter(
+            "cukiller_telegram_api_sent_bytes_total",
+            "Bytes of text and captions sent in successful Telegram Bot API calls",
+            ["method"],
+        )
+        self.telegram_retry_after = Counter(
+            "cukiller_telegram_retry_after_seconds_total",
+            "Total flood-wait time requested by Telegram",
+            ["method"],
+        )
+        self.telegram_flood_wait = Gauge(
+            "cukiller_telegram_flood_wait_seconds",
+            "Seconds left until Telegram flood control is lifted",
+        )
+
+        # Event loop metrics
+        self.loop_lag = Histogram(
+            "cukiller_event_loop_lag_seconds",
+            "Event loop scheduling lag",
+            buckets=LOOP_LAG_BUCKETS,
+        )
+        self.loop_lag_last = Gauge("cukiller_event_loop_lag_last_seconds", "Last measured event loop lag")
+        self.loop_tasks = Gauge("cukiller_event_loop_tasks", "Number of pending asyncio tasks")
+        self.loop_slow_callbacks = Counter(
+            "cukiller_event_loop_slow_callbacks_total",
+            "Total number of callbacks that blocked the event loop longer than the threshold",
+        )
+
+        # Startup metrics
+        self.startup_phase_duration = Gauge(
+            "cukiller_startup_phase_duration_seconds",
+            "Duration of each startup phase during the last start",
+            ["phase"],
+        )
+        self.startup_duration = Gauge("cukiller_startup_duration_seconds", "Time from startup begin to serving")
+
+        # Replica metrics
+        self.leader = Gauge("cukiller_leader", "Whether this replica runs the singleton background jobs (1) or not (0)")
+        self.hot_cache_invalidations = Counter(
+            "cukiller_hot_cache_invalidations_total",
+            "Hot cache invalidations by origin (local, remote)",
+            ["origin"],
         )
 
         # Bot info
@@ -160,6 +406,150 @@ class BotMetrics:
         self.response_time.labels(operation_type=operation_type).observe(duration)
         logger.debug(f"Recorded response time for {operation_type}: {duration}s")
 
+    @contextmanager
+    def track_operation(self, operation_type: str) -> Iterator[None]:
+        """Measure latency, outcome and in-flight count of an operation."""
+        in_progress = self.operations_in_progress.labels(operation_type=operation_type)
+        in_progress.inc()
+        outcome = "success"
+        token = current_operation.set(operation_type)
+        started = time.perf_counter()
+        try:
+            with tracer.span(operation_type):
+                yield
+        except SkipHandler:
+            outcome = "skipped"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            current_operation.reset(token)
+            in_progress.dec()
+            self.operations_total.labels(operation_type=operation_type, outcome=outcome).inc()
+            self.record_response_time(operation_type, time.perf_counter() - started)
+
+    def record_db_query(self, model: str, operation: str, duration: float, rows: int, *, slow: bool) -> None:
+        """Record a single ORM query."""
+        self.db_query_duration.labels(model=model, operation=operation).observe(duration)
+        if rows:
+            self.db_query_rows.labels(model=model, operation=operation).inc(rows)
+        if slow:
+            self.db_slow_queries.labels(model=model, operation=operation).inc()
+
+    def record_queries_per_update(self, event_type: str, count: int) -> None:
+        """Record how many ORM queries one update issued."""
+        self.db_queries_per_update.labels(event_type=event_type).observe(count)
+
+    def record_db_pool_acquire(self, wait: float) -> None:
+        """Record how long a query waited for a pool connection."""
+        self.db_pool_acquire_wait.observe(wait)
+
+    def record_db_replica_lag(self, lag: float | None) -> None:
+        """Record the last measured replica lag; None means the replica is unreachable."""
+        self.db_replica_lag.set(-1 if lag is None else lag)
+
+    def increment_db_replica_read(self) -> None:
+        """Increment the counter of reads served by the replica."""
+        self.db_replica_reads.inc()
+
+    def record_redis_command(self, command: str, duration: float, pipeline_size: int = 0) -> None:
+        """Record a single Redis command or a whole pipeline round-trip."""
+        self.redis_command_duration.labels(command=command).observe(duration)
+        if pipeline_size:
+            self.redis_pipeline_size.observe(pipeline_size)
+
+    def record_redis_pool_wait(self, wait: float) -> None:
+        """Record how long a Redis command waited for a pool connection."""
+        self.redis_pool_wait.observe(wait)
+
+    def record_redis_sweep(
+        self,
+        keys: Mapping[str, int],
+        memory: Mapping[str, int],
+        deleted: Mapping[str, int],
+        duration: float,
+    ) -> None:
+        """Record key counts and memory per family after a sweep."""
+        for family in keys.keys() | memory.keys():
+            self.redis_keys.labels(family=family).set(keys.get(family, 0))
+            self.redis_key_memory.labels(family=family).set(memory.get(family, 0))
+        for family, count in deleted.items():
+            self.redis_swept_keys.labels(family=family).inc(count)
+        self.redis_sweep_duration.set(duration)
+
+    def increment_menu_snapshot(self, result: str) -> None:
+        """Count a main menu render served from (or rebuilt into) the snapshot."""
+        self.menu_snapshots.labels(result=result).inc()
+
+    def record_update_queue_wait(self, wait: float) -> None:
+        """Record how long an update waited in the scheduler before its handler started."""
+        self.update_queue_wait.observe(wait)
+
+    def increment_update_shed(self, reason: str) -> None:
+        """Count an update dropped by the scheduler."""
+        self.update_shed.labels(reason=reason).inc()
+
+    def increment_log_record(self, result: str) -> None:
+        """Count a log record by what happened to it on the event loop."""
+        self.log_records.labels(result=result).inc()
+
+    def record_update_logging(self, spent: float) -> None:
+        """Record how long an update spent in logging calls."""
+        self.update_logging.observe(spent)
+
+    def increment_router_filter(self, router: str, result: str) -> None:
+        """Count a message routed to (evaluated) or past (skipped) a router."""
+        self.router_filter.labels(router=router, result=result).inc()
+
+    def increment_deferred_job(self, kind: str, result: str) -> None:
+        """Count an executed deferred job."""
+        self.deferred_jobs.labels(kind=kind, result=result).inc()
+
+    def record_webhook_update(self, result: str, ack_duration: float) -> None:
+        """Record a webhook delivery and how long Telegram waited for the answer."""
+        self.webhook_updates.labels(result=result).inc()
+        self.webhook_ack_duration.observe(ack_duration)
+
+    def record_telegram_call(self, method: str, duration: float, sent_bytes: int) -> None:
+        """Record a single Telegram Bot API call."""
+        self.telegram_api_duration.labels(method=method).observe(duration)
+        self.telegram_api_sent_bytes.labels(method=method).inc(sent_bytes)
+
+    def record_telegram_error(self, method: str, error: str) -> None:
+        """Record a failed Telegram Bot API call by error class."""
+        self.telegram_api_errors.labels(method=method, error=error).inc()
+
+    def record_telegram_retry_after(self, method: str, retry_after: float) -> None:
+        """Record a flood-wait reply from Telegram."""
+        self.telegram_retry_after.labels(method=method).inc(retry_after)
+
+    def record_loop_lag(self, lag: float, tasks: int) -> None:
+        """Record event loop lag and the number of pending tasks."""
+        self.loop_lag.observe(lag)
+        self.loop_lag_last.set(lag)
+        self.loop_tasks.set(tasks)
+
+    def increment_slow_callback(self) -> None:
+        """Increment the slow event loop callback counter."""
+        self.loop_slow_callbacks.inc()
+
+    def record_startup_phase(self, phase: str, duration: float) -> None:
+        """Record how long a startup phase took."""
+        self.startup_phase_duration.labels(phase=phase).set(duration)
+
+    def record_startup(self, duration: float) -> None:
+        """Record the total startup time."""
+        self.startup_duration.set(duration)
+
+    def record_leader(self, is_leader: bool) -> None:
+        """Record whether this replica is the leader."""
+        self.leader.set(1 if is_leader else 0)
+
+    def increment_hot_cache_invalidation(self, origin: str) -> None:
+        """Count a hot cache invalidation made here (local) or received from another replica (remote)."""
+        self.hot_cache_invalidations.labels(origin=origin).inc()
+
     @staticmethod
     def get_metrics() -> bytes:
         """Get the current metrics in Prometheus format."""
@@ -0,0 +1,114 @@
+"""
+Счетчики игрока: убийства, смерти, рероллы, таймауты, серия убийств и время последнего убийства/смерти.
+
+Обновляются атомарно (F-выражениями) в той же транзакции, что и статус KillEvent: подтверждение килла,
+реролл, таймаут и выход из игры. Экраны профиля и главного меню, титры и Go-сервис статистики читают их
+из строки Player без агрегаций по kill_events. rebuild() сверяет счетчики с историей и чинит расхождения.
+"""
+
+import logging
+from dataclasses import dataclass, fields
+from datetime import datetime
+
+from tortoise import BaseDBAsyncClient
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from db.models import KillEvent, Player
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Counters:
+    kills: int = 0
+    deaths: int = 0
+    rerolls: int = 0
+    timeouts: int = 0
+    kill_streak: int = 0
+    best_kill_streak: int = 0
+    last_kill_at: datetime | None = None
+    last_death_at: datetime | None = None
+
+
+COUNTER_FIELDS = tuple(f.name for f in fields(_Counters))
+
+
+def _players(kill_event: KillEvent, user_id, using_db: BaseDBAsyncClient | None):
+    return Player.filter(game_id=kill_event.game_id, user_id=user_id).using_db(using_db)
+
+
+async def record_kill(kill_event: KillEvent, using_db: BaseDBAsyncClient | None = None) -> None:
+    """Подтвержденное убийство: киллеру +1 убийство и серия, жертве +1 смерть и серия обнуляется."""
+    at = kill_event.updated_at
+    await _players(kill_event, kill_event.killer_id, using_db).update(
+        kills=F("kills") + 1,
+        kill_streak=F("kill_streak") + 1,
+        last_kill_at=at,
+    )
+    await (
+        _players(kill_event, kill_event.killer_id, using_db)
+        .filter(best_kill_streak__lt=F("kill_streak"))
+        .update(best_kill_streak=F("kill_streak"))
+    )
+    await _players(kill_event, kill_event.victim_id, using_db).update(
+        deaths=F("deaths") + 1,
+        kill_streak=0,
+        last_death_at=at,
+    )
+
+
+async def record_reroll(kill_event: KillEvent, using_db: BaseDBAsyncClient | None = None) -> None:
+    await _players(kill_event, kill_event.killer_id, using_db).update(rerolls=F("rerolls") + 1)
+
+
+async def record_timeout(kill_event: KillEvent, using_db: BaseDBAsyncClient | None = None) -> None:
+    await _players(kill_event, kill_event.killer_id, using_db).update(timeouts=F("timeouts") + 1)
+
+
+def _replay(events: list[dict]) -> dict:
+    """Счетчики по истории событий игры в порядке их завершения."""
+    counters: dict = {}
+    for event in events:
+        killer = counters.setdefault(event["killer_id"], _Counters())
+        if event["status"] == "confirmed":
+            victim = counters.setdefault(event["victim_id"], _Counters())
+            killer.kills += 1
+            killer.kill_streak += 1
+            killer.best_kill_streak = max(killer.best_kill_streak, killer.kill_streak)
+            killer.last_kill_at = event["updated_at"]
+            victim.deaths += 1
+            victim.kill_streak = 0
+            victim.last_death_at = event["updated_at"]
+        elif event["status"] == "rejected":
+            killer.rerolls += 1
+        elif event["status"] == "timeout":
+            killer.timeouts += 1
+    return counters
+
+
+async def rebuild(game_id) -> int:
+    """Сверить счетчики игроков игры с историей KillEvent и исправить расхождения. Отдает число исправленных."""
+    async with in_transaction() as conn:
+        players = await Player.filter(game_id=game_id).select_for_update().using_db(conn)
+        events = (
+            await KillEvent.filter(game_id=game_id, status__in=("confirmed", "rejected", "timeout"))
+            .order_by("updated_at")
+            .using_db(conn)
+            .values("killer_id", "victim_id", "status", "updated_at")
+        )
+        expected = _replay(events)
+
+        changed = []
+        for player in players:
+            counters = expected.get(player.user_id, _Counters())
+            if any(getattr(player, name) != getattr(counters, name) for name in COUNTER_FIELDS):
+                for name in COUNTER_FIELDS:
+                    setattr(player, name, getattr(counters, name))
+                changed.append(player)
+        if changed:
+            await Player.bulk_update(changed, fields=COUNTER_FIELDS, using_db=conn)
+
+    if changed:
+        logger.info("Счетчики %s игроков игры %s разошлись с историей и пересчитаны", len(changed), game_id)
+    return len(changed)
@@ -0,0 +1,88 @@
+"""
+Общий клиент Redis.
+
+Один пул соединений на процесс: его использует и FSM-хранилище aiogram, и сервисы, которым нужны структуры Redis
+(лидерборды и т.п.). Пул блокирующий: при исчерпании соединений команда ждет свободное до REDIS_POOL_TIMEOUT,
+а не падает сразу. Длительность каждой команды (и каждого pipeline целиком), ожидание соединения и состояние
+пула пишутся в метрики.
+"""
+
+import time
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.asyncio.client import Pipeline
+
+from services import settings
+from services.metrics import metrics
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """BlockingConnectionPool, который считает ожидающих и время получения соединения."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+
+    @property
+    def in_use(self) -> int:
+        return len(self._in_use_connections)
+
+    @property
+    def idle(self) -> int:
+        return len(self._available_connections)
+
+    async def get_connection(self, *args, **kwargs):
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(*args, **kwargs)
+        finally:
+            self.waiting -= 1
+            metrics.record_redis_pool_wait(time.perf_counter() - started)
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        commands = len(self.command_stack)
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            metrics.record_redis_command("PIPELINE", time.perf_counter() - started, commands)
+
+
+class InstrumentedRedis(Redis):
+    """Redis с замером длительности каждой команды."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            metrics.record_redis_command(str(args[0]).upper(), time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def build_pool() -> InstrumentedConnectionPool:
+    pool = InstrumentedConnectionPool(
+        max_connections=settings.redis_pool_max_connections,
+        timeout=settings.redis_pool_timeout,
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password,
+        db=settings.redis_db,
+        socket_timeout=settings.redis_socket_timeout,
+        socket_connect_timeout=settings.redis_socket_connect_timeout,
+        socket_keepalive=True,
+        health_check_interval=settings.redis_health_check_interval,
+    )
+    metrics.redis_pool_connections.labels(state="in_use").set_function(lambda: pool.in_use)
+    metrics.redis_pool_connections.labels(state="idle").set_function(lambda: pool.idle)
+    metrics.redis_pool_connections.labels(state="waiting").set_function(lambda: pool.waiting)
+    metrics.redis_pool_max_size.set(pool.max_connections)
+    return pool
+
+
+redis = InstrumentedRedis.from_pool(build_pool())
@@ -0,0 +1,232 @@
+"""
+Уборка устаревших ключей Redis и учет памяти по семействам ключей.
+
+Стек диалога остается в Redis у каждого, кто хоть раз открыл бота, в том числе у всех получателей рассылок,
+а appendonly сохраняет их навсегда. Раз в REDIS_SWEEP_INTERVAL_SECONDS сборщик проходит весь keyspace через SCAN
+(без блокировки Redis, пачками по REDIS_SWEEP_BATCH) и:
+
+- удаляет стеки диалогов и FSM-ключи личных чатов, которых не трогали дольше REDIS_SWEEP_IDLE_SECONDS,
+  если пользователь не играет в активной игре;
+- удаляет лидерборды завершенных игр (они пересобираются из базы при обращении);
+- ставит TTL контекстам диалогов, записанным до его появления;
+- пишет в метрики число ключей и занимаемую память по семействам.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from db.models import Player
+from services import settings
+from services.fsm_storage import CONTEXT_MARKER, STACK_MARKER
+from services.hot_cache import hot_cache
+from services.metrics import metrics
+from services.redis import redis
+
+logger = logging.getLogger(__name__)
+
+DIALOG_STACK = "dialog_stack"
+DIALOG_CONTEXT = "dialog_context"
+FSM_STATE = "fsm_state"
+FSM_DATA = "fsm_data"
+LEADERBOARD = "leaderboard"
+MENU_SNAPSHOT = "menu_snapshot"
+DOSSIER = "dossier"
+UPDATE_SEEN = "update_seen"
+OTHER = "other"
+FAMILIES = (DIALOG_STACK, DIALOG_CONTEXT, FSM_STATE, FSM_DATA, LEADERBOARD, MENU_SNAPSHOT, DOSSIER, UPDATE_SEEN, OTHER)
+
+
+def key_family(key: str, fsm_prefix: str = "fsm") -> str:
+    if key.startswith(f"{fsm_prefix}:"):
+        if STACK_MARKER in key:
+            return DIALOG_STACK
+        if CONTEXT_MARKER in key:
+            return DIALOG_CONTEXT
+        if key.endswith(":state"):
+            return FSM_STATE
+        if key.endswith(":data"):
+            return FSM_DATA
+    if key.startswith("leaderboard:"):
+        return LEADERBOARD
+    if key.startswith("menu:"):
+        return MENU_SNAPSHOT
+    if key.startswith("dossier:"):
+        return DOSSIER
+    if key.startswith("update_seen:"):
+        return UPDATE_SEEN
+    return OTHER
+
+
+def private_chat_id(key: str) -> int | None:
+    """tg_id пользователя для FSM-ключа личного чата (fsm:<chat>:<user>:<destiny>:<part>), иначе None."""
+    parts = key.split(":")
+    if len(parts) < 4 or not parts[1].isdigit() or parts[1] != parts[2]:
+        return None
+    return int(parts[1])
+
+
+def leaderboard_game_id(key: str) -> str:
+    return key.split(":")[1]
+
+
+@dataclass
+class SweepReport:
+    keys: Counter = field(default_factory=Counter)
+    memory: Counter = field(default_factory=Counter)
+    deleted: Counter = field(default_factory=Counter)
+    expired: int = 0
+
+
+class RedisSweeper:
+    def __init__(
+        self,
+        client: Redis,
+        *,
+        interval_seconds: float,
+        idle_seconds: int,
+        batch: int,
+        context_ttl: int | None,
+    ) -> None:
+        self.client = client
+        self.interval_seconds = interval_seconds
+        self.idle_seconds = idle_seconds
+        self.batch = batch
+        self.context_ttl = context_ttl
+        self._task: asyncio.Task | None = None
+        self._running = False
+
+    async def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info("Запустили уборку Redis (раз в %s с, простой от %s с)", self.interval_seconds, self.idle_seconds)
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        logger.info("Остановили уборку Redis")
+
+    async def _run_loop(self) -> None:
+        while self._running:
+            try:
+                with metrics.track_operation("job:redis_sweep"):
+                    await self.sweep()
+            except asyncio.CancelledError:
+                break
+            except Exception as exc:
+                logger.exception("Уборка Redis завершилась ошибкой: %s", exc)
+            await asyncio.sleep(self.interval_seconds)
+
+    @staticmethod
+    async def _protected() -> tuple[set[int], str | None]:
+        """tg_id игроков активной игры и id этой игры: их ключи не трогаем."""
+        game = await hot_cache.active_game()
+        if game is None:
+            return set(), None
+        tg_ids = await Player.filter(game_id=game.id).values_list("user__tg_id", flat=True)
+        return set(tg_ids), str(game.id)
+
+    def _is_stale(self, key: str, family: str, idle: int | None, players: set[int], game_id: str | None) -> bool:
+        if idle is None or idle < self.idle_seconds:
+            return False
+        if family == LEADERBOARD:
+            return leaderboard_game_id(key) != game_id
+        if family in (DIALOG_STACK, FSM_STATE, FSM_DATA):
+            tg_id = private_chat_id(key)
+            return tg_id is not None and tg_id not in players
+        return False
+
+    async def sweep(self) -> SweepReport:
+        started = time.perf_counter()
+        players, game_id = await self._protected()
+        report = SweepReport()
+
+        cursor = 0
+        while True:
+            cursor, raw_keys = await self.client.scan(cursor, count=self.batch)
+            if raw_keys:
+                await self._sweep_batch([k.decode() for k in raw_keys], players, game_id, report)
+            if cursor == 0:
+                break
+
+        # Семейства без ключей тоже пишем, чтобы в метриках не висело значение прошлого прохода
+        counts = {family: report.keys[family] for family in FAMILIES}
+        memory = {family: report.memory[family] for family in FAMILIES}
+        metrics.record_redis_sweep(counts, memory, report.deleted, time.perf_counter() - started)
+        logger.info(
+            "Уборка Redis: %s ключей, удалено %s, выставлен TTL %s за %.1f с",
+            sum(report.keys.values()),
+            sum(report.deleted.values()),
+            report.expired,
+            time.perf_counter() - started,
+        )
+        return report
+
+    async def _sweep_batch(
+        self,
+        keys: list[str],
+        players: set[int],
+        game_id: str | None,
+        report: SweepReport,
+    ) -> None:
+        # MEMORY USAGE, OBJECT IDLETIME и TTL всей пачки — один round-trip
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.memory_usage(key, samples=0)
+                pipe.object("idletime", key)
+                pipe.ttl(key)
+            replies = await pipe.execute(raise_on_error=False)
+
+        stale: list[str] = []
+        without_ttl: list[str] = []
+        for i, key in enumerate(keys):
+            size, idle, ttl = replies[3 * i : 3 * i + 3]
+            if size is None:
+                continue  # ключ успел истечь или удалиться
+            # MEMORY USAGE бывает запрещен (managed Redis): тогда считаем только число ключей
+            size = 0 if isinstance(size, RedisError) else size
+            family = key_family(key)
+            # OBJECT IDLETIME недоступен при LFU-политике вытеснения: тогда по простою не чистим
+            idle = None if isinstance(idle, RedisError) else idle
+            if self._is_stale(key, family, idle, players, game_id):
+                stale.append(key)
+                report.deleted[family] += 1
+                continue
+            report.keys[family] += 1
+            report.memory[family] += size
+            if family == DIALOG_CONTEXT and self.context_ttl and ttl == -1:
+                without_ttl.append(key)
+
+        if not stale and not without_ttl:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            if stale:
+                pipe.unlink(*stale)
+            for key in without_ttl:
+                pipe.expire(key, self.context_ttl)
+            await pipe.execute(raise_on_error=False)
+        report.expired += len(without_ttl)
+
+
+redis_sweeper = RedisSweeper(
+    redis,
+    interval_seconds=settings.redis_sweep_interval,
+    idle_seconds=settings.redis_sweep_idle_seconds,
+    batch=settings.redis_sweep_batch,
+    context_ttl=settings.fsm_context_ttl,
+)
@@ -2,7 +2,6 @@ from typing import Any, Optional
 from zoneinfo import ZoneInfo
 
 from aiogram import Dispatcher, Bot
-from aiogram.types import ChatInviteLink
 from pydantic import Field, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -18,16 +17,35 @@ class Settings(BaseSettings):
     web_server_port: int = Field(default="8000", alias="BOT_WEB_SERVER_PORT")
     webhook_url: str | None = Field(default=None, alias="BOT_WEBHOOK_URL")
     webhook_path: str | None = Field(default=None, alias="BOT_WEBHOOK_PATH")
+    webhook_queue_size: int = Field(default=1000, alias="WEBHOOK_QUEUE_SIZE")
+    webhook_workers: int = Field(default=64, alias="WEBHOOK_WORKERS")
+    webhook_dedup_ttl: int = Field(default=3600, alias="WEBHOOK_DEDUP_TTL_SECONDS")
+    shutdown_drain_timeout: float = Field(default=25.0, alias="SHUTDOWN_DRAIN_TIMEOUT_SECONDS")
+    deferred_poll_interval: float = Field(default=1.0, alias="DEFERRED_POLL_INTERVAL_SECONDS")
+    loop_monitor_interval: float = Field(default=0.5, alias="LOOP_MONITOR_INTERVAL")
+    loop_slow_callback_threshold_ms: float = Field(default=100.0, alias="LOOP_SLOW_CALLBACK_THRESHOLD_MS")
+    tracing_enabled: bool = Field(default=False, alias="TRACING_ENABLED")
+    tracing_sample_rate: float = Field(default=0.1, alias="TRACING_SAMPLE_RATE")
+    tracing_exporter: str = Field(default="jsonl", alias="TRACING_EXPORTER")
+    tracing_jsonl_path: str = Field(default="traces/spans.jsonl", alias="TRACING_JSONL_PATH")
+    tracing_queue_size: int = Field(default=10000, alias="TRACING_QUEUE_SIZE")
+    log_format: str = Field(default="json", alias="LOG_FORMAT")
+    log_queue_size: int = Field(default=10000, alias="LOG_QUEUE_SIZE")
+    log_sample_rates: str = Field(default="", alias="LOG_SAMPLE_RATES")
 
     # ^ Bot
     bot_name: str = Field(default="cu_killer_bot", alias="BOT_NAME")
     bot_token: str = Field(default="ERROR_TOKEN", alias="BOT_TOKEN")
     admin_chat_id: int = Field(alias="ADMIN_CHAT_ID")
     discussion_chat_id: int = Field(alias="DISCUSSION_ID")
-    discussion_chat_invite_link: ChatInviteLink | None = Field(default=None)
     admin_ids_raw: str | None = Field(default=None, alias="ADMIN_IDS")
     report_link: str = Field(alias="REPORT_LINK")
     game_info_link: str = Field(alias="NEXT_GAME_LINK")
+    telegram_slow_call_threshold_ms: float = Field(default=1000.0, alias="TELEGRAM_SLOW_CALL_THRESHOLD_MS")
+    hot_cache_ttl: float = Field(default=30.0, alias="HOT_CACHE_TTL_SECONDS")
+    update_concurrency: int = Field(default=32, alias="UPDATE_CONCURRENCY")
+    update_max_pending: int = Field(default=500, alias="UPDATE_MAX_PENDING")
+    update_per_user_pending: int = Field(default=5, alias="UPDATE_PER_USER_PENDING")
 
     # ^ ELO
     K_KILLER: int = 32
@@ -41,17 +59,51 @@ class Settings(BaseSettings):
     pg_db: str = Field(default="db", alias="POSTGRES_DB")
     pg_user: str = Field(default="admin", alias="POSTGRES_USER")
     pg_password: str = Field(default="admin", alias="POSTGRES_PASSWORD")
+    pg_pool_min_size: int = Field(default=1, alias="POSTGRES_POOL_MIN_SIZE")
+    pg_pool_max_size: int = Field(default=10, alias="POSTGRES_POOL_MAX_SIZE")
+    pg_pool_max_queries: int = Field(default=50000, alias="POSTGRES_POOL_MAX_QUERIES")
+    pg_pool_max_inactive_lifetime: float = Field(default=300.0, alias="POSTGRES_POOL_MAX_INACTIVE_LIFETIME")
+    pg_statement_cache_size: int = Field(default=100, alias="POSTGRES_STATEMENT_CACHE_SIZE")
+    pg_command_timeout: float | None = Field(default=30.0, alias="POSTGRES_COMMAND_TIMEOUT")
+    pg_replica_host: str | None = Field(default=None, alias="POSTGRES_REPLICA_HOST")
+    pg_replica_port: int = Field(default=5432, alias="POSTGRES_REPLICA_PORT")
+    db_replica_max_lag: float = Field(default=5.0, alias="DB_REPLICA_MAX_LAG_SECONDS")
+    db_replica_check_interval: float = Field(default=5.0, alias="DB_REPLICA_CHECK_INTERVAL")
 
     # ^ Redis
     redis_host: str = Field(default="redis", alias="REDIS_HOST")
     redis_port: int = Field(default=6379, alias="REDIS_PORT")
     redis_password: str = Field(default="secure_password", alias="REDIS_PASSWORD")
     redis_db: int = Field(default=0, alias="REDIS_DB")
+    redis_pool_max_connections: int = Field(default=20, alias="REDIS_POOL_MAX_CONNECTIONS")
+    redis_pool_timeout: float | None = Field(default=5.0, alias="REDIS_POOL_TIMEOUT")
+    redis_socket_timeout: float | None = Field(default=5.0, alias="REDIS_SOCKET_TIMEOUT")
+    redis_socket_connect_timeout: float | None = Field(default=2.0, alias="REDIS_SOCKET_CONNECT_TIMEOUT")
+    redis_health_check_interval: int = Field(default=30, alias="REDIS_HEALTH_CHECK_INTERVAL")
+    fsm_storage_pipelining: bool = Field(default=True, alias="FSM_STORAGE_PIPELINING")
+    fsm_context_ttl: int | None = Field(default=30 * 24 * 3600, alias="FSM_CONTEXT_TTL_SECONDS")
+    redis_sweep_interval: float = Field(default=3600.0, alias="REDIS_SWEEP_INTERVAL_SECONDS")
+    redis_sweep_idle_seconds: int = Field(default=14 * 24 * 3600, alias="REDIS_SWEEP_IDLE_SECONDS")
+    redis_sweep_batch: int = Field(default=500, alias="REDIS_SWEEP_BATCH")
+    menu_snapshot_ttl: int = Field(default=3600, alias="MENU_SNAPSHOT_TTL_SECONDS")
+    dossier_ttl: int = Field(default=14 * 24 * 3600, alias="DOSSIER_TTL_SECONDS")
+    menu_queue_lengths_ttl: float = Field(default=5.0, alias="MENU_QUEUE_LENGTHS_TTL_SECONDS")
+    multi_replica: bool = Field(default=False, alias="MULTI_REPLICA")
+    dialog_lock_timeout: float = Field(default=60.0, alias="DIALOG_LOCK_TIMEOUT_SECONDS")
+    dialog_lock_wait: float = Field(default=30.0, alias="DIALOG_LOCK_WAIT_SECONDS")
+    leader_key: str = Field(default="leader", alias="LEADER_KEY")
+    leader_ttl: float = Field(default=30.0, alias="LEADER_TTL_SECONDS")
+    leader_renew_interval: float = Field(default=10.0, alias="LEADER_RENEW_SECONDS")
+    fsm_storage_codec: str = Field(default="auto", alias="FSM_STORAGE_CODEC")
+    fsm_storage_compress_threshold: int = Field(default=2048, alias="FSM_STORAGE_COMPRESS_THRESHOLD")
 
     # ^ Tortoise ORM
     tortoise_app: str = Field(default="models", alias="TORTOISE_APP")
     tortoise_models: tuple[str, ...] = Field(default=("db.models", "aerich.models"), alias="TORTOISE_MODELS")
     tortoise_generate_schemas: bool = Field(default=False, alias="TORTOISE_GENERATE_SCHEMAS")
+    db_instrumentation: bool = Field(default=True, alias="DB_INSTRUMENTATION")
+    db_slow_query_threshold_ms: float = Field(default=100.0, alias="DB_SLOW_QUERY_THRESHOLD_MS")
+    db_repeated_query_threshold: int = Field(default=10, alias="DB_REPEATED_QUERY_THRESHOLD")
 
     matchmaking_service_url: str = Field(default="http://matchmaking:6543", alias="MATCHMAKING_URL")
 
@@ -68,17 +120,49 @@ class Settings(BaseSettings):
     def tortoise_db_url(self) -> str:
         return f"postgres://{self.pg_user}:{self.pg_password}@{self.pg_host}:{self.pg_port}/{self.pg_db}"
 
+    def _tortoise_connection(self, host: str, port: int) -> dict[str, Any]:
+        return {
+            "engine": "tortoise.backends.asyncpg",
+            "credentials": {
+                "host": host,
+                "port": port,
+                "user": self.pg_user,
+                "password": self.pg_password,
+                "database": self.pg_db,
+                "minsize": self.pg_pool_min_size,
+                "maxsize": self.pg_pool_max_size,
+                "max_queries": self.pg_pool_max_queries,
+                "max_inactive_connection_lifetime": self.pg_pool_max_inactive_lifetime,
+                "statement_cache_size": self.pg_statement_cache_size,
+                "command_timeout": self.pg_command_timeout,
+            },
+        }
+
+    @computed_field
+    @property
+    def tortoise_connection(self) -> dict[str, Any]:
+        return self._tortoise_connection(self.pg_host, self.pg_port)
+
+    @computed_field
+    @property
+    def tortoise_connections(self) -> dict[str, Any]:
+        connections = {"default": self.tortoise_connection}
+        if self.pg_replica_host:
+            connections["replica"] = self._tortoise_connection(self.pg_replica_host, self.pg_replica_port)
+        return connections
+
     @computed_field
     @property
     def tortoise_config(self) -> dict[str, Any]:
         return {
-            "connections": {"default": self.tortoise_db_url},
+            "connections": self.tortoise_connections,
             "apps": {
                 self.tortoise_app: {
                     "models": self.tortoise_models,
                     "default_connection": "default",
                 }
             },
+            "routers": ["db.routing.ReplicaRouter"] if self.pg_replica_host else [],
         }
 
     _timezone: ZoneInfo | None = None
@@ -0,0 +1,66 @@
+"""
+Запуск бота как граф зависимостей.
+
+Каждый шаг ждет только те шаги, от которых зависит; независимые (база, ссылка-приглашение, матчмейкинг)
+идут параллельно. Время каждого шага пишется в лог и в метрики, чтобы было видно, что тормозит рестарт.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StartupStep:
+    name: str
+    run: Callable[[], Awaitable[object]]
+    after: tuple[str, ...] = ()
+
+
+async def run_startup(steps: list[StartupStep]) -> None:
+    """Запустить шаги с учетом зависимостей. Зависимость должна быть объявлена раньше шага."""
+    tasks: dict[str, asyncio.Task] = {}
+    started = time.perf_counter()
+
+    async def run_step(step: StartupStep) -> None:
+        if step.after:
+            await asyncio.gather(*(tasks[name] for name in step.after))
+        step_started = time.perf_counter()
+        await step.run()
+        duration = time.perf_counter() - step_started
+        metrics.record_startup_phase(step.name, duration)
+        logger.info(
+            "Старт: %s за %.0f мс (с начала запуска %.0f мс)",
+            step.name,
+            duration * 1000,
+            (time.perf_counter() - started) * 1000,
+        )
+
+    declared: set[str] = set()
+    for step in steps:
+        unknown = [name for name in step.after if name not in declared]
+        if unknown:
+            msg = f"Шаг запуска {step.name} зависит от необъявленных шагов: {', '.join(unknown)}"
+            raise ValueError(msg)
+        declared.add(step.name)
+
+    for step in steps:
+        tasks[step.name] = asyncio.create_task(run_step(step), name=f"startup:{step.name}")
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    total = time.perf_counter() - started
+    metrics.record_startup(total)
+    logger.info("Бот запущен за %.0f мс", total * 1000)
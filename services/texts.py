@@ -1,7 +1,14 @@
+import ast
+import re
 from collections.abc import Iterable
+from pathlib import Path
+from string import Formatter
 from textwrap import dedent
 from typing import Any
 
+# Пакеты, в которых validate_call_sites() ищет вызовы texts.*
+CALL_SITE_PACKAGES = ("bot", "services", "db")
+
 _TEXTS: dict[str, str] = {
     # Common
     "common.private_only": "Этот бот работает только в личных сообщениях",
@@ -10,6 +17,8 @@ _TEXTS: dict[str, str] = {
     "common.exit_cooldown": "Недавно вы вышли из «Операции». Доступ будет выдан спустя {until}",
     "common.unknown": "Неизвестно",
     "common.username_unknown": "не указан",
+    "common.overloaded": "Бот сейчас перегружен, повторите действие через минуту",
+    "common.too_fast": "Не так быстро: дождитесь ответа на предыдущие нажатия",
     # Score directions
     "score.lost": "потеряли",
     "score.gained": "получили",
@@ -52,6 +61,9 @@ _TEXTS: dict[str, str] = {
     # Main menu
     "main_menu.title": "Главное меню\n",
     "main_menu.rating": "Ваш текущий рейтинг: <b>{user_rating}</b>\n",
+    "main_menu.personal_stats": (
+        "Раскрыто целей: <b>{user_kills}</b>, раскрывали вас: <b>{user_deaths}</b>, серия: <b>{user_kill_streak}</b>\n"
+    ),
     "main_menu.exit_cooldown": (
         " Недавно вы вышли из «Операции». Доступ будет выдан через: <b>{exit_cooldown_until}</b>\n"
     ),
@@ -121,6 +133,7 @@ _TEXTS: dict[str, str] = {
     "reroll.prompt": "Вы уверены что хотите заменить цель?",
     "reroll.confirm": "Да",
     "reroll.cancel": "Нет, назад",
+    "reroll.no_target": "У вас сейчас нет цели для замены",
     # Leave game
     "leave.prompt": (
         "Вы уверены, что хотите покинуть операцию?\n"
@@ -139,6 +152,9 @@ _TEXTS: dict[str, str] = {
         "Найдено совпадение: {killer} vs {victim} (сходство: {quality:.2f}), создан KillEvent id={kill_event_id}"
     ),
     "matchmaking.killer_message": "Назначена новая цель, изучите досье",
+    "matchmaking.assignment_taken": (
+        "Совпадение {killer} vs {victim} отклонено: у одного из игроков уже есть незакрытое событие"
+    ),
     # Kill timeout
     "timeout.victim": "Вы скрывались {days} дней. Ваш след потерян, контрагент не раскрыл вас",
     "timeout.killer": "Ты зашёл слишком далеко... След оборвался, за {days} дней цель успела скрыться",
@@ -157,6 +173,7 @@ _TEXTS: dict[str, str] = {
     "admin.command.editgame": "Посмотреть список всех «Операций»",
     "admin.command.server_time": "Получить текущее время на сервере",
     "admin.command.rollbackkill": "Откатить KillEvent по ID",
+    "admin.command.checkstats": "Сверить счетчики игроков с историей",
     "admin.stats.with_game": (
         "Оперативная сводка\n\n"
         "<b>Операция: {game_name}</b>\n"
@@ -212,6 +229,9 @@ _TEXTS: dict[str, str] = {
     "admin.rollbackkill.not_found": "KillEvent с таким id не найден",
     "admin.rollbackkill.not_confirmed": "KillEvent в статусе {status}, откатывать нечего",
     "admin.rollbackkill.done": "KillEvent #{kill_event_id} откатан, рейтинги пересчитаны",
+    "admin.checkstats.no_game": "Нет активной игры",
+    "admin.checkstats.ok": "Счетчики всех игроков совпадают с историей",
+    "admin.checkstats.fixed": "Счетчики пересчитаны из истории у {count} игроков",
     "admin.rollbackkill.discussion": (
         "Откат KillEvent #{kill_event_id}\n{killer} vs {victim}\nНовый рейтинг: {killer_rating} / {victim_rating}"
     ),
@@ -502,26 +522,115 @@ PROFILE_FIELD_LABELS: dict[str, str] = {
 }
 
 
-def _prepare(value: str) -> str:
-    return dedent(value)
+class Template:
+    """Текст без отступов и его поля, посчитанные при импорте. Рендер — обычный format_map."""
 
+    __slots__ = ("fields", "key", "text")
 
-def get(key: str) -> str:
+    def __init__(self, key: str, value: str) -> None:
+        self.key = key
+        self.text = dedent(value)
+        self.fields = frozenset(_root_field(name) for _, name, _, _ in Formatter().parse(self.text) if name is not None)
+
+    def render(self, values: dict[str, Any]) -> str:
+        try:
+            return self.text.format_map(values)
+        except KeyError as exc:
+            msg = f"{self.key}: не передано поле {{{exc.args[0]}}}"
+            raise KeyError(msg) from exc
+
+
+def _root_field(name: str) -> str:
+    return re.split(r"[.\[]", name, maxsplit=1)[0]
+
+
+def _compile(texts: dict[str, str]) -> dict[str, Template]:
+    templates = {}
+    for key, value in texts.items():
+        try:
+            templates[key] = Template(key, value)
+        except ValueError as exc:
+            msg = f"Шаблон {key} не разбирается: {exc}"
+            raise ValueError(msg) from exc
+    return templates
+
+
+_TEMPLATES: dict[str, Template] = _compile(_TEXTS)
+_LISTS: dict[str, tuple[str, ...]] = {key: tuple(values) for key, values in _TEXT_LISTS.items()}
+
+
+def template(key: str) -> Template:
     try:
-        return _prepare(_TEXTS[key])
+        return _TEMPLATES[key]
     except KeyError as exc:
         msg = f"Неизвестный ключ: {key}"
         raise KeyError(msg) from exc
 
 
+def get(key: str) -> str:
+    return template(key).text
+
+
 def render(key: str, **kwargs: Any) -> str:
-    return get(key).format(**kwargs)
+    return template(key).render(kwargs)
 
 
 def get_list(key: str) -> tuple[str, ...]:
     try:
-        values = _TEXT_LISTS[key]
+        return _LISTS[key]
     except KeyError as exc:
         msg = f"Неизвестный ключ: {key}"
         raise KeyError(msg) from exc
-    return tuple(values)
+
+
+def _literal_key(call: ast.Call) -> str | None:
+    if call.args and isinstance(call.args[0], ast.Constant) and isinstance(call.args[0].value, str):
+        return call.args[0].value
+    return None
+
+
+def _check_call(call: ast.Call, where: str) -> list[str]:
+    func = call.func
+    if not (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "texts"):
+        return []
+    key = _literal_key(call)
+    if key is None:
+        return []
+    if func.attr == "get_list":
+        return [] if key in _LISTS else [f"{where}: texts.get_list({key!r}) — нет такого ключа"]
+    if func.attr not in ("get", "render"):
+        return []
+    if key not in _TEMPLATES:
+        return [f"{where}: texts.{func.attr}({key!r}) — нет такого ключа"]
+    if func.attr == "get" or any(kw.arg is None for kw in call.keywords):
+        return []
+
+    fields = _TEMPLATES[key].fields
+    passed = {kw.arg for kw in call.keywords}
+    problems = []
+    if missing := fields - passed:
+        problems.append(f"{where}: texts.render({key!r}) — не переданы поля {', '.join(sorted(missing))}")
+    if extra := passed - fields:
+        problems.append(f"{where}: texts.render({key!r}) — в шаблоне нет полей {', '.join(sorted(extra))}")
+    return problems
+
+
+def find_call_site_problems(roots: Iterable[Path]) -> list[str]:
+    """Проверить ключи и плейсхолдеры всех вызовов texts.get/render/get_list с ключом-литералом."""
+    problems = []
+    for root in roots:
+        for path in sorted(root.rglob("*.py")):
+            tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Call):
+                    problems.extend(_check_call(node, f"{path.relative_to(root.parent)}:{node.lineno}"))
+    return problems
+
+
+def validate_call_sites() -> None:
+    """Падает при старте, если где-то в боте шаблон вызывается с неверными полями или ключом."""
+    project = Path(__file__).resolve().parent.parent
+    problems = find_call_site_problems(project / package for package in CALL_SITE_PACKAGES)
+    if problems:
+        msg = "Ошибки в вызовах шаблонов:\n" + "\n".join(problems)
+        raise ValueError(msg)
@@ -0,0 +1,265 @@
+"""
+Легковесная трассировка.
+
+Один корневой спан на апдейт Telegram или входящий запрос /match, дочерние спаны на запросы в базу, вызовы
+матчмейкинга и Bot API. Решение о сэмплировании принимается на корне: если трасса не попала в выборку,
+дочерние спаны ничего не стоят, кроме чтения ContextVar. Законченные трассы отдаются в подключаемый экспортер,
+по умолчанию в JSONL-файл, который не требует никакого коллектора.
+"""
+
+import contextlib
+import json
+import logging
+import queue
+import random
+import secrets
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+from services import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    duration: float | None = None
+    status: str = "ok"
+    error: str | None = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+@dataclass
+class _Trace:
+    spans: list[Span] = field(default_factory=list)
+    finished: bool = False
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: list[Span]) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+
+class NoopSpanExporter:
+    def export(self, spans: list[Span]) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+class LoggingSpanExporter:
+    """Пишет спаны в лог на уровне DEBUG."""
+
+    def export(self, spans: list[Span]) -> None:
+        for span in spans:
+            logger.debug("SPAN: %s", span.to_dict())
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonlSpanExporter:
+    """
+    Дописывает по строке JSON на каждый спан в локальный файл.
+
+    Файл пишет отдельный поток: export только кладет спаны в очередь размером до TRACING_QUEUE_SIZE, и медленный
+    диск не задерживает event loop. Если поток не успевает, спаны отбрасываются (счетчик dropped).
+    """
+
+    SHUTDOWN_TIMEOUT = 5.0
+
+    def __init__(self, path: str, queue_size: int) -> None:
+        self.path = Path(path)
+        self.dropped = 0
+        self._queue: queue.Queue[list[dict[str, Any]] | None] = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def export(self, spans: list[Span]) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait([span.to_dict() for span in spans])
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        # Поток дописывает все, что уже в очереди, но не дольше SHUTDOWN_TIMEOUT: запись может встать
+        # (кончилось место, медленный диск), и тогда остановка процесса висела бы без конца
+        deadline = time.monotonic() + self.SHUTDOWN_TIMEOUT
+        with contextlib.suppress(queue.Full):
+            self._queue.put(None, timeout=self.SHUTDOWN_TIMEOUT)
+        thread.join(max(deadline - time.monotonic(), 0.0))
+        if thread.is_alive():
+            abandoned = 0
+            with contextlib.suppress(queue.Empty):
+                while True:
+                    abandoned += len(self._queue.get_nowait() or ())
+            self.dropped += abandoned
+            logger.warning("Запись спанов в %s не успела завершиться, брошено спанов: %s", self.path, abandoned)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name="span-writer", daemon=True)
+                self._thread.start()
+
+    def _write_loop(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as file:
+            while True:
+                batch = self._queue.get()
+                if batch is None:
+                    break
+                try:
+                    file.writelines(json.dumps(span, ensure_ascii=False, default=str) + "\n" for span in batch)
+                    # Сбрасываем на диск, когда очередь опустела, а не после каждой пачки
+                    if self._queue.empty():
+                        file.flush()
+                except Exception as e:
+                    logger.warning("Не удалось записать спаны в %s: %s", self.path, e)
+
+
+def build_exporter(name: str) -> SpanExporter:
+    if name == "jsonl":
+        return JsonlSpanExporter(settings.tracing_jsonl_path, settings.tracing_queue_size)
+    if name == "log":
+        return LoggingSpanExporter()
+    if name == "none":
+        return NoopSpanExporter()
+    msg = f"Неизвестный экспортер трасс: {name}"
+    raise ValueError(msg)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_current_trace: ContextVar[_Trace | None] = ContextVar("current_trace", default=None)
+
+
+class Tracer:
+    def __init__(self, exporter: SpanExporter, *, enabled: bool, sample_rate: float) -> None:
+        self.exporter = exporter
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+
+    def set_exporter(self, exporter: SpanExporter) -> None:
+        self.exporter.shutdown()
+        self.exporter = exporter
+
+    @staticmethod
+    def current_span() -> Span | None:
+        return _current_span.get()
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Span | None]:
+        """Корневой спан. Если трасса не попала в выборку, отдаем None."""
+        if not self.enabled or _current_trace.get() is not None or random.random() >= self.sample_rate:  # noqa: S311
+            yield None
+            return
+
+        trace = _Trace()
+        trace_token = _current_trace.set(trace)
+        try:
+            with self._span(name, trace, secrets.token_hex(16), None, attributes) as span:
+                yield span
+        finally:
+            _current_trace.reset(trace_token)
+            trace.finished = True
+            self._export(trace.spans)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span | None]:
+        """Дочерний спан текущей трассы; вне трассы ничего не делает."""
+        trace = _current_trace.get()
+        parent = _current_span.get()
+        if trace is None or parent is None:
+            yield None
+            return
+
+        with self._span(name, trace, parent.trace_id, parent.span_id, attributes) as span:
+            yield span
+
+    @contextmanager
+    def _span(
+        self,
+        name: str,
+        trace: _Trace,
+        trace_id: str,
+        parent_id: str | None,
+        attributes: dict[str, Any],
+    ) -> Iterator[Span]:
+        span = Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent_id,
+            start_time=time.time(),
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - span._started  # noqa: SLF001
+            if trace.finished:
+                # Спан из фоновой задачи, пережившей корень: отдаем его отдельно
+                self._export([span])
+            else:
+                trace.spans.append(span)
+
+    def _export(self, spans: list[Span]) -> None:
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            logger.warning("Не удалось экспортировать спаны: %s", e)
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+
+tracer = Tracer(
+    build_exporter(settings.tracing_exporter),
+    enabled=settings.tracing_enabled,
+    sample_rate=settings.tracing_sample_rate,
+)
@@ -0,0 +1,46 @@
+"""
+Дедупликация апдейтов вебхука по update_id.
+
+Telegram повторяет доставку, если не дождался ответа, а повтор может прийти в другую реплику. Первая доставка
+ставит ключ update_seen:<update_id> (SET NX с TTL WEBHOOK_DEDUP_TTL_SECONDS); повторная видит, что ключ уже есть,
+и апдейт не обрабатывается второй раз. Если Redis недоступен, апдейт обрабатывается: пропустить нажатие хуже,
+чем в редком случае обработать его дважды.
+"""
+
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from services import settings
+from services.redis import redis
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    def __init__(self, client: Redis, ttl: int, prefix: str = "update_seen") -> None:
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, update_id: int) -> str:
+        return f"{self.prefix}:{update_id}"
+
+    async def first_delivery(self, update_id: int) -> bool:
+        """True, если апдейт пришел впервые (и теперь отмечен), False для повторной доставки."""
+        try:
+            return bool(await self.client.set(self._key(update_id), 1, nx=True, ex=self.ttl))
+        except RedisError as e:
+            logger.warning("Не удалось проверить апдейт %s на повтор: %s", update_id, e)
+            return True
+
+    async def forget(self, update_id: int) -> None:
+        """Снять отметку: апдейт не принят, и повторная доставка должна его обработать."""
+        try:
+            await self.client.delete(self._key(update_id))
+        except RedisError as e:
+            logger.warning("Не удалось снять отметку апдейта %s: %s", update_id, e)
+
+
+update_dedup = UpdateDeduplicator(redis, ttl=settings.webhook_dedup_ttl)
@@ -15,17 +15,24 @@ def compute_exit_cooldown_until(now: datetime | None = None) -> datetime:
 
 
 def is_exit_cooldown_active(user: User, now: datetime | None = None) -> bool:
-    if user.exit_cooldown_until is None:
+    return is_cooldown_active_until(user.exit_cooldown_until, now)
+
+
+def is_cooldown_active_until(until: datetime | None, now: datetime | None = None) -> bool:
+    if until is None:
         return False
     now = now or datetime.now(settings.timezone)
-    return user.exit_cooldown_until > now
+    return until > now
 
 
 def format_exit_cooldown(user: User, fmt: str = "%d.%m.%Y %H:%M") -> str | None:
-    if not user.exit_cooldown_until:
+    return format_cooldown_until(user.exit_cooldown_until, fmt)
+
+
+def format_cooldown_until(until: datetime | None, fmt: str = "%d.%m.%Y %H:%M") -> str | None:
+    if not until:
         return None
 
-    until = user.exit_cooldown_until
     if until.tzinfo is None:
         until = until.replace(tzinfo=settings.timezone)
     return until.astimezone(settings.timezone).strftime(fmt)